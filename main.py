@@ -8,6 +8,7 @@ astrbot-plugin-tmp-bot
 
 import re
 import asyncio
+import contextvars
 import math
 import aiohttp
 import json
@@ -17,9 +18,18 @@ import base64
 import socket
 import hashlib
 import random
+import sqlite3
+import threading
 import time
-from typing import Optional, List, Dict, Tuple, Any
-from datetime import datetime, timedelta
+import difflib
+import functools
+import unicodedata
+from collections import Counter, OrderedDict, deque
+from urllib.parse import urlsplit
+from typing import Optional, List, Dict, Tuple, Any, Callable, Awaitable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 
 # 引入 AstrBot 核心 API
 try:
@@ -108,6 +118,13 @@ USER_GROUP_MAP = {
     'Game Moderator': '游戏管理员'
 }
 PROMODS_SERVER_IDS = {50, 51}
+# 当日用量达到配置额度的该比例时，翻译自动降级为仅词典模式
+BAIDU_QUOTA_RESERVE_RATIO = 0.95
+# 百度翻译额度/余额类错误码：54004 余额不足，58002 服务已关闭，90107 认证未通过或未生效
+BAIDU_QUOTA_ERROR_CODES = {'54004', '58002', '90107'}
+# 翻译预热覆盖的路况服务器及首次预热前的等待秒数
+TRANSLATE_WARMUP_SERVERS = ("sim1", "sim2", "eupromods1", "arc1")
+TRANSLATE_WARMUP_INITIAL_DELAY = 120
 
 def _translate_user_groups(groups: List[Any]) -> List[str]:
     translated: List[str] = []
@@ -119,22 +136,128 @@ def _translate_user_groups(groups: List[Any]) -> List[str]:
     return translated
 
 
+# --- 辅助函数：时间戳解析 ---
+try:
+    # 可选依赖：ciso8601 的 C 实现解析 ISO 8601 最快，未安装时回退到内置解析
+    from ciso8601 import parse_datetime as _ciso8601_parse_datetime
+except ImportError:
+    _ciso8601_parse_datetime = None
+
+_TS_FRACTION_RE = re.compile(r"\.(\d+)")
+_TS_EPOCH_RE = re.compile(r"^\d{9,13}(?:\.\d+)?$")
+
+
+def _parse_ts_epoch(s: str) -> datetime:
+    """纯数字的 Unix 时间戳（秒或毫秒），返回 UTC 时间。"""
+    if not _TS_EPOCH_RE.match(s):
+        raise ValueError(s)
+    value = float(s)
+    if value > 1e11:
+        value /= 1000.0
+    return datetime.fromtimestamp(value, timezone.utc)
+
+
+def _parse_ts_iso(s: str) -> datetime:
+    """ISO 8601 / "YYYY-MM-DD HH:MM:SS"，兼容 Z 结尾与非 3/6 位小数秒。"""
+    if _ciso8601_parse_datetime is not None:
+        return _ciso8601_parse_datetime(s)
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        pass
+    t = s
+    if t[-1:] in ('Z', 'z'):
+        t = t[:-1] + '+00:00'
+    m = _TS_FRACTION_RE.search(t)
+    if m and len(m.group(1)) not in (3, 6):
+        t = t[:m.start(1)] + m.group(1)[:6].ljust(6, '0') + t[m.end(1):]
+    return datetime.fromisoformat(t)
+
+
+def _parse_ts_slash(s: str) -> datetime:
+    """部分接口使用的 "YYYY/MM/DD HH:MM:SS" 格式。"""
+    return datetime.strptime(s, '%Y/%m/%d %H:%M:%S')
+
+
+_TS_PARSERS = {
+    'epoch': _parse_ts_epoch,
+    'iso': _parse_ts_iso,
+    'slash': _parse_ts_slash,
+}
+# 每个数据来源首次成功解析时记住格式，后续直接走对应解析器
+_TS_FORMAT_BY_SOURCE: Dict[str, str] = {}
+
+
+def _parse_timestamp(value: Any, source: str = 'default') -> Optional[datetime]:
+    """解析时间戳，失败返回 None。时区信息按原样保留（无时区视为接口原始时间）。"""
+    if value is None:
+        return None
+    s = str(value).strip()
+    if not s:
+        return None
+    known = _TS_FORMAT_BY_SOURCE.get(source)
+    if known:
+        try:
+            return _TS_PARSERS[known](s)
+        except (ValueError, OverflowError, OSError):
+            pass
+    for name, parser in _TS_PARSERS.items():
+        if name == known:
+            continue
+        try:
+            dt = parser(s)
+        except (ValueError, OverflowError, OSError):
+            continue
+        _TS_FORMAT_BY_SOURCE[source] = name
+        return dt
+    return None
+
+
+def _to_utc_naive(dt: datetime) -> datetime:
+    """带时区的时间换算到 UTC 后去掉时区；无时区的按 UTC 原样返回。"""
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _parse_timestamp_epoch(value: Any, source: str = 'default') -> Optional[int]:
+    """解析为 Unix 秒；无时区的时间按本地时间解释（与 datetime.timestamp 一致）。"""
+    dt = _parse_timestamp(value, source)
+    if dt is None:
+        return None
+    try:
+        return int(dt.timestamp())
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
 # --- 辅助函数：格式化时间戳 ---
+@functools.lru_cache(maxsize=2048)
+def _format_timestamp_to_readable_cached(s: str) -> str:
+    dt = _parse_timestamp(s, 'truckersmp')
+    if dt is None:
+        # 兼容性回退
+        return s.split('T')[0] if 'T' in s else s
+    # 直接显示 UTC 时间
+    return _to_utc_naive(dt).strftime('%Y-%m-%d %H:%M:%S')
+
+
 def _format_timestamp_to_readable(timestamp_str: Optional[str]) -> str:
     """将 TruckersMP API 返回的 UTC 时间戳转换为可读格式 (ISO 8601)。"""
     if not timestamp_str:
         return "未知"
-    
-    try:
-        # TruckersMP V2 返回 ISO 8601 (e.g., "2024-05-28T14:30:00.000Z")
-        clean_str = timestamp_str.replace('T', ' ').split('.')[0].replace('Z', '')
-        dt_utc = datetime.strptime(clean_str, '%Y-%m-%d %H:%M:%S')
-        # 直接显示 UTC 时间，并标注时区
-        return dt_utc.strftime('%Y-%m-%d %H:%M:%S')
-        
-    except Exception:
-        # 兼容性回退
-        return timestamp_str.split('T')[0] if 'T' in timestamp_str else timestamp_str
+    # TruckersMP V2 返回 ISO 8601 (e.g., "2024-05-28T14:30:00.000Z")
+    return _format_timestamp_to_readable_cached(str(timestamp_str))
+
+
+def _split_traffic_name(raw_name: Optional[str]) -> Tuple[str, str]:
+    """拆分路况地点名称与类型，如 "Calais (City)" -> ("Calais", "City")。"""
+    raw = str(raw_name or "").strip()
+    idx1 = raw.rfind("(")
+    idx2 = raw.rfind(")")
+    if idx1 > 0 and idx2 > idx1:
+        return raw[:idx1].strip(), raw[idx1 + 1:idx2].strip()
+    return raw, ""
 
 
 def _is_unknown_display_value(value: Optional[str]) -> bool:
@@ -147,29 +270,22 @@ def _is_unknown_display_value(value: Optional[str]) -> bool:
     return s == "" or s.lower() in {"未知", "unknown", "null", "none"}
 # -----------------------------
 
+@functools.lru_cache(maxsize=2048)
+def _format_timestamp_to_beijing_cached(s: str) -> str:
+    if s.lower().startswith('never'):
+        return "永久封禁"
+    dt = _parse_timestamp(s, 'truckersmp')
+    if dt is None:
+        return s
+    dt_bj = _to_utc_naive(dt) + timedelta(hours=8)
+    return dt_bj.strftime('%Y-%m-%d %H:%M:%S')
+
+
 def _format_timestamp_to_beijing(timestamp_str: Optional[str]) -> str:
     """将 UTC 时间戳转换为北京时间 (UTC+8)。兼容 ISO 8601 和简单格式。"""
     if not timestamp_str:
         return "未知"
-
-    s = str(timestamp_str).strip()
-    if s.lower().startswith('never'):
-        return "永久封禁"
-
-    try:
-        clean_str = s.replace('T', ' ').split('.')[0].replace('Z', '')
-        dt_utc = datetime.strptime(clean_str, '%Y-%m-%d %H:%M:%S')
-        dt_bj = dt_utc + timedelta(hours=8)
-        return dt_bj.strftime('%Y-%m-%d %H:%M:%S')
-    except Exception:
-        try:
-            # ISO 8601 with timezone offset, e.g. 2025-12-01T07:55:00+00:00
-            iso = s.replace('Z', '+00:00')
-            dt = datetime.fromisoformat(iso)
-            dt_bj = dt + timedelta(hours=8)
-            return dt_bj.strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            return s
+    return _format_timestamp_to_beijing_cached(str(timestamp_str).strip())
 
 def _normalize_heading_to_direction(heading: Any) -> Optional[str]:
     """把角度值转换为方向字符串，如 0°≈北、90°≈东，并附带箭头符号。"""
@@ -209,54 +325,1996 @@ def _normalize_heading_to_direction(heading: Any) -> Optional[str]:
         return None
 
 
-def _cleanup_cn_location_text(text: str) -> str:
-    s = str(text or "").strip()
-    if not s:
-        return s
-    try:
-        s = _re_local.sub(r"\s+", " ", s).strip()
-        s = _re_local.sub(r"^(?:[\[［][^\]］]+[\]］]\s*)+", "", s)
-        s = _re_local.sub(r"^<[^>]+>\s*", "", s)
-        s = _re_local.sub(r"^(?:&\s*)?(?:n|v|adj|adv|vt|vi|prep|pron|conj|abbr)[\.．]\s*", "", s, flags=_re_local.IGNORECASE)
-        s = _re_local.sub(r"^(?:\s*(?:&\s*)?(?:n|v|adj|adv|vt|vi|prep|pron|conj|abbr)[\.．]\s*)+", "", s, flags=_re_local.IGNORECASE)
-        s = _re_local.sub(r"^(?:\s*(?:名|动|形|副|介|代|连|数|量|叹|助|冠)(?:词)?[\.．:：]\s*)+", "", s)
-        s = _re_local.sub(r"（[^）]*）", "", s)
-        s = _re_local.sub(r"\([^)]*\)", "", s)
-        for sep in ["；", ";", "，"]:
-            if sep in s:
-                s = s.split(sep, 1)[0]
-        s = s.strip(" 、，。.；;")
-        if _re_local.search(r"\s", s):
-            head = _re_local.split(r"\s+", s, 1)[0]
-            if _re_local.search(r"[\u4e00-\u9fff]", head) and not _re_local.fullmatch(r"(?:名|动|形|副|介|代|连|数|量|叹|助|冠)(?:词)?[\.．:：]?", head):
-                s = head
-        return s or text
-    except Exception:
-        return text
+def _cleanup_cn_location_text(text: str) -> str:
+    s = str(text or "").strip()
+    if not s:
+        return s
+    try:
+        s = _re_local.sub(r"\s+", " ", s).strip()
+        s = _re_local.sub(r"^(?:[\[［][^\]］]+[\]］]\s*)+", "", s)
+        s = _re_local.sub(r"^<[^>]+>\s*", "", s)
+        s = _re_local.sub(r"^(?:&\s*)?(?:n|v|adj|adv|vt|vi|prep|pron|conj|abbr)[\.．]\s*", "", s, flags=_re_local.IGNORECASE)
+        s = _re_local.sub(r"^(?:\s*(?:&\s*)?(?:n|v|adj|adv|vt|vi|prep|pron|conj|abbr)[\.．]\s*)+", "", s, flags=_re_local.IGNORECASE)
+        s = _re_local.sub(r"^(?:\s*(?:名|动|形|副|介|代|连|数|量|叹|助|冠)(?:词)?[\.．:：]\s*)+", "", s)
+        s = _re_local.sub(r"（[^）]*）", "", s)
+        s = _re_local.sub(r"\([^)]*\)", "", s)
+        for sep in ["；", ";", "，"]:
+            if sep in s:
+                s = s.split(sep, 1)[0]
+        s = s.strip(" 、，。.；;")
+        if _re_local.search(r"\s", s):
+            head = _re_local.split(r"\s+", s, 1)[0]
+            if _re_local.search(r"[\u4e00-\u9fff]", head) and not _re_local.fullmatch(r"(?:名|动|形|副|介|代|连|数|量|叹|助|冠)(?:词)?[\.．:：]?", head):
+                s = head
+        return s or text
+    except Exception:
+        return text
+
+# --- 地名对照表 ---
+def _parse_location_table(file_path: str) -> List[Tuple[str, str]]:
+    """解析 "| English | 中文 |" 形式的 markdown 表格。"""
+    try:
+        if not os.path.exists(file_path):
+            return []
+        rows: List[Tuple[str, str]] = []
+        with open(file_path, "r", encoding="utf-8") as f:
+            for raw in f:
+                line = raw.strip()
+                if not line.startswith("|"):
+                    continue
+                if line.startswith("| English |"):
+                    continue
+                if line.startswith("|---"):
+                    continue
+                parts = [p.strip() for p in line.strip("|").split("|")]
+                if len(parts) < 2:
+                    continue
+                en = parts[0].strip()
+                cn = parts[1].strip()
+                if not en or not cn:
+                    continue
+                rows.append((en, cn))
+        return rows
+    except Exception:
+        return []
+
+
+# --- 地名模糊匹配 ---
+_LOCATION_CHAR_FOLD = {
+    'ß': 'ss', 'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ł': 'l',
+    'đ': 'd', 'ð': 'd', 'þ': 'th', 'ı': 'i',
+}
+
+
+def _normalize_location_key(text: Optional[str]) -> str:
+    """把地名归一化为模糊匹配用的键：去变音符号、去括号后缀、统一连字符与空白。"""
+    s = unicodedata.normalize('NFKD', str(text or '')).lower()
+    s = ''.join(_LOCATION_CHAR_FOLD.get(ch, ch) for ch in s if not unicodedata.combining(ch))
+    s = _re_local.sub(r"[\(（\[][^\)）\]]*[\)）\]]", " ", s)
+    s = _re_local.sub(r"[\u2010-\u2015\-_/.,'’]+", " ", s)
+    s = _re_local.sub(r"[^a-z0-9\s]", "", s)
+    return _re_local.sub(r"\s+", " ", s).strip()
+
+
+def _location_trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _FuzzyNameIndex:
+    """已知英文地名的本地模糊索引（三元组召回 + 归一化编辑相似度打分）。"""
+
+    def __init__(self, threshold: float = 0.88, min_key_len: int = 4):
+        self.threshold = threshold
+        self.min_key_len = min_key_len
+        self._values: Dict[str, str] = {}
+        self._grams: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, name: str, value: str) -> None:
+        key = _normalize_location_key(name)
+        if len(key) < self.min_key_len or key in self._values:
+            return
+        self._values[key] = value
+        for g in _location_trigrams(key):
+            self._grams.setdefault(g, set()).add(key)
+
+    def lookup(self, name: Optional[str]) -> Optional[str]:
+        key = _normalize_location_key(name)
+        if len(key) < self.min_key_len:
+            return None
+        exact = self._values.get(key)
+        if exact:
+            return exact
+        grams = _location_trigrams(key)
+        hits: Dict[str, int] = {}
+        for g in grams:
+            for cand in self._grams.get(g, ()):
+                hits[cand] = hits.get(cand, 0) + 1
+        if not hits:
+            return None
+        # 先用三元组 Dice 系数粗排，只对前若干候选计算编辑相似度
+        ranked = sorted(
+            hits.items(),
+            key=lambda kv: 2.0 * kv[1] / (len(grams) + len(_location_trigrams(kv[0]))),
+            reverse=True,
+        )[:8]
+        best_key, best_score = None, 0.0
+        for cand, _ in ranked:
+            score = difflib.SequenceMatcher(None, key, cand).ratio()
+            if score > best_score:
+                best_key, best_score = cand, score
+        if best_key is not None and best_score >= self.threshold:
+            return self._values[best_key]
+        return None
+
+# --- 封禁原因翻译：映射表与正则在导入时构建一次 ---
+BAN_REASON_ZH_MAP = {
+    "1.1": "账号、设备与游戏设置责任",
+    "1.2": "逃避封禁",
+    "1.3": "个人信息与隐私",
+    "1.4": "不当内容与交流",
+    "1.5": "语言、头像和昵称违规",
+    "1.6": "冒充官方或其他玩家",
+    "1.7": "刷屏/滥用系统",
+    "2.1": "黑客/漏洞/功能滥用",
+    "2.2": "碰撞",
+    "2.3": "堵塞",
+    "2.4": "错误驾驶方式/不当超车",
+    "2.5": "鲁莽驾驶",
+    "2.6": "骚扰、侮辱或不当行为",
+    "2.7": "特色区域和事件服务器规则",
+    "2.8": "历史原因",
+    "2.9": "保存修改",
+    "3.1": "违规保存编辑",
+    "3.2": "不兼容或缺失组件",
+}
+
+BAN_KEYWORD_MAP = {
+    "collisions": "碰撞",
+    "reckless driving": "鲁莽驾驶",
+    "blocking": "堵塞",
+    "trolling": "恶意捣乱",
+    "inappropriate overtaking": "不当超车",
+    "wrong way": "逆行",
+    "ramming": "蓄意撞车",
+    "chat abuse": "聊天滥用",
+    "insulting": "辱骂他人",
+}
+
+_BAN_SECTION_RE = re.compile(r"§\s*(?P<code>\d+\.\d+)\s*-\s*(?P<title>[^,\-]+)")
+_BAN_KEYWORD_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(k) for k in sorted(BAN_KEYWORD_MAP, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _translate_ban_reason_text(reason: str) -> str:
+    """封禁原因翻译的纯函数实现，相同原因直接命中有界缓存。"""
+    matches = list(_BAN_SECTION_RE.finditer(reason))
+    if matches:
+        parts = []
+        for m in matches:
+            code = m.group("code").strip()
+            title = m.group("title").strip()
+            parts.append(f"§{code} - {BAN_REASON_ZH_MAP.get(code) or title}")
+        result = ", ".join(parts) + reason[matches[-1].end():]
+    else:
+        result = reason
+    return _BAN_KEYWORD_RE.sub(lambda m: BAN_KEYWORD_MAP[m.group(0).lower()], result)
+
+# -----------------------------
+
+
+# --- 命令路由：导入时编译一次 ---
+# (路由名, 完整匹配正则, 带 @ 时的前缀匹配正则)，顺序即匹配优先级。
+# 参数以 "<路由名>__<参数名>" 命名分组捕获，完整匹配时直接作为命令参数使用
+_COMMAND_ROUTES: Tuple[Tuple[str, str, Optional[str]], ...] = (
+    ('query_batch', r'(?:查询|查)\s*(?P<query_batch__ids>\d+(?:[\s,，]+\d+)+)\s*$', None),
+    ('query', r'(?:查询|查)(?:\s*(?P<query__id>\d+))?\s*$', r'(?:查询|查)(?:\s|$)'),
+    ('dlc_list', r'地图(?:dlc|DLC)$', None),
+    ('bind', r'绑定\s*(?P<bind__id>\d+)\s*$', None),
+    ('unbind', r'解绑\s*$', None),
+    ('locate', r'定位(?:\s*(?P<locate__id>\d+))?\s*$', r'定位'),
+    ('rank_total', r'总里程排行\s*$', None),
+    ('rank_today', r'今日里程排行\s*$', None),
+    ('footprint', r'足迹(?:\s*(?P<footprint__server>\S+?))?(?:\s+(?P<footprint__id>\d+))?\s*$', r'足迹'),
+    ('server', r'服务器\s*$', None),
+    ('traffic', r'路况(?:\s*(?P<traffic__server>\S+))?\s*$', None),
+    ('version', r'插件版本\s*$', None),
+    ('help', r'菜单\s*$', None),
+    ('vtc_history', r'历史车队(?:\s*(?P<vtc_history__id>\d+))?\s*$', r'历史车队'),
+    ('member_help', r'成员管理\s*$', None),
+    ('member_add', r'新添成员\s+(?P<member_add__tmp_id>\d+)\s+(?P<member_add__team>\d+)\s+(?P<member_add__qq>\d+)\s*$', None),
+    ('member_remove', r'删除成员\s+(?P<member_remove__tmp_id>\d+)\s*$', None),
+    ('point_add', r'加积分\s+(?P<point_add__target>\S+)\s+(?P<point_add__quantity>\d+)\s*$', r'加积分'),
+    ('point_sub', r'减积分\s+(?P<point_sub__target>\S+)\s+(?P<point_sub__quantity>\d+)\s*$', r'减积分'),
+    # 以下为车队平台功能，受 vtcm_feature_enable 与群白名单控制
+    ('event_list', r'活动(?:\s+(?P<event_list__page>\d+))?(?:\s+(?P<event_list__size>\d+))?\s*$', None),
+    ('event_today', r'今日活动\s*$', None),
+    ('member_info', r'信息(?:\s+(?P<member_info__param>\S+))?\s*$', r'信息'),
+    ('change_password', r'修改密码\s+(?P<change_password__uid>\d+)\s+(?P<change_password__password>\S+)\s*$', None),
+)
+_VTCM_ROUTES = frozenset({'event_list', 'event_today', 'member_info', 'change_password'})
+_COMMAND_ROUTE_ORDER = {name: i for i, (name, _, _) in enumerate(_COMMAND_ROUTES)}
+_COMMAND_RE = re.compile(
+    "^(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in _COMMAND_ROUTES) + ")"
+)
+_COMMAND_AT_RE = re.compile(
+    "^(?:" + "|".join(f"(?P<{name}>{pattern})" for name, _, pattern in _COMMAND_ROUTES if pattern) + ")"
+)
+# 首字符 -> 可能的命令前缀，绝大多数非命令消息在这里直接被拒绝
+_COMMAND_PREFIXES_BY_CHAR: Dict[str, Tuple[str, ...]] = {}
+for _prefix in ('查', '地图', '绑定', '解绑', '定位', '总里程排行', '今日', '足迹', '服务器', '路况',
+                '插件版本', '菜单', '历史车队', '成员管理', '新添成员', '删除成员', '加积分', '减积分',
+                '活动', '信息', '修改密码'):
+    _COMMAND_PREFIXES_BY_CHAR[_prefix[0]] = _COMMAND_PREFIXES_BY_CHAR.get(_prefix[0], ()) + (_prefix,)
+del _prefix
+
+
+def _may_be_command(msg: str) -> bool:
+    prefixes = _COMMAND_PREFIXES_BY_CHAR.get(msg[:1])
+    return bool(prefixes) and msg.startswith(prefixes)
+
+
+def _route_command(msg: str, has_at: bool) -> Tuple[Optional[str], Optional[Dict[str, str]]]:
+    """按原有优先级返回 (路由名, 参数)：完整匹配与（带 @ 时的）前缀匹配中顺序靠前者胜出。
+
+    仅前缀匹配命中时参数为 None，由处理函数自行从消息中解析。
+    """
+    m = _COMMAND_RE.match(msg)
+    route = m.lastgroup if m else None
+    if has_at:
+        m_at = _COMMAND_AT_RE.match(msg)
+        if m_at and (route is None or _COMMAND_ROUTE_ORDER[m_at.lastgroup] < _COMMAND_ROUTE_ORDER[route]):
+            return m_at.lastgroup, None
+    if route is None:
+        return None, None
+    prefix = route + "__"
+    args = {k[len(prefix):]: v for k, v in m.groupdict().items() if v is not None and k.startswith(prefix)}
+    return route, args
+
+
+def _scan_message_mentions(message_obj: Any) -> Tuple[bool, Optional[str], Optional[str], List[str]]:
+    """遍历一次消息链，返回 (has_at, at_user_id, mention_user_id, mentions)。
+
+    has_at/at_user_id 供命令路由判断；mention_user_id 为处理函数查询的目标用户；
+    mentions 为所有被 @ 的用户（去重，保持顺序）。
+    """
+    has_at = False
+    at_user_id = None
+    mention_user_id = None
+    mentions: List[str] = []
+    if message_obj is None:
+        return has_at, at_user_id, mention_user_id, mentions
+    try:
+        chain = getattr(message_obj, "message", None) or []
+        route_done = False
+        mention_done = False
+        for seg in chain:
+            is_dict = isinstance(seg, dict)
+            seg_type = getattr(seg, "type", None)
+            if is_dict:
+                seg_type = seg.get("type") or seg_type
+            is_at = isinstance(seg_type, str) and seg_type.lower() == "at"
+            uid = (
+                getattr(seg, "qq", None)
+                or getattr(seg, "user_id", None)
+                or getattr(seg, "id", None)
+            )
+            qq = getattr(seg, "qq", None)
+            if is_dict:
+                uid = seg.get("qq") or seg.get("user_id") or seg.get("id") or uid
+                qq = seg.get("qq") or qq
+            if is_at and uid and str(uid) not in mentions:
+                mentions.append(str(uid))
+            if not route_done:
+                if is_at:
+                    has_at = True
+                    if uid is not None:
+                        at_user_id = str(uid)
+                    route_done = True
+                elif uid is not None:
+                    has_at = True
+                    route_done = True
+            if not mention_done:
+                if is_at and uid:
+                    mention_user_id = str(uid)
+                    mention_done = True
+                elif qq:
+                    mention_user_id = str(qq)
+                    mention_done = True
+    except Exception:
+        return False, None, None, []
+    return has_at, at_user_id, mention_user_id, mentions
+
+
+class _CommandContext:
+    """单条消息只解析一次的命令上下文，由分发器构建后传给各命令处理函数。"""
+
+    __slots__ = ('message', 'route', 'args', 'has_at', 'at_user_id', 'mention_user_id',
+                 'mentions', 'sender_id', 'group_id', 'platform')
+
+    def __init__(self, message: str, route: Optional[str], args: Optional[Dict[str, str]],
+                 has_at: bool, at_user_id: Optional[str], mention_user_id: Optional[str],
+                 mentions: List[str], sender_id: str, group_id: str, platform: str):
+        self.message = message
+        self.route = route
+        self.args = args
+        self.has_at = has_at
+        self.at_user_id = at_user_id
+        self.mention_user_id = mention_user_id
+        self.mentions = mentions
+        self.sender_id = sender_id
+        self.group_id = group_id
+        self.platform = platform
+
+    @property
+    def full_match(self) -> bool:
+        """命令完整匹配（参数已由路由解析），而不是仅凭 @ 前缀命中。"""
+        return self.args is not None
+
+    def arg(self, name: str, fallback_pattern: Optional[str] = None, group: int = 1) -> Optional[str]:
+        """取路由解析出的参数；仅前缀命中时按 fallback_pattern 从原消息中搜索。"""
+        if self.args is not None:
+            return self.args.get(name)
+        if fallback_pattern:
+            m = re.search(fallback_pattern, self.message)
+            if m:
+                return m.group(group)
+        return None
+
+
+# --- 命令结果合并 ---
+class _ReplyRecorder:
+    """事件代理：其余属性原样转发，plain_result/chain_result 改为记录可重放的回复。"""
+
+    def __init__(self, event: Any):
+        self._event = event
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._event, name)
+
+    def plain_result(self, text: str) -> Tuple[str, Any]:
+        return ('plain', text)
+
+    def chain_result(self, chain: List[Any]) -> Tuple[str, Any]:
+        return ('chain', list(chain))
+
+
+class _CommandCoalescer:
+    """相同命令（含参数与影响结果的用户输入）并发执行时只计算一次，所有请求者共享同一份回复。"""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[Any, ...], asyncio.Task] = {}
+
+    @staticmethod
+    async def _collect(producer: Callable[[], Any]) -> List[Tuple[str, Any]]:
+        return [r async for r in producer()]
+
+    async def run(self, key: Tuple[Any, ...], producer: Callable[[], Any]) -> Tuple[List[Tuple[str, Any]], bool]:
+        """返回 (回复列表, 是否复用了进行中的结果)。"""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            # 计算放在独立任务中，首个请求者被取消时不影响其余等待者
+            task = asyncio.create_task(self._collect(producer))
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Task, key=key) -> None:
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if not t.cancelled():
+                    t.exception()
+            task.add_done_callback(_done)
+        return await asyncio.shield(task), shared
+
+
+# --- 冷却与准入控制 ---
+# 会触发网页渲染或大量上游请求的命令，受并发上限与等待队列约束
+_HEAVY_COMMAND_ROUTES = frozenset({'locate', 'footprint', 'rank_total', 'rank_today', 'dlc_list', 'query_batch'})
+
+
+class _TokenBuckets:
+    """按键划分的令牌桶集合，多个桶同时检查、全部放行时才一起扣减。"""
+
+    def __init__(self, max_keys: int = 4096):
+        self._max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[Any, ...], Tuple[float, float]]" = OrderedDict()
+
+    def _level(self, key: Tuple[Any, ...], capacity: float, rate: float, now: float) -> float:
+        tokens, ts = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - ts) * rate)
+
+    def acquire(self, rules: List[Tuple[Tuple[Any, ...], float, float]]) -> float:
+        """rules 为 (键, 容量, 每秒恢复量)；放行返回 0，否则返回需要等待的秒数。"""
+        now = time.monotonic()
+        levels = []
+        wait = 0.0
+        for key, capacity, rate in rules:
+            level = self._level(key, capacity, rate, now)
+            levels.append(level)
+            if level < 1.0:
+                wait = max(wait, (1.0 - level) / rate)
+        if wait > 0:
+            return wait
+        for (key, _capacity, _rate), level in zip(rules, levels):
+            self._buckets[key] = (level - 1.0, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self._max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0
+
+
+class _AdmissionController:
+    """重型命令的并发闸门：超出并发上限时进入有界等待队列，队列满或等待超时则拒绝。"""
+
+    def __init__(self):
+        self._active = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for f in self._waiters if not f.done())
+
+    async def acquire(self, limit: int, queue_limit: int, timeout: float) -> bool:
+        if self._active < max(1, limit) and not self.queued:
+            self._active += 1
+            return True
+        if self.queued >= max(0, queue_limit):
+            return False
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            done, _ = await asyncio.wait({fut}, timeout=timeout if timeout > 0 else None)
+        except asyncio.CancelledError:
+            # 名额已经移交给本请求时需要归还
+            if fut.done() and not fut.cancelled():
+                self.release()
+            fut.cancel()
+            raise
+        if not done:
+            fut.cancel()
+            return False
+        return True
+
+    def release(self) -> None:
+        # 名额直接移交给队首等待者，避免被新请求插队
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active = max(0, self._active - 1)
+
+
+# --- 上游请求优先级调度 ---
+UPSTREAM_PRIORITY_INTERACTIVE = 0
+UPSTREAM_PRIORITY_PREFETCH = 1
+UPSTREAM_PRIORITY_BACKGROUND = 2
+# 当前任务发出的上游请求所属的优先级；后台任务在入口处自行设置
+_UPSTREAM_PRIORITY: contextvars.ContextVar[int] = contextvars.ContextVar('tmp_upstream_priority', default=UPSTREAM_PRIORITY_INTERACTIVE)
+# 当前命令的截止时间（time.monotonic()），所有嵌套的上游请求共享；None 表示不限
+_COMMAND_DEADLINE: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('tmp_command_deadline', default=None)
+# 当前命令的上游调用预算与计数；gather 出的子任务共享同一对象
+_COMMAND_BUDGET: contextvars.ContextVar[Optional["_CallBudget"]] = contextvars.ContextVar('tmp_command_budget', default=None)
+# 当前命令内的查询结果备忘：(函数名, 参数) -> 进行中或已完成的任务
+_COMMAND_MEMO: contextvars.ContextVar[Optional[Dict[Tuple[Any, ...], asyncio.Task]]] = contextvars.ContextVar('tmp_command_memo', default=None)
+
+
+def _deadline_remaining() -> Optional[float]:
+    deadline = _COMMAND_DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _enter_background_context() -> None:
+    """后台任务入口调用：以 background 优先级运行，且不继承创建者的命令截止时间。"""
+    _UPSTREAM_PRIORITY.set(UPSTREAM_PRIORITY_BACKGROUND)
+    _COMMAND_DEADLINE.set(None)
+    _COMMAND_BUDGET.set(None)
+    _COMMAND_MEMO.set(None)
+
+
+def _command_memoized(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """命令内备忘：同一命令执行期间以相同参数重复调用时复用首次调用（含其异常），命令结束即失效。
+
+    返回浅拷贝的 list/dict，调用方就地修改结果不会影响其他调用方。
+    """
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        memo = _COMMAND_MEMO.get()
+        if memo is None:
+            return await func(self, *args, **kwargs)
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            task = memo.get(key)
+        except TypeError:
+            return await func(self, *args, **kwargs)
+        if task is None:
+            task = asyncio.ensure_future(func(self, *args, **kwargs))
+            memo[key] = task
+        return _copy_shallow(await asyncio.shield(task))
+    return wrapper
+
+
+def _parse_command_values(raw: str) -> Dict[str, float]:
+    """解析 "查询=20,足迹=30" 形式的按命令配置，键可写命令词或路由名。"""
+    result: Dict[str, float] = {}
+    for part in re.split(r"[,，;；\s]+", raw or ""):
+        name, sep, value = part.partition("=")
+        name = name.strip()
+        if not sep or not name:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        m = _COMMAND_RE.match(name)
+        route = m.lastgroup if m else name
+        if route in _COMMAND_ROUTE_ORDER:
+            result[route] = seconds
+    return result
+
+
+class _PriorityScheduler:
+    """上游连接名额的优先级调度：空出的名额总是先交给更高优先级的等待者，
+    且低优先级不能占满全部名额（prefetch 预留 1 个、background 预留 2 个给交互命令）。
+
+    名额按任务可重入：已持有名额的任务再发请求时复用该名额，不会出现全部名额的持有者都在等待名额的自锁。
+    """
+
+    def __init__(self, capacity_fn: Callable[[], int]):
+        self._capacity_fn = capacity_fn
+        self._active = [0, 0, 0]
+        self._waiters: List["deque[asyncio.Future]"] = [deque(), deque(), deque()]
+        self._holders: Dict[Any, int] = {}
+
+    def enter_task(self, task: Any) -> bool:
+        """登记任务的一次请求；返回该任务此前是否已持有名额（为 True 时无需再申请）。"""
+        held = self._holders.get(task, 0)
+        self._holders[task] = held + 1
+        return held > 0
+
+    def leave_task(self, task: Any) -> None:
+        held = self._holders.get(task, 0) - 1
+        if held > 0:
+            self._holders[task] = held
+        else:
+            self._holders.pop(task, None)
+
+    def _limit(self, priority: int) -> int:
+        capacity = max(1, self._capacity_fn())
+        return max(1, capacity - priority)
+
+    def _has_waiters(self, upto: int) -> bool:
+        return any(f for p in range(upto + 1) for f in self._waiters[p] if not f.done())
+
+    def busy_above(self, priority: int) -> bool:
+        """是否有更高优先级的请求正在执行或排队。"""
+        return any(self._active[p] for p in range(priority)) or (priority > 0 and self._has_waiters(priority - 1))
+
+    async def acquire(self, priority: int) -> None:
+        if sum(self._active) < self._limit(priority) and not self._has_waiters(priority):
+            self._active[priority] += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(priority)
+            fut.cancel()
+            raise
+
+    def release(self, priority: int) -> None:
+        self._active[priority] = max(0, self._active[priority] - 1)
+        for p in range(len(self._waiters)):
+            queue = self._waiters[p]
+            while queue and sum(self._active) < self._limit(p):
+                fut = queue.popleft()
+                if fut.done():
+                    continue
+                self._active[p] += 1
+                fut.set_result(None)
+            if any(not f.done() for f in queue):
+                # 高优先级仍在排队时不越级放行低优先级
+                return
+
+    async def wait_higher_idle(self, priority: int, poll: float = 0.05) -> None:
+        """后台任务在消耗限额（如翻译 QPS）前调用，让路给更高优先级的请求。"""
+        while self.busy_above(priority):
+            await asyncio.sleep(poll)
+
+
+class _CallBudget:
+    """单条命令的上游调用预算：统计调用次数、各主机分布与并行峰值，超出上限后拒绝后续调用。"""
+
+    __slots__ = ('route', 'limit', 'used', 'denied', 'inflight', 'peak', 'hosts')
+
+    def __init__(self, route: str, limit: Optional[int]):
+        self.route = route
+        self.limit = limit
+        self.used = 0
+        self.denied = 0
+        self.inflight = 0
+        self.peak = 0
+        self.hosts: Counter = Counter()
+
+    def take(self, url: str) -> bool:
+        if self.limit is not None and self.used >= self.limit:
+            self.denied += 1
+            return False
+        self.used += 1
+        self.hosts[urlsplit(str(url)).hostname or '?'] += 1
+        return True
+
+    def enter(self) -> None:
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+
+    def exit(self) -> None:
+        self.inflight -= 1
+
+
+# 上游扇出累计统计写入日志的间隔（秒）
+FANOUT_SUMMARY_INTERVAL_SECONDS = 3600.0
+
+
+class _FanoutStats:
+    """按命令累计上游扇出：执行次数、调用总数、单次最大调用数、多调用命令数与预算耗尽次数，
+    以及首条回复耗时（渐进回复的关键指标）。汇总按 summary_due 的间隔写入日志。"""
+
+    def __init__(self, summary_interval: float = FANOUT_SUMMARY_INTERVAL_SECONDS):
+        self._by_route: Dict[str, Dict[str, int]] = {}
+        self._summary_interval = summary_interval
+        self._last_summary = time.monotonic()
+
+    def record(self, budget: _CallBudget, first_reply_seconds: Optional[float] = None) -> None:
+        s = self._by_route.setdefault(budget.route, {'commands': 0, 'calls': 0, 'max_calls': 0, 'multi_call': 0, 'budget_exhausted': 0, 'max_parallel': 0,
+                                                     'replied': 0, 'first_reply_ms_total': 0, 'first_reply_ms_max': 0})
+        s['commands'] += 1
+        if first_reply_seconds is not None:
+            ms = int(first_reply_seconds * 1000)
+            s['replied'] += 1
+            s['first_reply_ms_total'] += ms
+            s['first_reply_ms_max'] = max(s['first_reply_ms_max'], ms)
+        s['calls'] += budget.used
+        s['max_calls'] = max(s['max_calls'], budget.used)
+        s['max_parallel'] = max(s['max_parallel'], budget.peak)
+        if budget.used > 1:
+            s['multi_call'] += 1
+        if budget.denied:
+            s['budget_exhausted'] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {route: dict(s) for route, s in self._by_route.items()}
+
+    def summary_due(self) -> bool:
+        """距上次汇总已超过间隔时返回 True 并重新计时。"""
+        now = time.monotonic()
+        if not self._by_route or now - self._last_summary < self._summary_interval:
+            return False
+        self._last_summary = now
+        return True
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for route, s in sorted(self.snapshot().items()):
+            avg_calls = s['calls'] / s['commands'] if s['commands'] else 0.0
+            avg_first = f"{s['first_reply_ms_total'] / s['replied']:.0f}ms" if s['replied'] else "-"
+            lines.append(
+                f"{route}: 执行 {s['commands']} 次, 平均调用 {avg_calls:.1f}, 最多 {s['max_calls']}, "
+                f"并行峰值 {s['max_parallel']}, 预算耗尽 {s['budget_exhausted']} 次, "
+                f"首条回复 平均 {avg_first} / 最慢 {s['first_reply_ms_max']}ms"
+            )
+        return lines
+
+
+class _ScheduledRequest:
+    """在进入 aiohttp 请求上下文前先取得调度名额，退出时归还；
+    命令设有截止时间时，排队与请求超时都不会超过剩余时间。"""
+
+    __slots__ = ('_scheduler', '_priority', '_factory', '_cm', '_url', '_budget', '_task', '_reentrant')
+
+    def __init__(self, scheduler: _PriorityScheduler, priority: int, factory: Callable[[Optional[float]], Any], url: str = ''):
+        self._scheduler = scheduler
+        self._priority = priority
+        self._factory = factory
+        self._cm = None
+        self._url = url
+        self._budget = _COMMAND_BUDGET.get()
+        self._task = None
+        self._reentrant = False
+
+    async def __aenter__(self):
+        remaining = _deadline_remaining()
+        if remaining is not None and remaining <= 0:
+            raise CommandDeadlineExceeded("命令已超过截止时间")
+        if self._budget is not None and not self._budget.take(self._url):
+            raise CommandBudgetExceeded(f"命令 {self._budget.route} 的上游调用预算({self._budget.limit})已用完")
+        self._task = asyncio.current_task()
+        self._reentrant = self._scheduler.enter_task(self._task)
+        try:
+            if not self._reentrant:
+                await self._acquire(remaining)
+        except BaseException:
+            self._scheduler.leave_task(self._task)
+            raise
+        if self._budget is not None:
+            self._budget.enter()
+        try:
+            self._cm = self._factory(_deadline_remaining())
+            return await self._cm.__aenter__()
+        except BaseException:
+            self._cm = None
+            self._release()
+            raise
+
+    async def _acquire(self, remaining: Optional[float]) -> None:
+        if remaining is None:
+            await self._scheduler.acquire(self._priority)
+            return
+        try:
+            await asyncio.wait_for(self._scheduler.acquire(self._priority), remaining)
+        except asyncio.TimeoutError:
+            raise CommandDeadlineExceeded("等待上游请求名额超过命令截止时间") from None
+
+    def _release(self) -> None:
+        if self._budget is not None:
+            self._budget.exit()
+        self._scheduler.leave_task(self._task)
+        if not self._reentrant:
+            self._scheduler.release(self._priority)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self._cm.__aexit__(exc_type, exc, tb)
+        finally:
+            self._release()
+
+
+class _ScheduledSession:
+    """包装 aiohttp.ClientSession：get/post/request 按当前上下文的优先级排队，其余属性原样转发。"""
+
+    def __init__(self, session: Any, scheduler: _PriorityScheduler):
+        self._session = session
+        self._scheduler = scheduler
+
+    def request(self, method: str, url: str, **kwargs) -> _ScheduledRequest:
+        def factory(remaining: Optional[float]) -> Any:
+            if remaining is not None:
+                if remaining <= 0:
+                    raise CommandDeadlineExceeded("命令已超过截止时间")
+                timeout = kwargs.get('timeout')
+                current = timeout.total if isinstance(timeout, aiohttp.ClientTimeout) else timeout
+                if current is None or current > remaining:
+                    kwargs['timeout'] = aiohttp.ClientTimeout(total=remaining)
+            return self._session.request(method, url, **kwargs)
+        return _ScheduledRequest(self._scheduler, _UPSTREAM_PRIORITY.get(), factory, url)
+
+    def get(self, url: str, **kwargs) -> _ScheduledRequest:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _ScheduledRequest:
+        return self.request('POST', url, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+
+# --- 并发扇出 ---
+# 查询命令中可选数据源的软超时（秒），从扇出开始计时；超时的部分标记为暂不可用
+QUERY_SOURCE_TIMEOUT_DEFAULTS: Dict[str, float] = {'bans': 4.0, 'online': 3.0, 'stats': 5.0}
+SOURCE_UNAVAILABLE_TEXT = "暂不可用"
+# 批量查询每名玩家的上游调用数（基本资料、在线状态、里程），用于推算批量查询的默认调用上限
+BATCH_QUERY_CALLS_PER_PLAYER = 3
+
+
+async def _fan_out(required: Dict[str, Awaitable[Any]], optional: Dict[str, Awaitable[Any]],
+                   soft_timeouts: Dict[str, float]) -> Tuple[Dict[str, Any], Dict[str, Any], set]:
+    """结构化并发：所有来源同时开始。
+
+    必需来源任一失败时立即取消其余来源并抛出该异常；必需来源全部完成后，
+    可选来源各自等到软超时为止，超时或失败的来源被取消并记入返回的不可用集合。
+    返回 (必需结果, 可选结果, 不可用的可选来源名)。
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    req_tasks = {name: asyncio.ensure_future(aw) for name, aw in required.items()}
+    opt_tasks = {name: asyncio.ensure_future(aw) for name, aw in optional.items()}
+    everything = list(req_tasks.values()) + list(opt_tasks.values())
+    try:
+        pending = set(req_tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+            for t in done:
+                if t.exception() is not None:
+                    raise t.exception()
+        req_results = {name: t.result() for name, t in req_tasks.items()}
+        opt_results: Dict[str, Any] = {}
+        unavailable = set()
+        for name, t in sorted(opt_tasks.items(), key=lambda kv: soft_timeouts.get(kv[0], 0.0)):
+            remaining = started + soft_timeouts.get(name, 0.0) - loop.time()
+            if not t.done() and remaining > 0:
+                await asyncio.wait({t}, timeout=remaining)
+            if not t.done():
+                unavailable.add(name)
+                logger.info(f"并发扇出: {name} 超过软超时 {soft_timeouts.get(name, 0.0)}s，标记为暂不可用")
+            elif t.exception() is not None:
+                unavailable.add(name)
+                logger.info(f"并发扇出: {name} 失败，标记为暂不可用: {t.exception()}")
+            else:
+                opt_results[name] = t.result()
+        return req_results, opt_results, unavailable
+    finally:
+        for t in everything:
+            if not t.done():
+                t.cancel()
+            elif not t.cancelled():
+                # 取出异常，避免未检索异常的告警
+                t.exception()
+
+
+# --- 车队成员名册缓存 ---
+VTC_ROSTER_MAX_ENTRIES = 256
+
+
+def _member_role_map(members: Any) -> Dict[str, str]:
+    """把 VTCM memberAll/role 返回的成员列表整理为 tmpId -> 角色名。"""
+    roles: Dict[str, str] = {}
+    if not isinstance(members, list):
+        return roles
+    for m in members:
+        if not isinstance(m, dict):
+            continue
+        member_tmp = m.get('tmpId') or m.get('tmp_id') or m.get('tmpIdStr') or m.get('tmpid') or m.get('tmpID')
+        role = m.get('role') or m.get('roleName') or m.get('position') or m.get('name') or m.get('post')
+        if member_tmp and role:
+            roles.setdefault(str(member_tmp), str(role))
+    return roles
+
+
+class _VtcRosterCache:
+    """按车队缓存成员名册（成员 -> 角色）等车队级数据：按有效期刷新，同一键并发加载只请求一次。
+
+    加载函数返回 None 表示加载失败，不写入缓存。
+    """
+
+    def __init__(self, ttl_fn: Callable[[], float], max_entries: int = VTC_ROSTER_MAX_ENTRIES):
+        self._ttl_fn = ttl_fn
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[Any, float]]" = OrderedDict()
+        self._loading: Dict[Tuple[Any, ...], asyncio.Task] = {}
+
+    async def get(self, key: Tuple[Any, ...], loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self._ttl_fn():
+            self._entries.move_to_end(key)
+            return entry[0]
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._loading[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Tuple[Any, ...], loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            if value is not None and self._ttl_fn() > 0:
+                self._entries[key] = (value, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            self._loading.pop(key, None)
+
+
+# --- 在线状态：fullmap 优先 ---
+# 位置补充信息（最近地点、国家）按坐标网格缓存，网格边长为游戏坐标单位
+ONLINE_ENRICH_GRID = 500.0
+ONLINE_ENRICH_TTL_SECONDS = 3600.0
+ONLINE_ENRICH_MAX_ENTRIES = 4096
+# 补充信息请求的等待上限（秒），超时则只返回 fullmap 给出的在线结论
+ONLINE_ENRICH_TIMEOUT_SECONDS = 2.0
+_ONLINE_SERVER_FIELDS = ('serverName', 'game', 'serverDetailsId', 'apiServerId', 'serverCode')
+_ONLINE_PLACE_FIELDS = ('city', 'country', 'realName')
+
+
+def _index_fullmap_players(data: Any) -> Dict[str, Dict[str, Any]]:
+    """fullmap 快照按 TMP ID 建立索引。"""
+    payload = None
+    if isinstance(data, dict):
+        payload = data.get('Data') or data.get('data') or data.get('players')
+    index: Dict[str, Dict[str, Any]] = {}
+    if not isinstance(payload, list):
+        return index
+    for p in payload:
+        if not isinstance(p, dict):
+            continue
+        mp_id = p.get('MpId') or p.get('mp_id') or p.get('tmpId') or p.get('tmp_id')
+        if mp_id is not None:
+            index.setdefault(str(mp_id), p)
+    return index
+
+
+class _OnlineEnrichmentCache:
+    """Trucky 在线状态中的补充信息：服务器名称等按服务器 ID 缓存，最近地点按 (服务器 ID, 量化坐标) 缓存。"""
+
+    def __init__(self, grid: float = ONLINE_ENRICH_GRID, ttl: float = ONLINE_ENRICH_TTL_SECONDS,
+                 max_entries: int = ONLINE_ENRICH_MAX_ENTRIES):
+        self._grid = grid
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._servers: Dict[str, Dict[str, Any]] = {}
+        self._places: "OrderedDict[Tuple[str, int, int], Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    def place_key(self, server_id: Any, x: Any, y: Any) -> Optional[Tuple[str, int, int]]:
+        try:
+            return str(server_id), int(float(x) // self._grid), int(float(y) // self._grid)
+        except (TypeError, ValueError):
+            return None
+
+    def server(self, server_id: Any) -> Dict[str, Any]:
+        return self._servers.get(str(server_id)) or {}
+
+    def place(self, key: Optional[Tuple[str, int, int]]) -> Optional[Dict[str, Any]]:
+        entry = self._places.get(key) if key else None
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] >= self._ttl:
+            del self._places[key]
+            return None
+        self._places.move_to_end(key)
+        return entry[0]
+
+    def remember(self, key: Optional[Tuple[str, int, int]], status: Dict[str, Any]) -> None:
+        """从一次 Trucky 在线结果中记下服务器与地点信息。"""
+        server_id = status.get('serverId')
+        if server_id is not None:
+            self._servers[str(server_id)] = {k: status.get(k) for k in _ONLINE_SERVER_FIELDS}
+        if key:
+            self._places[key] = ({k: status.get(k) for k in _ONLINE_PLACE_FIELDS}, time.monotonic())
+            self._places.move_to_end(key)
+            while len(self._places) > self._max_entries:
+                self._places.popitem(last=False)
+
+
+# --- 玩家资料聚合缓存 ---
+# 各字段组的默认有效期（秒）：基本资料几乎不变，封禁状态与上次在线按分钟、封禁记录按半小时、里程按分钟、在线状态按秒变化
+PLAYER_PROFILE_TTL_DEFAULTS: Dict[str, float] = {'info': 21600.0, 'status': 300.0, 'bans': 1800.0, 'stats': 180.0, 'online': 15.0}
+# 刷新失败时允许继续使用过期值的字段组（在线状态过期后不再可信）
+PLAYER_PROFILE_STALE_IF_ERROR = frozenset({'info', 'status', 'bans', 'stats'})
+# 基本资料中随时间变化的字段（封禁状态、封禁次数、上次在线），单独作为 status 组按较短有效期刷新
+PLAYER_INFO_STATUS_FIELDS = ('banned', 'bannedUntil', 'bansCount', 'lastOnline')
+PLAYER_PROFILE_MAX_ENTRIES = 2048
+# 共享刷新自身的截止时长（秒），上游卡住时不会无限期占住同一次刷新
+PLAYER_PROFILE_REFRESH_TIMEOUT_SECONDS = 15.0
+
+
+def _parse_named_values(raw: str, defaults: Dict[str, float]) -> Dict[str, float]:
+    """解析 "info=21600,online=15" 形式的配置，只接受 defaults 中已有的名称，未列出的沿用默认值。"""
+    values = dict(defaults)
+    for part in re.split(r"[,，;；\s]+", raw or ""):
+        name, sep, value = part.partition("=")
+        name = name.strip().lower()
+        if not sep or name not in values:
+            continue
+        try:
+            values[name] = max(0.0, float(value))
+        except ValueError:
+            continue
+    return values
+
+
+class _ProfileField:
+    __slots__ = ('value', 'fetched_at', 'task')
+
+    def __init__(self):
+        self.value: Any = None
+        self.fetched_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class _PlayerProfile:
+    """单个玩家的聚合资料：每个字段组（info/bans/stats/online）独立记录取值时间与进行中的刷新。"""
+
+    __slots__ = ('tmp_id', 'fields')
+
+    def __init__(self, tmp_id: str):
+        self.tmp_id = tmp_id
+        self.fields: Dict[str, _ProfileField] = {}
+
+
+class _PlayerProfileCache:
+    """按 TMP ID 缓存 PlayerProfile；字段组按各自有效期单独刷新，同一字段组的并发刷新只发一次请求。"""
+
+    def __init__(self, ttls_fn: Callable[[], Dict[str, float]], max_entries: int = PLAYER_PROFILE_MAX_ENTRIES):
+        self._ttls_fn = ttls_fn
+        self._max_entries = max_entries
+        self._profiles: "OrderedDict[str, _PlayerProfile]" = OrderedDict()
+
+    def _profile(self, tmp_id: str) -> _PlayerProfile:
+        profile = self._profiles.get(tmp_id)
+        if profile is None:
+            profile = self._profiles[tmp_id] = _PlayerProfile(tmp_id)
+            while len(self._profiles) > self._max_entries:
+                self._profiles.popitem(last=False)
+        else:
+            self._profiles.move_to_end(tmp_id)
+        return profile
+
+    async def get(self, tmp_id: str, group: str, fetch: Callable[[str], Awaitable[Any]],
+                  cacheable: Callable[[Any], bool] = lambda v: True) -> Any:
+        tmp_id = str(tmp_id)
+        profile = self._profile(tmp_id)
+        f = profile.fields.get(group)
+        if f is None:
+            f = profile.fields[group] = _ProfileField()
+        ttl = self._ttls_fn().get(group, 0.0)
+        now = time.monotonic()
+        if f.fetched_at is not None and now - f.fetched_at < ttl:
+            return _copy_shallow(f.value)
+        if f.task is None or f.task.done():
+            # 刷新由多个命令共享：上游调用计入发起刷新的命令的预算，截止时间使用刷新自身的时限，
+            # 不继承首个调用方的截止时间（其超时不应让其他等待者一起失败）
+            refresh_ctx = contextvars.Context()
+            refresh_ctx.run(_COMMAND_BUDGET.set, _COMMAND_BUDGET.get())
+            refresh_ctx.run(_COMMAND_DEADLINE.set, time.monotonic() + PLAYER_PROFILE_REFRESH_TIMEOUT_SECONDS)
+            f.task = refresh_ctx.run(
+                asyncio.ensure_future, self._refresh(f, group, tmp_id, fetch, cacheable, ttl > 0)
+            )
+        # 每个调用方只等到自己的截止时间
+        remaining = _deadline_remaining()
+        if remaining is None:
+            return _copy_shallow(await asyncio.shield(f.task))
+        if remaining <= 0:
+            raise CommandDeadlineExceeded("命令已超过截止时间")
+        try:
+            value = await asyncio.wait_for(asyncio.shield(f.task), remaining)
+        except asyncio.TimeoutError:
+            if f.task.done():
+                raise
+            raise CommandDeadlineExceeded(f"等待玩家资料 {tmp_id}.{group} 超过命令截止时间") from None
+        return _copy_shallow(value)
+
+    def prime(self, tmp_id: str, group: str, value: Any) -> None:
+        """用其他字段组顺带取得的数据填充该组，省去一次单独刷新。"""
+        if self._ttls_fn().get(group, 0.0) <= 0:
+            return
+        f = self._profile(str(tmp_id)).fields.setdefault(group, _ProfileField())
+        f.value = value
+        f.fetched_at = time.monotonic()
+
+    @staticmethod
+    async def _refresh(f: _ProfileField, group: str, tmp_id: str, fetch: Callable[[str], Awaitable[Any]],
+                       cacheable: Callable[[Any], bool], store: bool) -> Any:
+        stale_ok = group in PLAYER_PROFILE_STALE_IF_ERROR and f.fetched_at is not None
+        try:
+            value = await fetch(tmp_id)
+        except PlayerNotFoundException:
+            raise
+        except Exception as e:
+            if stale_ok:
+                logger.info(f"玩家资料 {tmp_id}.{group} 刷新失败，沿用过期数据: {e}")
+                return f.value
+            raise
+        if cacheable(value):
+            if store:
+                f.value = value
+                f.fetched_at = time.monotonic()
+        elif stale_ok:
+            logger.info(f"玩家资料 {tmp_id}.{group} 刷新未取得有效数据，沿用过期数据")
+            return f.value
+        return value
+
+
+TRUCKY_OFFLINE_DEBUG = 'Trucky V3 API 响应判断为离线。'
+
+
+def _online_status_cacheable(status: Dict) -> bool:
+    """只缓存 Trucky 明确给出的在线/离线结论，请求失败的结果不缓存。"""
+    return bool(status.get('online')) or status.get('debug_error') == TRUCKY_OFFLINE_DEBUG
+
+
+def _copy_shallow(value: Any) -> Any:
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+# -----------------------------
+
+
+# 自定义异常类 
+class TmpApiException(Exception):
+    """TMP 相关异常的基类"""
+    pass
+
+class PlayerNotFoundException(TmpApiException):
+    """玩家不存在异常"""
+    pass
+
+class SteamIdNotFoundException(TmpApiException):
+    """Steam ID 未绑定 TMP 账号异常"""
+    pass
+
+class NetworkException(Exception):
+    """网络请求异常"""
+    pass
+
+class ApiResponseException(TmpApiException):
+    """API响应异常"""
+    pass
+
+class CommandDeadlineExceeded(asyncio.TimeoutError):
+    """命令截止时间已到；继承 TimeoutError，沿用各接口原有的超时处理"""
+    pass
+
+class CommandBudgetExceeded(NetworkException):
+    """命令的上游调用预算已用完"""
+    pass
+
+
+# --- 异步文件 I/O ---
+# 插件文件读写所用线程数；登记文件的变更轮询间隔秒数
+FILE_IO_MAX_WORKERS = 2
+FILE_WATCH_INTERVAL_SECONDS = 5.0
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """文件的 (mtime_ns, size)，文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_json_file(path: str) -> Any:
+    """读取 JSON 文件，文件不存在时返回 None。"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class _WatchedFile:
+    __slots__ = ('path', 'loader', 'callbacks', 'value', 'signature', 'loaded')
+
+    def __init__(self, path: str, loader: Optional[Callable[[str], Any]]):
+        self.path = path
+        self.loader = loader
+        self.callbacks: List[Callable[[Optional[Tuple[int, int]]], Awaitable[None]]] = []
+        self.value: Any = None
+        self.signature: Optional[Tuple[int, int]] = None
+        self.loaded = False
+
+
+class _AsyncFileIO:
+    """插件的文件读写统一交给线程池执行，避免慢磁盘阻塞事件循环；登记过的文件定期轮询，只在变化时重新加载。"""
+
+    def __init__(self, max_workers: int = FILE_IO_MAX_WORKERS, watch_interval: float = FILE_WATCH_INTERVAL_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tmp-bot-io")
+        self._watch_interval = watch_interval
+        self._watched: Dict[str, _WatchedFile] = {}
+        self._watch_task: Optional[asyncio.Task] = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def watch(self, path: str, loader: Optional[Callable[[str], Any]] = None,
+              on_change: Optional[Callable[[Optional[Tuple[int, int]]], Awaitable[None]]] = None) -> None:
+        """登记需要监视的文件。loader 用于缓存文件内容，on_change 在文件变化时收到新的文件签名。"""
+        w = self._watched.get(path)
+        if w is None:
+            w = _WatchedFile(path, loader)
+            self._watched[path] = w
+        elif loader is not None and w.loader is None:
+            w.loader = loader
+        if on_change is not None:
+            w.callbacks.append(on_change)
+
+    async def get(self, path: str, loader: Callable[[str], Any] = _read_json_file) -> Any:
+        """返回文件的缓存内容，首次访问时加载并开始监视。"""
+        w = self._watched.get(path)
+        if w is None or w.loader is None:
+            self.watch(path, loader)
+            w = self._watched[path]
+        if not w.loaded:
+            await self._refresh(w, notify=False)
+        return w.value
+
+    async def _refresh(self, w: _WatchedFile, notify: bool) -> None:
+        signature = await self.run(_file_signature, w.path)
+        if w.loaded and signature == w.signature:
+            return
+        if w.loader is not None:
+            try:
+                w.value = await self.run(w.loader, w.path) if signature is not None else None
+            except Exception as e:
+                logger.error(f"读取文件失败 {w.path}: {e}")
+                # 文件可能正在被写入，保留旧签名以便下一轮重试
+                if w.loaded:
+                    return
+                w.value = None
+        changed = w.loaded
+        w.signature = signature
+        w.loaded = True
+        if notify and changed:
+            for cb in list(w.callbacks):
+                try:
+                    await cb(signature)
+                except Exception as e:
+                    logger.error(f"文件变更回调失败 {w.path}: {e}")
+
+    async def start_watching(self) -> None:
+        """记录已登记文件的当前状态作为基线，然后开始轮询。"""
+        for w in list(self._watched.values()):
+            if not w.loaded:
+                await self._refresh(w, notify=False)
+        if self._watch_task and not self._watch_task.done():
+            return
+        self._watch_task = asyncio.create_task(self._watch_loop())
+
+    async def _watch_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._watch_interval)
+            for w in list(self._watched.values()):
+                try:
+                    await self._refresh(w, notify=True)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"文件监视异常 {w.path}: {e}")
+
+    async def close(self) -> None:
+        if self._watch_task and not self._watch_task.done():
+            self._watch_task.cancel()
+        self._watch_task = None
+        self._executor.shutdown(wait=False)
+
+
+async def _run_file_io(io: Optional[_AsyncFileIO], func: Callable[..., Any], *args: Any) -> Any:
+    """有 I/O 线程池时在线程中执行，否则（如初始化前）直接同步执行。"""
+    if io is not None:
+        return await io.run(func, *args)
+    return func(*args)
+
+
+# --- 绑定数据存储 ---
+# 修改后延迟合并写盘的秒数
+BIND_FLUSH_DELAY_SECONDS = 2.0
+# 写盘失败后重试间隔逐次翻倍的上限（秒）
+BIND_FLUSH_MAX_RETRY_SECONDS = 300.0
+
+
+class _BindingStore:
+    """绑定数据的内存存储：启动后只加载一次，修改由锁串行化，写盘延迟合并并通过临时文件原子替换。"""
+
+    label = "绑定数据"
+
+    def __init__(self, path: str, io: Optional[_AsyncFileIO] = None, flush_delay: float = BIND_FLUSH_DELAY_SECONDS):
+        self.path = path
+        self._io = io
+        self._flush_delay = flush_delay
+        self._data: Dict[str, Any] = {}
+        self._loaded = False
+        self._signature: Optional[Tuple[int, int]] = None
+        self._dirty = False
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        # 连续写盘失败次数，非零时修改改为同步写盘，以便如实报告失败
+        self._flush_failures = 0
+        self._closed = False
+
+    def _read_file(self) -> Dict[str, Any]:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                return data if isinstance(data, dict) else {}
+            return {}
+        except Exception as e:
+            logger.error(f"加载{self.label}失败: {e}")
+            return {}
+
+    def _read_with_signature(self) -> Tuple[Dict[str, Any], Optional[Tuple[int, int]]]:
+        signature = _file_signature(self.path)
+        return self._read_file(), signature
+
+    async def load(self) -> None:
+        if self._loaded:
+            return
+        data, signature = await _run_file_io(self._io, self._read_with_signature)
+        if not self._loaded:
+            self._data, self._signature = data, signature
+            self._loaded = True
+
+    async def on_file_changed(self, signature: Optional[Tuple[int, int]]) -> None:
+        """文件监视回调：忽略自身写盘引起的变化，外部修改时重新加载。"""
+        async with self._lock:
+            if signature == self._signature:
+                return
+            if self._dirty:
+                # 本地还有未落盘的修改，以内存为准，下次写盘会覆盖外部修改
+                logger.info(f"{self.label}文件被外部修改，但存在未写盘的修改，保留内存数据")
+                self._signature = signature
+                return
+            self._data, self._signature = await _run_file_io(self._io, self._read_with_signature)
+            self._loaded = True
+        logger.info(f"检测到{self.label}文件被外部修改，已重新加载")
+
+    # JSON 文件按用户 ID 平铺存储，不区分平台，platform 参数仅为与 SQLite 后端保持接口一致
+    async def get(self, user_id: str, platform: str = '') -> Any:
+        await self.load()
+        return self._data.get(user_id)
+
+    async def get_many(self, user_ids: List[str], platform: str = '') -> Dict[str, Any]:
+        await self.load()
+        return {uid: self._data[uid] for uid in user_ids if uid in self._data}
+
+    async def users_for_tmp_id(self, tmp_id: str) -> List[Tuple[str, str]]:
+        """反查绑定到 tmp_id 的 (platform, user_id)；JSON 文件不记录平台，platform 恒为空串。"""
+        await self.load()
+        target = str(tmp_id)
+        users: List[Tuple[str, str]] = []
+        for uid, b in self._data.items():
+            bound = b.get('tmp_id') if isinstance(b, dict) else b
+            if str(bound) == target:
+                users.append(('', uid))
+        return users
+
+    async def set(self, user_id: str, value: Any, platform: str = '') -> bool:
+        await self.load()
+        async with self._lock:
+            self._data[user_id] = value
+            self._mark_dirty()
+        if self._flush_failures:
+            return await self.flush()
+        return True
+
+    async def delete(self, user_id: str, platform: str = '') -> bool:
+        await self.load()
+        async with self._lock:
+            if user_id not in self._data:
+                return False
+            del self._data[user_id]
+            self._mark_dirty()
+        if self._flush_failures:
+            return await self.flush()
+        return True
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        delay = self._flush_delay
+        while True:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                return
+            if await self.flush():
+                return
+            # 写盘失败：按指数退避重试，避免未落盘的修改被静默丢弃
+            delay = min(max(delay, 1.0) * 2, BIND_FLUSH_MAX_RETRY_SECONDS)
+            logger.info(f"{self.label}尚有未保存的修改，{delay:.0f} 秒后重试写盘")
+
+    def _write_file(self, data: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return _file_signature(self.path)
+
+    async def flush(self) -> bool:
+        """立即把未落盘的修改写入文件。"""
+        async with self._lock:
+            if not self._dirty:
+                return True
+            try:
+                self._signature = await _run_file_io(self._io, self._write_file, dict(self._data))
+            except Exception as e:
+                self._flush_failures += 1
+                logger.error(f"保存{self.label}失败（连续第 {self._flush_failures} 次）: {e}")
+                if not self._closed and (self._flush_task is None or self._flush_task.done()):
+                    self._flush_task = asyncio.create_task(self._flush_later())
+                return False
+            if self._flush_failures:
+                logger.info(f"{self.label}已恢复写盘")
+            self._flush_failures = 0
+            self._dirty = False
+            return True
+
+    async def close(self) -> None:
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        self._closed = True
+        if not await self.flush():
+            logger.error(f"{self.label}关闭时仍无法写盘，未保存的修改已丢失")
+
+
+class _SteamIdStore(_BindingStore):
+    """SteamID -> TMP ID 的持久映射（对应关系基本不会变化），从见到的每份玩家数据中补充。"""
+
+    label = "SteamID 映射"
+
+    async def tmp_id_for(self, steam_id: str) -> Optional[str]:
+        tmp_id = await self.get(str(steam_id))
+        return str(tmp_id) if tmp_id else None
+
+    async def remember(self, steam_id: Any, tmp_id: Any) -> None:
+        steam_id, tmp_id = str(steam_id or '').strip(), str(tmp_id or '').strip()
+        if not steam_id.isdigit() or not tmp_id.isdigit():
+            return
+        if await self.get(steam_id) != tmp_id:
+            await self.set(steam_id, tmp_id)
+
+
+# --- 头像磁盘缓存 ---
+AVATAR_CACHE_DIRNAME = 'avatar_cache'
+# 命中缓存时最近使用时间的刷新间隔（秒），避免每次命中都触发索引写盘
+AVATAR_TOUCH_INTERVAL_SECONDS = 300.0
+# 同时探测的头像地址变体数，避免一次未命中占满上游名额与命令调用预算
+AVATAR_PROBE_CONCURRENCY = 3
+_AVATAR_URL_RE = re.compile(r"https?://static\.truckersmp\.com/(avatarsN|avatars)/(\d+)(?:\.\d+)?\.(jpg|png)", re.IGNORECASE)
+
+
+def _avatar_candidates(base: Optional[str], tmp_id: Optional[str]) -> List[Tuple[str, str]]:
+    """TruckersMP 头像的候选地址变体，返回去重后的 (变体名, URL) 列表，变体名用于记住玩家可用的地址形式。"""
+    candidates: List[Tuple[str, str]] = []
+    if base:
+        candidates.append(('base', base))
+        # 切换 jpg/png
+        if base.lower().endswith('.jpg'):
+            candidates.append(('base_alt', base[:-4] + '.png'))
+        elif base.lower().endswith('.png'):
+            candidates.append(('base_alt', base[:-4] + '.jpg'))
+        # 解析 avatarsN/{id}.{stamp}.{ext} -> 生成多种组合
+        m = _AVATAR_URL_RE.search(base)
+        if m:
+            folder, pid, ext = m.group(1), m.group(2), m.group(3).lower()
+            alt_ext = 'png' if ext == 'jpg' else 'jpg'
+            other_folder = 'avatars' if folder.lower() == 'avatarsn' else 'avatarsN'
+            # 去掉时间戳；切到另一个目录
+            candidates.append(('folder', f"https://static.truckersmp.com/{folder}/{pid}.{ext}"))
+            candidates.append(('folder_alt', f"https://static.truckersmp.com/{folder}/{pid}.{alt_ext}"))
+            candidates.append(('other_folder', f"https://static.truckersmp.com/{other_folder}/{pid}.{ext}"))
+            candidates.append(('other_folder_alt', f"https://static.truckersmp.com/{other_folder}/{pid}.{alt_ext}"))
+    # 根据 tmp_id 追加常见直连地址
+    if tmp_id:
+        for ext in ('jpg', 'png'):
+            candidates.append((f'id_avatars_{ext}', f"https://static.truckersmp.com/avatars/{tmp_id}.{ext}"))
+            candidates.append((f'id_avatarsN_{ext}', f"https://static.truckersmp.com/avatarsN/{tmp_id}.{ext}"))
+    seen = set()
+    uniq: List[Tuple[str, str]] = []
+    for pattern, url in candidates:
+        if url in seen:
+            continue
+        seen.add(url)
+        uniq.append((pattern, url))
+    return uniq
+
+
+def _avatar_mime(content: bytes) -> str:
+    if content.startswith(b'\x89PNG'):
+        return 'image/png'
+    if content.startswith(b'GIF8'):
+        return 'image/gif'
+    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+# 头像请求函数：(url, 条件请求校验信息) -> (状态码, 内容, 新的校验信息)
+AvatarFetcher = Callable[[str, Dict[str, str]], Awaitable[Tuple[int, Optional[bytes], Dict[str, str]]]]
+
+
+async def _probe_avatar(candidates: List[Tuple[str, str]], fetch: AvatarFetcher,
+                        concurrency: int = AVATAR_PROBE_CONCURRENCY) -> Optional[Tuple[str, str, bytes, Dict[str, str]]]:
+    """按顺序并发探测候选地址（同时至多 concurrency 个，失败一个补一个），
+    返回第一个成功的 (变体名, URL, 内容, 校验信息) 并取消其余请求。"""
+    queue = deque(candidates)
+    tasks: Dict[asyncio.Future, Tuple[str, str]] = {}
+    pending: set = set()
+
+    def _start_more() -> None:
+        while queue and len(pending) < concurrency:
+            pattern, url = queue.popleft()
+            t = asyncio.ensure_future(fetch(url, {}))
+            tasks[t] = (pattern, url)
+            pending.add(t)
+
+    try:
+        _start_more()
+        while pending:
+            done, still = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.intersection_update(still)
+            for t in done:
+                if t.cancelled() or t.exception() is not None:
+                    continue
+                status, content, validators = t.result()
+                if status == 200 and content:
+                    pattern, url = tasks[t]
+                    return pattern, url, content, validators
+            _start_more()
+        return None
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+
+class _AvatarCache(_BindingStore):
+    """头像磁盘缓存：图片按内容哈希存放，索引（本存储的数据）记录每个玩家可用的头像地址变体与 ETag/Last-Modified。
+
+    超过重新校验间隔后对已知地址发条件请求，304 直接续期，请求失败时继续使用旧图；
+    头像地址变化或首次获取时先试已知可用的变体，再并发探测其余变体；总大小超限时按最近使用淘汰。
+    """
+
+    label = "头像缓存索引"
+
+    def __init__(self, directory: str, io: Optional[_AsyncFileIO], max_bytes_fn: Callable[[], int],
+                 revalidate_fn: Callable[[], float]):
+        super().__init__(os.path.join(directory, 'index.json'), io)
+        self.directory = directory
+        self._max_bytes_fn = max_bytes_fn
+        self._revalidate_fn = revalidate_fn
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.img")
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_blob(self, digest: str, content: bytes) -> None:
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _remove_blob(self, digest: str) -> None:
+        try:
+            os.remove(self._blob_path(digest))
+        except OSError:
+            pass
+
+    def _sweep_blobs(self, referenced: set) -> int:
+        """删除索引未引用的图片文件（含写入中断留下的临时文件），返回删除数。"""
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            if not (name.endswith('.img') or name.endswith('.img.tmp')):
+                continue
+            if name.endswith('.img') and name[:-4] in referenced:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _referenced(self) -> set:
+        return {e['hash'] for e in self._data.values() if isinstance(e, dict) and e.get('hash')}
+
+    async def load(self) -> None:
+        if self._loaded:
+            return
+        await super().load()
+        removed = await _run_file_io(self._io, self._sweep_blobs, self._referenced())
+        if removed:
+            logger.info(f"头像缓存: 清理了 {removed} 个未被索引引用的文件")
+
+    async def fetch(self, key: str, source: str, candidates: List[Tuple[str, str]], fetch: AvatarFetcher) -> Optional[bytes]:
+        """取玩家头像字节；source 为玩家资料中的头像地址，变化即视为换了头像。同一玩家并发获取只处理一次。"""
+        await self.load()
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, source, candidates, fetch))
+            self._pending[key] = task
+            task.add_done_callback(lambda _t: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, source: str, candidates: List[Tuple[str, str]], fetch: AvatarFetcher) -> Optional[bytes]:
+        # 头像是回复的附加内容，让路给正文所需的请求
+        _UPSTREAM_PRIORITY.set(UPSTREAM_PRIORITY_PREFETCH)
+        entry = self._data.get(key)
+        entry = entry if isinstance(entry, dict) else None
+        cached = await _run_file_io(self._io, self._read_blob, entry['hash']) if entry and entry.get('hash') else None
+        now = time.time()
+        if cached is not None and entry.get('source') == source:
+            if now - float(entry.get('checked') or 0) < self._revalidate_fn():
+                if now - float(entry.get('used') or 0) >= AVATAR_TOUCH_INTERVAL_SECONDS:
+                    await self._update(key, used=now)
+                return cached
+            fresh = await self._revalidate(key, entry, fetch)
+            return fresh if fresh is not None else cached
+        hit = None
+        remembered = entry.get('pattern') if entry else None
+        first = [c for c in candidates if c[0] == remembered]
+        if first:
+            hit = await _probe_avatar(first, fetch)
+        if hit is None:
+            rest = [c for c in candidates if c[0] != remembered]
+            hit = await _probe_avatar(rest, fetch) if rest else None
+        if hit is None:
+            logger.info(f"头像下载失败: 全部 {len(candidates)} 个地址变体均不可用 key={key}")
+            return cached
+        pattern, url, content, validators = hit
+        await self._store(key, {'source': source, 'pattern': pattern, 'url': url}, content, validators)
+        return content
+
+    async def _revalidate(self, key: str, entry: Dict[str, Any], fetch: AvatarFetcher) -> Optional[bytes]:
+        validators = {k: entry[k] for k in ('etag', 'last_modified') if entry.get(k)}
+        try:
+            status, content, new_validators = await fetch(entry['url'], validators)
+        except Exception as e:
+            logger.info(f"头像重新校验失败，继续使用缓存: url={entry.get('url')} err={e}")
+            return None
+        if status == 304:
+            now = time.time()
+            await self._update(key, checked=now, used=now)
+            return None
+        if status == 200 and content:
+            await self._store(key, {k: entry.get(k) for k in ('source', 'pattern', 'url')}, content, new_validators)
+            return content
+        return None
+
+    async def _update(self, key: str, **fields: Any) -> None:
+        async with self._lock:
+            entry = self._data.get(key)
+            if isinstance(entry, dict):
+                self._data[key] = {**entry, **fields}
+                self._mark_dirty()
+
+    async def _store(self, key: str, meta: Dict[str, Any], content: bytes, validators: Dict[str, str]) -> None:
+        digest = hashlib.sha256(content).hexdigest()
+        try:
+            await _run_file_io(self._io, self._write_blob, digest, content)
+        except Exception as e:
+            logger.error(f"保存头像缓存失败: {e}")
+            return
+        now = time.time()
+        entry = dict(meta, hash=digest, size=len(content), checked=now, used=now,
+                     etag=validators.get('etag') or '', last_modified=validators.get('last_modified') or '')
+        async with self._lock:
+            previous = self._data.get(key)
+            self._data[key] = entry
+            self._mark_dirty()
+            orphans = self._evict(keep=key)
+            # 头像变化后旧图片不再被任何玩家引用时一并删除
+            old_digest = previous.get('hash') if isinstance(previous, dict) else None
+            if old_digest and old_digest != digest and old_digest not in self._referenced() and old_digest not in orphans:
+                orphans.append(old_digest)
+        for d in orphans:
+            await _run_file_io(self._io, self._remove_blob, d)
+
+    def _evict(self, keep: str) -> List[str]:
+        """按最近使用时间淘汰索引项直到总大小不超过上限，返回已无引用的图片哈希。调用方持有锁。"""
+        sizes: Dict[str, int] = {}
+        refs: Counter = Counter()
+        for entry in self._data.values():
+            if isinstance(entry, dict) and entry.get('hash'):
+                sizes[entry['hash']] = int(entry.get('size') or 0)
+                refs[entry['hash']] += 1
+        total = sum(sizes.values())
+        limit = self._max_bytes_fn()
+        orphans: List[str] = []
+        if limit <= 0 or total <= limit:
+            return orphans
+        by_age = sorted(
+            (k for k, e in self._data.items() if k != keep and isinstance(e, dict)),
+            key=lambda k: float(self._data[k].get('used') or 0),
+        )
+        for k in by_age:
+            if total <= limit:
+                break
+            digest = self._data.pop(k).get('hash')
+            if not digest:
+                continue
+            refs[digest] -= 1
+            if refs[digest] <= 0:
+                total -= sizes.get(digest, 0)
+                orphans.append(digest)
+        self._mark_dirty()
+        return orphans
+
+
+# SQLite 单条语句中 IN (...) 的参数个数上限（兼容旧版 SQLite 的 999 限制）
+BIND_SQLITE_IN_CHUNK = 500
+
+
+class _SqliteBindingStore:
+    """SQLite 绑定存储：以 (platform, user_id) 为主键，tmp_id 建索引支持反查；首次启动时从 JSON 文件一次性迁移。"""
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS bindings ("
+        " platform TEXT NOT NULL DEFAULT '',"
+        " user_id TEXT NOT NULL,"
+        " tmp_id TEXT NOT NULL,"
+        " player_name TEXT,"
+        " bind_time REAL,"
+        " PRIMARY KEY (platform, user_id))",
+        "CREATE INDEX IF NOT EXISTS idx_bindings_tmp_id ON bindings (tmp_id)",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    )
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None, io: Optional[_AsyncFileIO] = None):
+        self.path = db_path
+        self._legacy_json_path = legacy_json_path
+        self._io = io
+        self._conn: Optional[sqlite3.Connection] = None
+        # 连接在 I/O 线程池中使用，同一时间只允许一个线程操作
+        self._conn_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in self._SCHEMA:
+            conn.execute(stmt)
+        conn.commit()
+        self._conn = conn
+        self._migrate_from_json()
+        return conn
+
+    def _migrate_from_json(self) -> None:
+        conn = self._conn
+        row = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if row is not None:
+            return
+        path = self._legacy_json_path
+        rows = []
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"读取旧绑定文件失败，跳过迁移: {e}")
+                return
+            if isinstance(data, dict):
+                for uid, b in data.items():
+                    if isinstance(b, dict):
+                        tmp_id = b.get('tmp_id')
+                        name = b.get('player_name')
+                        bind_time = b.get('bind_time')
+                    else:
+                        tmp_id, name, bind_time = b, None, None
+                    if tmp_id:
+                        rows.append(('', str(uid), str(tmp_id), name, bind_time))
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO bindings (platform, user_id, tmp_id, player_name, bind_time) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (str(int(time.time())),))
+        if rows:
+            logger.info(f"已从 {path} 迁移 {len(rows)} 条绑定数据到 SQLite")
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        def _locked() -> Any:
+            with self._conn_lock:
+                return func(self._connect(), *args)
+        return await _run_file_io(self._io, _locked)
+
+    @staticmethod
+    def _row_to_binding(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'tmp_id': row['tmp_id'],
+            'player_name': row['player_name'],
+            'bind_time': row['bind_time'],
+        }
 
-# -----------------------------
+    async def load(self) -> None:
+        await self._call(lambda conn: None)
 
+    async def on_file_changed(self, signature: Optional[Tuple[int, int]]) -> None:
+        return
 
-# 自定义异常类 
-class TmpApiException(Exception):
-    """TMP 相关异常的基类"""
-    pass
+    # 迁移自 JSON 的旧数据没有平台信息（platform 为空），查询时作为该平台的兜底
+    async def get(self, user_id: str, platform: str = '') -> Any:
+        def _query(conn: sqlite3.Connection) -> Any:
+            row = conn.execute(
+                "SELECT * FROM bindings WHERE user_id = ? AND platform IN (?, '') "
+                "ORDER BY platform = '' LIMIT 1",
+                (str(user_id), platform or ''),
+            ).fetchone()
+            return self._row_to_binding(row) if row else None
+        return await self._call(_query)
+
+    async def get_many(self, user_ids: List[str], platform: str = '') -> Dict[str, Any]:
+        ids = [str(u) for u in dict.fromkeys(user_ids)]
+
+        def _query(conn: sqlite3.Connection) -> Dict[str, Any]:
+            result: Dict[str, Any] = {}
+            for i in range(0, len(ids), BIND_SQLITE_IN_CHUNK):
+                chunk = ids[i:i + BIND_SQLITE_IN_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT * FROM bindings WHERE platform IN (?, '') AND user_id IN ({placeholders}) "
+                    "ORDER BY platform = '' DESC",
+                    (platform or '', *chunk),
+                ).fetchall()
+                # 平台专属记录排在后面，覆盖旧的无平台记录
+                for row in rows:
+                    result[row['user_id']] = self._row_to_binding(row)
+            return result
+        return await self._call(_query)
+
+    async def users_for_tmp_id(self, tmp_id: str) -> List[Tuple[str, str]]:
+        def _query(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+            rows = conn.execute("SELECT platform, user_id FROM bindings WHERE tmp_id = ?", (str(tmp_id),)).fetchall()
+            return [(row['platform'], row['user_id']) for row in rows]
+        return await self._call(_query)
+
+    async def set(self, user_id: str, value: Any, platform: str = '') -> bool:
+        if isinstance(value, dict):
+            tmp_id, name, bind_time = value.get('tmp_id'), value.get('player_name'), value.get('bind_time')
+        else:
+            tmp_id, name, bind_time = value, None, None
+
+        def _write(conn: sqlite3.Connection) -> bool:
+            with conn:
+                # 同一用户的旧无平台记录随新绑定一并替换
+                if platform:
+                    conn.execute("DELETE FROM bindings WHERE platform = '' AND user_id = ?", (str(user_id),))
+                conn.execute(
+                    "INSERT OR REPLACE INTO bindings (platform, user_id, tmp_id, player_name, bind_time) VALUES (?, ?, ?, ?, ?)",
+                    (platform or '', str(user_id), str(tmp_id), name, bind_time),
+                )
+            return True
+        try:
+            return await self._call(_write)
+        except Exception as e:
+            logger.error(f"保存绑定数据失败: {e}")
+            return False
 
-class PlayerNotFoundException(TmpApiException):
-    """玩家不存在异常"""
-    pass
+    async def delete(self, user_id: str, platform: str = '') -> bool:
+        def _write(conn: sqlite3.Connection) -> bool:
+            with conn:
+                cur = conn.execute(
+                    "DELETE FROM bindings WHERE user_id = ? AND platform IN (?, '')",
+                    (str(user_id), platform or ''),
+                )
+            return cur.rowcount > 0
+        try:
+            return await self._call(_write)
+        except Exception as e:
+            logger.error(f"删除绑定数据失败: {e}")
+            return False
 
-class SteamIdNotFoundException(TmpApiException):
-    """Steam ID 未绑定 TMP 账号异常"""
-    pass
+    async def flush(self) -> bool:
+        return True
 
-class NetworkException(Exception):
-    """网络请求异常"""
-    pass
+    async def close(self) -> None:
+        def _close() -> None:
+            with self._conn_lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+        await _run_file_io(self._io, _close)
+
+
+# --- 配置快照 ---
+def _parse_id_whitelist(raw: Optional[str]) -> Optional[frozenset]:
+    """逗号分隔的 ID 白名单；未配置时返回 None 表示不限制。"""
+    s = str(raw or '').strip()
+    if not s:
+        return None
+    return frozenset(item.strip() for item in s.split(','))
+
+
+@dataclass(frozen=True)
+class _ConfigSnapshot:
+    """插件配置的只读快照：启动与配置文件变化时整体重建并替换，热路径直接读属性。"""
+
+    api_timeout_seconds: int = 10
+    query_show_avatar_enable: bool = True
+    dlc_list_image: bool = False
+    footprint_api_base: str = ''
+    ets2map_fullmap_interval_seconds: int = 60
+    baidu_translate_enable: bool = True
+    baidu_translate_cache_enable: bool = False
+    baidu_translate_app_id: str = ''
+    baidu_translate_key: str = ''
+    baidu_translate_negative_ttl_seconds: int = 1800
+    baidu_translate_daily_char_limit: int = 0
+    baidu_translate_backoff_seconds: int = 60
+    baidu_translate_qps: int = 1
+    translate_warmup_enable: bool = True
+    translate_warmup_interval_seconds: int = 21600
+    fuzzy_match_enable: bool = True
+    fuzzy_match_threshold: float = 0.88
+    vtcm_api_token: str = ''
+    vtcm_feature_enable: bool = True
+    vtcm_point_feature_enable: bool = False
+    vtcm_whitelist_groups: Optional[frozenset] = None
+    vtcm_member_whitelist_users: Optional[frozenset] = None
+    cooldown_enable: bool = False
+    cooldown_user_per_minute: int = 12
+    cooldown_group_per_minute: int = 40
+    cooldown_heavy_command_per_minute: int = 3
+    heavy_command_max_concurrent: int = 2
+    heavy_command_max_queue: int = 4
+    heavy_command_queue_timeout_seconds: int = 20
+    upstream_max_concurrency: int = 8
+    progressive_reply_enable: bool = False
+    vtc_roster_ttl_seconds: float = 600.0
+    online_fullmap_max_age_seconds: float = 120.0
+    avatar_cache_max_mb: float = 64.0
+    avatar_revalidate_seconds: float = 86400.0
+    player_profile_ttls: Dict[str, float] = field(default_factory=lambda: dict(PLAYER_PROFILE_TTL_DEFAULTS))
+    query_source_timeouts: Dict[str, float] = field(default_factory=lambda: dict(QUERY_SOURCE_TIMEOUT_DEFAULTS))
+    command_deadline_seconds: float = 25.0
+    command_deadlines: Dict[str, float] = field(default_factory=dict)
+    command_call_budget: int = 24
+    batch_query_max_ids: int = 20
+    batch_query_concurrency: int = 4
+    command_call_budgets: Dict[str, float] = field(default_factory=dict)
+
+    def member_allowed(self, user_id: Optional[str]) -> bool:
+        """车队成员管理个人白名单检查；未配置白名单或取不到用户 ID 时放行。"""
+        if self.vtcm_member_whitelist_users is None or not user_id:
+            return True
+        return user_id in self.vtcm_member_whitelist_users
+
+    def deadline_for(self, route: Optional[str]) -> Optional[float]:
+        """命令的截止时长（秒），未单独配置时使用全局值；不大于 0 表示不限。"""
+        seconds = self.command_deadlines.get(route, self.command_deadline_seconds) if route else self.command_deadline_seconds
+        return seconds if seconds > 0 else None
+
+    def call_budget_for(self, route: Optional[str]) -> Optional[int]:
+        """命令的上游调用次数上限，未单独配置时使用全局值；不大于 0 表示不限。"""
+        default = self.command_call_budget
+        if route == 'query_batch':
+            default = max(default, self.batch_query_max_ids * BATCH_QUERY_CALLS_PER_PLAYER)
+        limit = int(self.command_call_budgets.get(route, default)) if route else default
+        return limit if limit > 0 else None
+
+    def group_allowed(self, group_id: Optional[str]) -> bool:
+        """车队平台群白名单检查；未配置白名单或非群聊时放行。"""
+        if self.vtcm_whitelist_groups is None or not group_id:
+            return True
+        return group_id in self.vtcm_whitelist_groups
 
-class ApiResponseException(TmpApiException):
-    """API响应异常"""
-    pass
 
 @register("tmp-bot", "BGYdook", "欧卡2TMP查询插件", "1.8.4", "https://github.com/BGYdook/astrbot-plugin-tmp-bot")
 class TmpBotPlugin(Star):
@@ -267,17 +2325,38 @@ class TmpBotPlugin(Star):
         self.session = None
         self._ready = False
         self.config = config or {}
+        self._conf = self._build_config_snapshot()
         self._translate_cache: Dict[str, str] = {}
         self._location_maps_loaded: bool = False
+        self._translate_negative_cache: Dict[str, float] = {}
+        self._baidu_usage_day: str = ""
+        self._baidu_chars_today: int = 0
+        self._baidu_requests_today: int = 0
+        self._baidu_quota_blocked_day: str = ""
+        self._baidu_backoff_until: float = 0.0
+        self._baidu_dict_only_logged: bool = False
+        self._fuzzy_city_index: Optional[_FuzzyNameIndex] = None
+        self._fuzzy_country_index: Optional[_FuzzyNameIndex] = None
         self._fullmap_cache: Optional[Dict[str, Any]] = None
         self._fullmap_cache_ts: float = 0.0
+        self._fullmap_index: Dict[str, Dict[str, Any]] = {}
+        self._online_enrichment = _OnlineEnrichmentCache()
         self._fullmap_last_fetch_ts: float = 0.0
         self._fullmap_next_fetch_ts: float = 0.0
         self._fullmap_task: Optional[asyncio.Task] = None
+        self._translate_warmup_task: Optional[asyncio.Task] = None
+        self._command_coalescer = _CommandCoalescer()
+        self._cooldown_buckets = _TokenBuckets()
+        self._cooldown_notice_until: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._heavy_admission = _AdmissionController()
+        self._upstream_scheduler = _PriorityScheduler(lambda: self._conf.upstream_max_concurrency)
+        self._fanout_stats = _FanoutStats()
+        self._player_profiles = _PlayerProfileCache(lambda: self._conf.player_profile_ttls)
+        self._vtc_rosters = _VtcRosterCache(lambda: self._conf.vtc_roster_ttl_seconds)
         self._fullmap_lock = asyncio.Lock()
         self._fullmap_fetch_lock = asyncio.Lock()
 
-        self._load_location_maps()
+        self._io = _AsyncFileIO()
         try:
             bind_path = self.config.get('bind_file')
             if not bind_path:
@@ -289,6 +2368,15 @@ class TmpBotPlugin(Star):
             self.bind_file = bind_path
         except Exception:
             self.bind_file = os.path.join(os.getcwd(), 'tmp_bindings.json')
+        self._bind_store = self._create_bind_store()
+        self._steam_ids = _SteamIdStore(
+            os.path.join(os.path.dirname(self.bind_file) or os.getcwd(), 'tmp_steam_ids.json'), self._io
+        )
+        self._avatars = _AvatarCache(
+            os.path.join(os.path.dirname(self.bind_file) or os.getcwd(), AVATAR_CACHE_DIRNAME), self._io,
+            lambda: int(self._conf.avatar_cache_max_mb * 1024 * 1024),
+            lambda: self._conf.avatar_revalidate_seconds,
+        )
         try:
             logger.info("TMP Bot 插件初始化开始")
             # 仅做轻量初始化，避免在导入阶段执行网络/阻塞操作
@@ -317,23 +2405,107 @@ class TmpBotPlugin(Star):
             return default
         return str(v)
 
+    def _cfg_float(self, key: str, default: float) -> float:
+        try:
+            return float(self.config.get(key, default))
+        except Exception:
+            return default
+
+    def _build_config_snapshot(self) -> _ConfigSnapshot:
+        return _ConfigSnapshot(
+            api_timeout_seconds=self._cfg_int('api_timeout_seconds', 10),
+            query_show_avatar_enable=self._cfg_bool('query_show_avatar_enable', True),
+            dlc_list_image=self._cfg_bool('dlc_list_image', False),
+            footprint_api_base=self._cfg_str('footprint_api_base', ''),
+            ets2map_fullmap_interval_seconds=self._cfg_int('ets2map_fullmap_interval_seconds', 60),
+            baidu_translate_enable=self._cfg_bool('baidu_translate_enable', True),
+            baidu_translate_cache_enable=self._cfg_bool('baidu_translate_cache_enable', False),
+            baidu_translate_app_id=self._cfg_str('baidu_translate_app_id', ''),
+            baidu_translate_key=self._cfg_str('baidu_translate_key', ''),
+            baidu_translate_negative_ttl_seconds=self._cfg_int('baidu_translate_negative_ttl_seconds', 1800),
+            baidu_translate_daily_char_limit=self._cfg_int('baidu_translate_daily_char_limit', 0),
+            baidu_translate_backoff_seconds=self._cfg_int('baidu_translate_backoff_seconds', 60),
+            baidu_translate_qps=self._cfg_int('baidu_translate_qps', 1),
+            translate_warmup_enable=self._cfg_bool('translate_warmup_enable', True),
+            translate_warmup_interval_seconds=self._cfg_int('translate_warmup_interval_seconds', 21600),
+            fuzzy_match_enable=self._cfg_bool('fuzzy_match_enable', True),
+            fuzzy_match_threshold=self._cfg_float('fuzzy_match_threshold', 0.88),
+            vtcm_api_token=self._cfg_str('vtcm_api_token', ''),
+            vtcm_feature_enable=self._cfg_bool('vtcm_feature_enable', True),
+            vtcm_point_feature_enable=self._cfg_bool('vtcm_point_feature_enable', False),
+            vtcm_whitelist_groups=_parse_id_whitelist(self._cfg_str('vtcm_whitelist_groups', '')),
+            vtcm_member_whitelist_users=_parse_id_whitelist(self._cfg_str('vtcm_member_whitelist_users', '')),
+            cooldown_enable=self._cfg_bool('cooldown_enable', False),
+            cooldown_user_per_minute=self._cfg_int('cooldown_user_per_minute', 12),
+            cooldown_group_per_minute=self._cfg_int('cooldown_group_per_minute', 40),
+            cooldown_heavy_command_per_minute=self._cfg_int('cooldown_heavy_command_per_minute', 3),
+            heavy_command_max_concurrent=self._cfg_int('heavy_command_max_concurrent', 2),
+            heavy_command_max_queue=self._cfg_int('heavy_command_max_queue', 4),
+            heavy_command_queue_timeout_seconds=self._cfg_int('heavy_command_queue_timeout_seconds', 20),
+            upstream_max_concurrency=self._cfg_int('upstream_max_concurrency', 8),
+            progressive_reply_enable=self._cfg_bool('progressive_reply_enable', False),
+            vtc_roster_ttl_seconds=self._cfg_float('vtc_roster_ttl_seconds', 600.0),
+            online_fullmap_max_age_seconds=self._cfg_float('online_fullmap_max_age_seconds', 120.0),
+            avatar_cache_max_mb=self._cfg_float('avatar_cache_max_mb', 64.0),
+            avatar_revalidate_seconds=self._cfg_float('avatar_revalidate_seconds', 86400.0),
+            player_profile_ttls=_parse_named_values(self._cfg_str('player_profile_ttls', ''), PLAYER_PROFILE_TTL_DEFAULTS),
+            query_source_timeouts=_parse_named_values(self._cfg_str('query_source_timeouts', ''), QUERY_SOURCE_TIMEOUT_DEFAULTS),
+            command_deadline_seconds=self._cfg_float('command_deadline_seconds', 25.0),
+            command_deadlines=_parse_command_values(self._cfg_str('command_deadlines', '查询=20,定位=25,足迹=30')),
+            command_call_budget=self._cfg_int('command_call_budget', 24),
+            batch_query_max_ids=self._cfg_int('batch_query_max_ids', 20),
+            batch_query_concurrency=self._cfg_int('batch_query_concurrency', 4),
+            command_call_budgets=_parse_command_values(self._cfg_str('command_call_budgets', '')),
+        )
+
+    def _config_file_path(self) -> Optional[str]:
+        path = getattr(self.config, 'config_path', None)
+        return str(path) if path else None
+
+    async def _on_config_file_changed(self, signature: Optional[Tuple[int, int]]) -> None:
+        """插件配置文件变化（WebUI 保存或手动编辑）后重建配置快照。"""
+        path = self._config_file_path()
+        if not path or signature is None:
+            return
+        data = await self._io.run(_read_json_file, path)
+        if isinstance(data, dict) and hasattr(self.config, 'update'):
+            self.config.update(data)
+        old = self._conf
+        self._conf = self._build_config_snapshot()
+        if self._conf.fuzzy_match_threshold != old.fuzzy_match_threshold:
+            self._fuzzy_city_index = None
+            self._fuzzy_country_index = None
+        self._sync_translate_warmup_task()
+        logger.info("检测到插件配置变化，已重新加载配置")
+
     async def initialize(self):
         # 统一 User-Agent，并更新版本号
-        timeout_sec = self._cfg_int('api_timeout_seconds', 10)
+        timeout_sec = self._conf.api_timeout_seconds
         # 使用 IPv4 优先的连接器，并允许读取环境代理设置（与浏览器/系统行为更一致）
         connector = aiohttp.TCPConnector(family=socket.AF_INET)
-        self.session = aiohttp.ClientSession(
+        self.session = _ScheduledSession(aiohttp.ClientSession(
             headers={'User-Agent': 'astrBot-TMP-Plugin/1.3.59'}, 
             timeout=aiohttp.ClientTimeout(total=timeout_sec),
             connector=connector,
             trust_env=True
-        )
+        ), self._upstream_scheduler)
         logger.info(f"TMP Bot 插件HTTP会话已创建，超时 {timeout_sec}s")
+        await self._load_location_maps_async()
+        await self._bind_store.load()
+        await self._steam_ids.load()
+        await self._avatars.load()
+        if isinstance(self._bind_store, _BindingStore):
+            self._io.watch(self.bind_file, on_change=self._bind_store.on_file_changed)
+        config_path = self._config_file_path()
+        if config_path:
+            self._io.watch(config_path, on_change=self._on_config_file_changed)
+        await self._io.start_watching()
         self._fullmap_task = None
+        self._sync_translate_warmup_task()
 
 
     def _get_fullmap_interval(self) -> int:
-        v = self._cfg_int('ets2map_fullmap_interval_seconds', 60)
+        v = self._conf.ets2map_fullmap_interval_seconds
         return 60 if v < 60 else v
 
     def _start_fullmap_task(self) -> None:
@@ -342,6 +2514,7 @@ class TmpBotPlugin(Star):
         self._fullmap_task = asyncio.create_task(self._fullmap_loop())
 
     async def _fullmap_loop(self) -> None:
+        _enter_background_context()
         try:
             await asyncio.sleep(self._get_fullmap_interval())
             while True:
@@ -369,12 +2542,14 @@ class TmpBotPlugin(Star):
             self._fullmap_last_fetch_ts = time.time()
         url = "https://tracker.ets2map.com/v3/fullmap"
         try:
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds) as resp:
                 if resp.status == 200:
                     data = await resp.json()
                     if isinstance(data, dict):
+                        index = _index_fullmap_players(data)
                         async with self._fullmap_lock:
                             self._fullmap_cache = data
+                            self._fullmap_index = index
                             self._fullmap_cache_ts = time.time()
                         logger.info("fullmap 拉取成功")
                         return
@@ -382,6 +2557,74 @@ class TmpBotPlugin(Star):
         except Exception as e:
             logger.error(f"fullmap 拉取异常: {e}")
 
+    # --- 后台翻译预热 ---
+    def _translate_warmup_wanted(self) -> bool:
+        conf = self._conf
+        if not conf.translate_warmup_enable:
+            return False
+        if not conf.baidu_translate_enable or not conf.baidu_translate_cache_enable:
+            # 预热结果只能落在翻译缓存中，未开启缓存时预热没有意义
+            return False
+        return bool(conf.baidu_translate_app_id.strip() and conf.baidu_translate_key.strip())
+
+    def _sync_translate_warmup_task(self) -> None:
+        """按当前配置启动或停止翻译预热任务；启动时与配置变化后调用。"""
+        running = self._translate_warmup_task is not None and not self._translate_warmup_task.done()
+        wanted = self._translate_warmup_wanted()
+        if wanted and not running:
+            self._translate_warmup_task = asyncio.create_task(self._translate_warmup_loop())
+            logger.info("翻译预热任务已启动")
+        elif running and not wanted:
+            self._translate_warmup_task.cancel()
+            self._translate_warmup_task = None
+            logger.info("翻译预热任务已停止")
+
+    async def _translate_warmup_loop(self) -> None:
+        _enter_background_context()
+        try:
+            await asyncio.sleep(TRANSLATE_WARMUP_INITIAL_DELAY)
+            while True:
+                await self._warmup_traffic_translations()
+                interval = max(600, self._conf.translate_warmup_interval_seconds)
+                await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"翻译预热任务异常退出: {e}")
+
+    async def _warmup_traffic_translations(self) -> int:
+        """拉取各服务器热门路况地点，把尚未翻译过的名称提前写入翻译缓存。"""
+        qps = self._conf.baidu_translate_qps
+        min_gap = 1.0 / qps if qps > 0 else 1.0
+        issued = 0
+        for server in TRANSLATE_WARMUP_SERVERS:
+            try:
+                items = await self._get_traffic_top(server)
+            except Exception as e:
+                logger.info(f"翻译预热: 拉取路况失败 server={server}: {e}")
+                continue
+            for t in items or []:
+                if not isinstance(t, dict):
+                    continue
+                if not self._baidu_translate_available():
+                    logger.info(f"翻译预热: 百度翻译不可用，提前结束本轮预热 (已请求 {issued} 次)")
+                    return issued
+                # 百度 QPS 额度优先留给交互命令
+                await self._upstream_scheduler.wait_higher_idle(_UPSTREAM_PRIORITY.get())
+                before = self._baidu_requests_today
+                name, _ = _split_traffic_name(t.get("name"))
+                await self._translate_country_city(str(t.get("country") or "").strip(), None)
+                await self._translate_traffic_name(name)
+                used = self._baidu_requests_today - before
+                if used > 0:
+                    issued += used
+                    # 遵守百度翻译 QPS 限制，预热请求之间留出间隔
+                    await asyncio.sleep(min_gap * used)
+                else:
+                    await asyncio.sleep(0)
+        logger.info(f"翻译预热完成: 新翻译请求 {issued} 次")
+        return issued
+
     def _get_fullmap_tile_url(self, map_type: str) -> Optional[str]:
         data = self._fullmap_cache or {}
         candidates: List[str] = []
@@ -448,7 +2691,7 @@ class TmpBotPlugin(Star):
         if not self.session:
             return None
         try:
-            timeout_sec = self._cfg_int('api_timeout_seconds', 10)
+            timeout_sec = self._conf.api_timeout_seconds
             async with self.session.get(url, timeout=timeout_sec) as resp:
                 if resp.status == 200:
                     content = await resp.read()
@@ -458,42 +2701,80 @@ class TmpBotPlugin(Star):
         except Exception:
             return None
 
-    async def _get_avatar_bytes(self, url: str) -> Optional[bytes]:
-        if not self.session:
-            return None
-        try:
-            timeout_sec = self._cfg_int('api_timeout_seconds', 10)
-            async with self.session.get(url, timeout=timeout_sec, allow_redirects=True) as resp:
-                if resp.status == 200:
-                    content = await resp.read()
-                    if content:
-                        return content
-                    else:
-                        logger.info(f"头像下载失败: 空内容 status=200 url={url}")
-                        return None
-                else:
-                    logger.info(f"头像下载失败: status={resp.status} url={url}")
-                    return None
-        except Exception as e:
-            logger.error(f"头像下载异常: url={url} err={e}", exc_info=False)
-            return None
+    def _baidu_quota_day(self) -> str:
+        today = datetime.now().strftime('%Y-%m-%d')
+        if self._baidu_usage_day != today:
+            self._baidu_usage_day = today
+            self._baidu_chars_today = 0
+            self._baidu_requests_today = 0
+            self._baidu_dict_only_logged = False
+        return today
+
+    def _baidu_translate_available(self) -> bool:
+        """额度将尽、账户欠费或接口故障冷却期内返回 False，此时仅使用本地词典。"""
+        today = self._baidu_quota_day()
+        reason = None
+        if self._baidu_quota_blocked_day == today:
+            reason = "百度翻译额度已用尽"
+        elif time.monotonic() < self._baidu_backoff_until:
+            reason = "百度翻译接口故障冷却中"
+        else:
+            limit = self._conf.baidu_translate_daily_char_limit
+            if limit > 0 and self._baidu_chars_today >= limit * BAIDU_QUOTA_RESERVE_RATIO:
+                reason = f"今日百度翻译字符数 {self._baidu_chars_today}/{limit} 即将用尽"
+        if reason:
+            if not self._baidu_dict_only_logged:
+                logger.info(f"翻译降级为仅词典模式: {reason}")
+                self._baidu_dict_only_logged = True
+            return False
+        return True
+
+    def _remember_untranslatable(self, cache_key: str) -> None:
+        ttl = self._conf.baidu_translate_negative_ttl_seconds
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._translate_negative_cache) >= 2000:
+            self._translate_negative_cache = {
+                k: exp for k, exp in self._translate_negative_cache.items() if exp > now
+            }
+            if len(self._translate_negative_cache) >= 2000:
+                self._translate_negative_cache.clear()
+        self._translate_negative_cache[cache_key] = now + ttl
+
+    def _mark_baidu_failure(self, error_code: Any = None) -> None:
+        code = str(error_code or '')
+        if code in BAIDU_QUOTA_ERROR_CODES:
+            self._baidu_quota_blocked_day = self._baidu_quota_day()
+            logger.info(f"百度翻译返回额度/余额错误 error_code={code}，今日剩余时间仅使用本地词典")
+            return
+        self._baidu_backoff_until = time.monotonic() + self._conf.baidu_translate_backoff_seconds
+        self._baidu_dict_only_logged = False
 
     async def _translate_text(self, content: str, cache: bool = True) -> str:
         s = (content or "").strip()
         if not s:
             return content
-        if not self._cfg_bool('baidu_translate_enable', True):
+        if not self._conf.baidu_translate_enable:
             return content
-        use_cache = self._cfg_bool('baidu_translate_cache_enable', False)
+        use_cache = self._conf.baidu_translate_cache_enable
         cache_key = hashlib.md5(s.encode('utf-8')).hexdigest()
         if cache and use_cache:
             cached = self._translate_cache.get(cache_key)
             if cached:
                 return cached
-        app_id = self._cfg_str('baidu_translate_app_id', '').strip()
-        app_key = self._cfg_str('baidu_translate_key', '').strip()
+        if cache:
+            expires = self._translate_negative_cache.get(cache_key)
+            if expires is not None:
+                if expires > time.monotonic():
+                    return content
+                self._translate_negative_cache.pop(cache_key, None)
+        app_id = self._conf.baidu_translate_app_id.strip()
+        app_key = self._conf.baidu_translate_key.strip()
         if not app_id or not app_key or not self.session:
             return content
+        if not self._baidu_translate_available():
+            return content
         try:
             salt = str(random.randint(1000, 9999))
             sign = hashlib.md5((app_id + s + salt + app_key).encode('utf-8')).hexdigest()
@@ -506,113 +2787,173 @@ class TmpBotPlugin(Star):
                 'salt': salt,
                 'sign': sign
             }
-            async with self.session.get(url, params=params, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
-                if resp.status == 200:
+            # 百度按请求字符数计费，发出请求即计入当日用量
+            self._baidu_chars_today += len(s)
+            self._baidu_requests_today += 1
+            async with self.session.get(url, params=params, timeout=self._conf.api_timeout_seconds) as resp:
+                if resp.status != 200:
+                    self._mark_baidu_failure()
+                    data = None
+                else:
                     data = await resp.json()
-                    if isinstance(data, dict) and data.get('trans_result'):
-                        dst = data['trans_result'][0].get('dst')
-                        if isinstance(dst, str) and dst.strip():
-                            translated = dst.strip()
-                            if cache and use_cache:
-                                self._translate_cache[cache_key] = translated
-                            return translated
+                if isinstance(data, dict) and data.get('error_code') and str(data.get('error_code')) != '52000':
+                    self._mark_baidu_failure(data.get('error_code'))
+                elif isinstance(data, dict) and data.get('trans_result'):
+                    dst = data['trans_result'][0].get('dst')
+                    if isinstance(dst, str) and dst.strip() and dst.strip() != s:
+                        translated = dst.strip()
+                        if cache and use_cache:
+                            self._translate_cache[cache_key] = translated
+                        return translated
         except Exception:
-            return content
+            self._mark_baidu_failure()
+        # 翻译失败或原样返回：短期负缓存，避免重复付费请求
+        if cache:
+            self._remember_untranslatable(cache_key)
         return content
 
+    async def _fetch_avatar(self, url: str, validators: Dict[str, str]) -> Tuple[int, Optional[bytes], Dict[str, str]]:
+        """下载单个头像地址；带上 ETag/Last-Modified 时发条件请求，未变化返回 304。"""
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        async with self.session.get(url, timeout=self._conf.api_timeout_seconds, allow_redirects=True,
+                                    headers=headers or None) as resp:
+            if resp.status != 200:
+                return resp.status, None, {}
+            content_type = (resp.headers.get('Content-Type') or '').lower()
+            if content_type and not content_type.startswith('image/'):
+                return 415, None, {}
+            content = await resp.read()
+            return 200, content or None, {
+                'etag': resp.headers.get('ETag') or '',
+                'last_modified': resp.headers.get('Last-Modified') or '',
+            }
+
     async def _get_avatar_bytes_with_fallback(self, url: str, tmp_id: Optional[str]) -> Optional[bytes]:
-        """尝试多种 TruckersMP 头像URL变体，尽可能获取头像字节。"""
+        """获取玩家头像字节：优先磁盘缓存，未命中时并发探测多种 TruckersMP 头像URL变体。"""
+        if not self.session:
+            return None
         base = self._normalize_avatar_url(url)
-        candidates: List[str] = []
-        if base:
-            candidates.append(base)
-            # 切换 jpg/png
-            if base.lower().endswith('.jpg'):
-                candidates.append(base[:-4] + '.png')
-            elif base.lower().endswith('.png'):
-                candidates.append(base[:-4] + '.jpg')
-            # 解析 avatarsN/{id}.{stamp}.{ext} -> 生成多种组合
-            import re as _re
-            m = _re.search(r"https?://static\.truckersmp\.com/(avatarsN|avatars)/(\d+)(?:\.\d+)?\.(jpg|png)", base, _re.IGNORECASE)
-            if m:
-                folder = m.group(1)
-                pid = m.group(2)
-                ext = m.group(3).lower()
-                alt_ext = 'png' if ext == 'jpg' else 'jpg'
-                # 去掉时间戳
-                candidates.append(f"https://static.truckersmp.com/{folder}/{pid}.{ext}")
-                candidates.append(f"https://static.truckersmp.com/{folder}/{pid}.{alt_ext}")
-                # 切到另一个目录
-                other_folder = 'avatars' if folder.lower() == 'avatarsn' else 'avatarsN'
-                candidates.append(f"https://static.truckersmp.com/{other_folder}/{pid}.{ext}")
-                candidates.append(f"https://static.truckersmp.com/{other_folder}/{pid}.{alt_ext}")
-
-        # 根据 tmp_id 追加常见直连地址
-        if tmp_id:
-            for ext in ('jpg', 'png'):
-                candidates.append(f"https://static.truckersmp.com/avatars/{tmp_id}.{ext}")
-                candidates.append(f"https://static.truckersmp.com/avatarsN/{tmp_id}.{ext}")
-
-        # 去重保持顺序
-        seen = set()
-        uniq: List[str] = []
-        for c in candidates:
-            if not c:
-                continue
-            if c in seen:
-                continue
-            seen.add(c)
-            uniq.append(c)
+        candidates = _avatar_candidates(base, str(tmp_id) if tmp_id else None)
+        if not candidates:
+            return None
+        key = str(tmp_id) if tmp_id else f"url:{hashlib.md5(base.encode('utf-8')).hexdigest()}"
+        try:
+            return await self._avatars.fetch(key, base or '', candidates, self._fetch_avatar)
+        except Exception as e:
+            logger.error(f"头像获取异常: key={key} err={e}", exc_info=False)
+            return None
 
-        for c in uniq:
-            b = await self._get_avatar_bytes(c)
-            logger.info(f"头像下载尝试: url={c} -> {'成功' if b else '失败'}")
-            if b:
-                return b
-        return None
+    async def _avatar_src(self, url: Optional[str], tmp_id: Optional[str]) -> str:
+        """地图模板中 <img> 的头像地址：有缓存字节时内联为 data URI，省去渲染时再次下载。"""
+        if url or tmp_id:
+            content = await self._get_avatar_bytes_with_fallback(url, tmp_id)
+            if content:
+                return f"data:{_avatar_mime(content)};base64,{base64.b64encode(content).decode('ascii')}"
+        return url or ''
+
+    async def _avatar_component(self, url: Optional[str], tmp_id: Optional[str]) -> Optional[Any]:
+        """查询回复中的头像组件：优先使用缓存字节，取不到时退回让平台按 URL 下载。"""
+        content = await self._get_avatar_bytes_with_fallback(url, tmp_id) if (url or tmp_id) else None
+        if content:
+            return Image.fromBytes(content)
+        return Image.fromURL(url) if url else None
+
+    # --- 内部工具方法 ---
+    def _create_bind_store(self):
+        backend = self._cfg_str('bind_storage_backend', 'json').strip().lower()
+        if backend == 'sqlite':
+            db_path = self._cfg_str('bind_db_file', '').strip()
+            if not db_path:
+                db_path = os.path.join(os.path.dirname(self.bind_file) or os.getcwd(), 'tmp_bindings.db')
+            logger.info(f"绑定数据使用 SQLite 存储: {db_path}")
+            return _SqliteBindingStore(db_path, legacy_json_path=self.bind_file, io=self._io)
+        return _BindingStore(self.bind_file, io=self._io)
+
+    def _build_command_context(self, event: AstrMessageEvent, msg: Optional[str] = None) -> _CommandContext:
+        """解析一次消息：命令路由与参数、@ 目标、发送者、群与平台。"""
+        if msg is None:
+            msg = (getattr(event, "message_str", "") or "").strip()
+        has_at, at_user_id, mention_user_id, mentions = _scan_message_mentions(getattr(event, "message_obj", None))
+        route, args = _route_command(msg, has_at) if msg else (None, None)
+        self_id = self._event_self_id(event)
+        if self_id:
+            # @ 机器人本身只是唤醒，不算查询目标
+            mentions = [uid for uid in mentions if uid != self_id]
+        if route == 'query' and len(mentions) > 1 and not (args or {}).get('id'):
+            # 查询时 @ 多名群成员：按批量查询处理
+            route = 'query_batch'
+        try:
+            sender_id = str(event.get_sender_id())
+        except Exception:
+            sender_id = str(getattr(event, 'user_id', '') or '')
+        try:
+            group_id = str(event.get_group_id() or '')
+        except Exception:
+            group_id = str(getattr(event, 'group_id', '') or '')
+        return _CommandContext(
+            message=msg, route=route, args=args, has_at=has_at, at_user_id=at_user_id,
+            mention_user_id=mention_user_id, mentions=mentions, sender_id=sender_id,
+            group_id=group_id, platform=self._event_platform(event),
+        )
 
-    # --- 内部工具方法 (保持不变) ---
-    def _load_bindings(self) -> Dict[str, Any]:
+    @staticmethod
+    def _event_self_id(event: AstrMessageEvent) -> str:
+        getter = getattr(event, 'get_self_id', None)
+        if not callable(getter):
+            return ''
         try:
-            if os.path.exists(self.bind_file):
-                with open(self.bind_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            logger.error(f"加载绑定数据失败: {e}")
-            return {}
+            return str(getter() or '')
+        except Exception:
+            return ''
 
-    def _save_bindings(self, bindings: dict) -> bool:
+    @staticmethod
+    def _event_platform(event: AstrMessageEvent) -> str:
+        getter = getattr(event, 'get_platform_name', None)
+        if not callable(getter):
+            return ''
         try:
-            with open(self.bind_file, 'w', encoding='utf-8') as f:
-                json.dump(bindings, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            logger.error(f"保存绑定数据失败: {e}")
-            return False
+            return str(getter() or '')
+        except Exception:
+            return ''
 
-    def _get_bound_tmp_id(self, user_id: str) -> Optional[str]:
-        bindings = self._load_bindings()
-        user_binding = bindings.get(user_id)
+    @staticmethod
+    def _binding_tmp_id(user_binding: Any) -> Optional[str]:
         if isinstance(user_binding, dict):
             return user_binding.get('tmp_id')
         return user_binding
 
-    def _bind_tmp_id(self, user_id: str, tmp_id: str, player_name: str) -> bool:
-        bindings = self._load_bindings()
-        bindings[user_id] = {
+    async def _get_binding(self, user_id: str, platform: str = '') -> Any:
+        return await self._bind_store.get(user_id, platform)
+
+    async def _get_bound_tmp_id(self, user_id: str, platform: str = '') -> Optional[str]:
+        return self._binding_tmp_id(await self._get_binding(user_id, platform))
+
+    async def _get_bound_tmp_ids(self, user_ids: List[str], platform: str = '') -> Dict[str, str]:
+        """批量查询多个用户绑定的 TMP ID，SQLite 后端为单条索引查询。"""
+        result: Dict[str, str] = {}
+        for uid, b in (await self._bind_store.get_many(user_ids, platform)).items():
+            tmp_id = self._binding_tmp_id(b)
+            if tmp_id:
+                result[uid] = str(tmp_id)
+        return result
+
+    async def _get_users_bound_to(self, tmp_id: str) -> List[Tuple[str, str]]:
+        """反查绑定到指定 TMP ID 的聊天用户，返回 (platform, user_id)。"""
+        return await self._bind_store.users_for_tmp_id(tmp_id)
+
+    async def _bind_tmp_id(self, user_id: str, tmp_id: str, player_name: str, platform: str = '') -> bool:
+        return await self._bind_store.set(user_id, {
             'tmp_id': tmp_id,
             'player_name': player_name,
             'bind_time': asyncio.get_event_loop().time()
-        }
-        return self._save_bindings(bindings)
+        }, platform)
 
-    def _unbind_tmp_id(self, user_id: str) -> bool:
-        bindings = self._load_bindings()
-        if user_id in bindings:
-            del bindings[user_id]
-            return self._save_bindings(bindings)
-        return False
+    async def _unbind_tmp_id(self, user_id: str, platform: str = '') -> bool:
+        return await self._bind_store.delete(user_id, platform)
 
     COUNTRY_MAP_EN_TO_CN = {
         "germany": "德国",
@@ -740,42 +3081,40 @@ class TmpBotPlugin(Star):
         "zurich": "苏黎世",
     }
 
+    @staticmethod
+    def _read_location_tables() -> List[Tuple[str, str]]:
+        """读取地名对照 markdown 表格（纯文件 I/O，可在线程池中执行）。"""
+        try:
+            root = os.path.dirname(__file__)
+        except Exception:
+            root = os.getcwd()
+
+        data_dir = os.path.join(root, "TruckersMP-citties-name")
+        rows: List[Tuple[str, str]] = []
+        for name in ("s1-cities.md", "promods-cities.md"):
+            rows.extend(_parse_location_table(os.path.join(data_dir, name)))
+        return rows
+
     def _load_location_maps(self) -> None:
         if getattr(self, "_location_maps_loaded", False):
             return
+        self._apply_location_rows(self._read_location_tables())
+
+    async def _load_location_maps_async(self) -> None:
+        if self._location_maps_loaded:
+            return
+        rows = await self._io.run(self._read_location_tables)
+        # 映射表在事件循环中更新，避免与正在进行的翻译并发修改
+        if not self._location_maps_loaded:
+            self._apply_location_rows(rows)
 
+    def _apply_location_rows(self, rows: List[Tuple[str, str]]) -> None:
         def _strip_cn_city_suffix(cn: str) -> str:
             t = (cn or "").strip()
             if t.endswith("（城市）"):
                 t = t[:-4]
             return t.strip()
 
-        def _parse_table(file_path: str) -> List[Tuple[str, str]]:
-            try:
-                if not os.path.exists(file_path):
-                    return []
-                rows: List[Tuple[str, str]] = []
-                with open(file_path, "r", encoding="utf-8") as f:
-                    for raw in f:
-                        line = raw.strip()
-                        if not line.startswith("|"):
-                            continue
-                        if line.startswith("| English |"):
-                            continue
-                        if line.startswith("|---"):
-                            continue
-                        parts = [p.strip() for p in line.strip("|").split("|")]
-                        if len(parts) < 2:
-                            continue
-                        en = parts[0].strip()
-                        cn = parts[1].strip()
-                        if not en or not cn:
-                            continue
-                        rows.append((en, cn))
-                return rows
-            except Exception:
-                return []
-
         def _add_mapping(en: str, cn: str) -> None:
             en_raw = (en or "").strip()
             cn_raw = (cn or "").strip()
@@ -813,20 +3152,49 @@ class TmpBotPlugin(Star):
             self.LOCATION_FIX_MAP[en_base.lower()] = cn_clean
             self.LOCATION_FIX_MAP[en_key] = cn_clean
 
-        try:
-            root = os.path.dirname(__file__)
-        except Exception:
-            root = os.getcwd()
-
-        data_dir = os.path.join(root, "TruckersMP-citties-name")
-        for name in ("s1-cities.md", "promods-cities.md"):
-            path = os.path.join(data_dir, name)
-            for en, cn in _parse_table(path):
-                _add_mapping(en, cn)
+        for en, cn in rows:
+            _add_mapping(en, cn)
 
         self._location_maps_loaded = True
 
+    def _build_fuzzy_indexes(self) -> None:
+        try:
+            threshold = float(self._conf.fuzzy_match_threshold)
+        except Exception:
+            threshold = 0.88
+        city_index = _FuzzyNameIndex(threshold=threshold)
+        country_index = _FuzzyNameIndex(threshold=threshold)
+        cjk = _re_local.compile(r"[\u4e00-\u9fff]")
+        for en, cn in self.CITY_MAP_EN_TO_CN.items():
+            if cjk.search(cn or ""):
+                city_index.add(en, cn)
+        for en, cn in self.COUNTRY_MAP_EN_TO_CN.items():
+            if cjk.search(cn or ""):
+                country_index.add(en, cn)
+        for en, cn in self.LOCATION_FIX_MAP.items():
+            if cjk.search(cn or ""):
+                city_index.add(en, cn)
+                country_index.add(en, cn)
+        self._fuzzy_city_index = city_index
+        self._fuzzy_country_index = country_index
+        logger.info(f"地名模糊索引已构建: city={len(city_index)} country={len(country_index)}")
+
+    def _fuzzy_location_lookup(self, name: Optional[str], is_city: bool = True) -> Optional[str]:
+        """在调用百度翻译前，用本地模糊索引匹配拼写略有差异的已知地名。"""
+        if not name or not self._conf.fuzzy_match_enable:
+            return None
+        if self._fuzzy_city_index is None or self._fuzzy_country_index is None:
+            self._load_location_maps()
+            self._build_fuzzy_indexes()
+        index = self._fuzzy_city_index if is_city else self._fuzzy_country_index
+        try:
+            return index.lookup(name) if index is not None else None
+        except Exception:
+            return None
+
     async def _translate_country_city(self, country: Optional[str], city: Optional[str]) -> Tuple[str, str]:
+        if not self._location_maps_loaded:
+            await self._load_location_maps_async()
         country_en = (country or "").strip()
         city_en = (city or "").strip()
 
@@ -894,6 +3262,10 @@ class TmpBotPlugin(Star):
         city_key = city_en.lower()
         country_cn = self.COUNTRY_MAP_EN_TO_CN.get(country_key)
         city_cn = self.CITY_MAP_EN_TO_CN.get(city_key)
+        if country_en and not country_cn and not self.LOCATION_FIX_MAP.get(country_key):
+            country_cn = self._fuzzy_location_lookup(country_en, is_city=False)
+        if city_en and not city_cn and not self.LOCATION_FIX_MAP.get(city_key):
+            city_cn = self._fuzzy_location_lookup(city_en, is_city=True)
         if country_en and not country_cn:
             translated_country = await self._translate_text(country_en, cache=True)
             if translated_country:
@@ -916,6 +3288,8 @@ class TmpBotPlugin(Star):
         s = (name or "").strip()
         if not s:
             return s
+        if not self._location_maps_loaded:
+            await self._load_location_maps_async()
         s = _re_local.sub(r"\s+", " ", s).strip()
         key = s.lower()
         
@@ -952,12 +3326,18 @@ class TmpBotPlugin(Star):
                         translated_parts.append(
                             self.LOCATION_FIX_MAP.get(pk)
                             or self.CITY_MAP_EN_TO_CN.get(pk)
+                            or self._fuzzy_location_lookup(p, is_city=True)
                             or p
                         )
                     joiner = " - " if sep.strip() in ("-", "–") else sep
                     return joiner.join(translated_parts)
-            
-        # 3. 百度翻译
+
+        # 3. 本地模糊匹配（变音符号、(City) 后缀、连字符差异等）
+        fuzzy = self._fuzzy_location_lookup(s, is_city=True)
+        if fuzzy:
+            return fuzzy
+
+        # 4. 百度翻译
         translated = await self._translate_text(s, cache=True)
         if translated:
             return translated
@@ -966,6 +3346,10 @@ class TmpBotPlugin(Star):
     # --- API请求方法 ---
 
     async def _get_tmp_id_from_steam_id(self, steam_id: str) -> str:
+        known = await self._steam_ids.tmp_id_for(steam_id)
+        if known:
+            logger.info(f"SteamID {steam_id} 命中本地映射: TMP ID {known}")
+            return known
         if not self.session:
             raise NetworkException("插件未初始化，HTTP会话不可用")
         
@@ -983,6 +3367,7 @@ class TmpBotPlugin(Star):
                         
                         if tmp_id:
                             logger.info(f"成功通过 SteamID {steam_id} 获取到 TMP ID: {tmp_id}")
+                            await self._steam_ids.remember(steam_id, tmp_id)
                             return str(tmp_id)
                         else:
                             raise SteamIdNotFoundException(f"Steam ID {steam_id} 未在 TruckersMP 中注册。")
@@ -1010,7 +3395,38 @@ class TmpBotPlugin(Star):
         steam_id = player_info.get('steamID64')
         return str(steam_id) if steam_id else None
 
+    # --- 玩家资料（经聚合缓存） ---
+    @_command_memoized
     async def _get_player_info(self, tmp_id: str) -> Dict:
+        """玩家基本资料：静态部分按 info 组缓存，封禁状态与上次在线按较短的 status 组刷新后覆盖。"""
+        info = await self._player_profiles.get(tmp_id, 'info', self._fetch_player_info_full)
+        status = await self._player_profiles.get(tmp_id, 'status', self._fetch_player_info_status)
+        return {**info, **status}
+
+    async def _fetch_player_info_full(self, tmp_id: str) -> Dict:
+        data = await self._fetch_player_info(tmp_id)
+        self._player_profiles.prime(tmp_id, 'status', {k: data[k] for k in PLAYER_INFO_STATUS_FIELDS if k in data})
+        return data
+
+    async def _fetch_player_info_status(self, tmp_id: str) -> Dict:
+        data = await self._fetch_player_info(tmp_id)
+        self._player_profiles.prime(tmp_id, 'info', data)
+        return {k: data[k] for k in PLAYER_INFO_STATUS_FIELDS if k in data}
+
+    @_command_memoized
+    async def _get_player_bans(self, tmp_id: str) -> List[Dict]:
+        bans = await self._player_profiles.get(tmp_id, 'bans', self._fetch_player_bans, cacheable=lambda v: v is not None)
+        return bans or []
+
+    @_command_memoized
+    async def _get_player_stats(self, tmp_id: str) -> Dict[str, Any]:
+        return await self._player_profiles.get(tmp_id, 'stats', self._fetch_player_stats, cacheable=lambda v: bool(v.get('debug_source')))
+
+    @_command_memoized
+    async def _get_online_status(self, tmp_id: str) -> Dict:
+        return await self._player_profiles.get(tmp_id, 'online', self._fetch_online_status, cacheable=_online_status_cacheable)
+
+    async def _fetch_player_info(self, tmp_id: str) -> Dict:
         if not self.session:
             raise NetworkException("插件未初始化，HTTP会话不可用")
         
@@ -1022,12 +3438,17 @@ class TmpBotPlugin(Star):
                     data = await response.json()
                     response_data = data.get('response')
                     if response_data and isinstance(response_data, dict):
+                        steam_id = self._get_steam_id_from_player_info(response_data)
+                        if steam_id:
+                            await self._steam_ids.remember(steam_id, response_data.get('id') or tmp_id)
                         return response_data
                     raise PlayerNotFoundException(f"玩家 {tmp_id} 不存在") 
                 elif response.status == 404:
                     raise PlayerNotFoundException(f"玩家 {tmp_id} 不存在")
                 else:
                     raise ApiResponseException(f"API返回错误状态码: {response.status}")
+        except PlayerNotFoundException:
+            raise
         except aiohttp.ClientError:
             raise NetworkException("TruckersMP API 网络请求失败")
         except asyncio.TimeoutError:
@@ -1036,8 +3457,9 @@ class TmpBotPlugin(Star):
             logger.error(f"查询玩家信息失败: {e}")
             raise NetworkException("查询失败")
 
-    async def _get_player_bans(self, tmp_id: str) -> List[Dict]:
-        if not self.session: return []
+    async def _fetch_player_bans(self, tmp_id: str) -> Optional[List[Dict]]:
+        """获取封禁列表；请求失败返回 None（区别于确实没有封禁的空列表）。"""
+        if not self.session: return None
 
         try:
             url = f"https://api.truckersmp.com/v2/bans/{tmp_id}"
@@ -1053,12 +3475,12 @@ class TmpBotPlugin(Star):
                     logger.info(f"Bans API 提取后: keys={list(data.keys())}, count={len(bans)}")
                     return bans
                 logger.warning(f"Bans API 非200状态: {response.status}")
-                return []
+                return None
         except Exception as e:
             logger.error(f"获取玩家封禁失败: {e}", exc_info=False)
-            return []
+            return None
             
-    async def _get_player_stats(self, tmp_id: str) -> Dict[str, Any]:
+    async def _fetch_player_stats(self, tmp_id: str) -> Dict[str, Any]:
         """通过 VTCM 里程 API 获取玩家的总里程、今日里程和头像。
         兼容 da.vtcm.link 与 SevenTMP 的 tmpevm.seventmp.cn 备用源。
         """
@@ -1099,7 +3521,7 @@ class TmpBotPlugin(Star):
             try:
                 async with self.session.get(
                     vtcm_stats_url,
-                    timeout=self._cfg_int('api_timeout_seconds', 10),
+                    timeout=self._conf.api_timeout_seconds,
                     ssl=False,
                     allow_redirects=True
                 ) as response:
@@ -1177,7 +3599,51 @@ class TmpBotPlugin(Star):
         }
 
 
-    async def _get_online_status(self, tmp_id: str) -> Dict:
+    async def _fetch_online_status(self, tmp_id: str) -> Dict:
+        """在线状态：fullmap 快照足够新且包含该玩家时直接判定在线，Trucky 只用于补充服务器名称与所在位置。
+
+        快照中没有该玩家时（可能离线，也可能是快照未覆盖的游戏）仍以 Trucky 的结论为准。
+        """
+        fm = self._fresh_fullmap_player(tmp_id)
+        if fm is None:
+            return await self._fetch_trucky_online_status(tmp_id)
+        server_id = fm.get('ServerId') or fm.get('serverId') or fm.get('server_id')
+        x, y = fm.get('X', fm.get('x')), fm.get('Y', fm.get('y'))
+        key = self._online_enrichment.place_key(server_id, x, y)
+        place = self._online_enrichment.place(key)
+        debug = 'fullmap 快照判断在线，位置信息来自缓存。'
+        if place is None:
+            try:
+                trucky = await asyncio.wait_for(self._fetch_trucky_online_status(tmp_id), ONLINE_ENRICH_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                trucky = {'online': False, 'debug_error': 'Trucky V3 API 超时。'}
+            if trucky.get('online'):
+                # 玩家可能已移动到相邻网格，直接采用本次结果，并记到快照坐标所在网格
+                place = {k: trucky.get(k) for k in _ONLINE_PLACE_FIELDS}
+                self._online_enrichment.remember(key, trucky)
+                debug = 'fullmap 快照判断在线，位置信息来自 Trucky V3。'
+            else:
+                debug = f"fullmap 快照判断在线，位置补充失败: {trucky.get('debug_error')}"
+        server = self._online_enrichment.server(server_id)
+        place = place or {}
+        return {
+            'online': True,
+            'serverName': server.get('serverName') or f"未知服务器 ({server_id})",
+            'game': server.get('game') or 0,
+            'city': place.get('city') or {'name': '未知位置'},
+            'serverId': server_id,
+            'serverDetailsId': server.get('serverDetailsId'),
+            'apiServerId': server.get('apiServerId'),
+            'serverCode': server.get('serverCode'),
+            'x': x,
+            'y': y,
+            'country': place.get('country'),
+            'realName': place.get('realName'),
+            'debug_error': debug,
+            'raw_data': ''
+        }
+
+    async def _fetch_trucky_online_status(self, tmp_id: str) -> Dict:
         """使用 TruckyApp V3 地图实时接口查询状态。"""
         if not self.session: 
             return {'online': False, 'debug_error': 'HTTP会话不可用。'}
@@ -1187,93 +3653,88 @@ class TmpBotPlugin(Star):
         
         try:
             async with self.session.get(trucky_url, timeout=5) as response:
-                
                 status = response.status
                 raw_data = await response.json()
+            # 响应读取完毕即归还上游名额，之后的地名翻译可能另发请求
+            if status == 200:
+                online_data = raw_data.get('response') if 'response' in raw_data else raw_data
                 
-                if status == 200:
-                    online_data = raw_data.get('response') if 'response' in raw_data else raw_data
-                    
-                    is_online = bool(
-                        online_data and 
-                        online_data.get('online') is True and 
-                        online_data.get('server') 
-                    )
+                is_online = bool(
+                    online_data and 
+                    online_data.get('online') is True and 
+                    online_data.get('server') 
+                )
+                
+                if is_online:
+                    server_details = online_data.get('serverDetails', {})
+                    server_name = server_details.get('name', f"未知服务器 ({online_data.get('server')})")
                     
-                    if is_online:
-                        server_details = online_data.get('serverDetails', {})
-                        server_name = server_details.get('name', f"未知服务器 ({online_data.get('server')})")
-                        
-                        location_data = online_data.get('location', {})
-                        country = location_data.get('poi', {}).get('country')
-                        real_name = location_data.get('poi', {}).get('realName')
-
-                        if not country:
-                            country = location_data.get('country')
-                        if not real_name:
-                            real_name = location_data.get('realName')
-
-                        country_cn, city_cn = await self._translate_country_city(country, real_name)
-
-                        formatted_location = '未知位置'
-                        if country_cn and city_cn:
-                            formatted_location = f"{country_cn}-{city_cn}"
-                        elif city_cn:
-                            formatted_location = city_cn
-                        elif country_cn:
-                            formatted_location = country_cn
-                        
-                        return {
-                            'online': True,
-                            'serverName': server_name,
-                            'game': 1 if server_details.get('game') == 'ETS2' else 2 if server_details.get('game') == 'ATS' else 0,
-                            'city': {'name': formatted_location}, 
-                            'serverId': online_data.get('server'),
-                            'serverDetailsId': server_details.get('id') or server_details.get('_id'),
-                            'apiServerId': server_details.get('apiserverid') or server_details.get('apiServerId'),
-                            'serverCode': server_details.get('code') or server_details.get('shortname'),
-                            'x': online_data.get('x'),
-                            'y': online_data.get('y'),
-                            'country': country_cn,
-                            'realName': city_cn,
-                            'debug_error': 'Trucky V3 判断在线，并获取到实时数据。',
-                            'raw_data': '' 
-                        }
+                    location_data = online_data.get('location', {})
+                    country = location_data.get('poi', {}).get('country')
+                    real_name = location_data.get('poi', {}).get('realName')
+
+                    if not country:
+                        country = location_data.get('country')
+                    if not real_name:
+                        real_name = location_data.get('realName')
+
+                    country_cn, city_cn = await self._translate_country_city(country, real_name)
+
+                    formatted_location = '未知位置'
+                    if country_cn and city_cn:
+                        formatted_location = f"{country_cn}-{city_cn}"
+                    elif city_cn:
+                        formatted_location = city_cn
+                    elif country_cn:
+                        formatted_location = country_cn
                     
-                    return {
-                        'online': False,
-                        'debug_error': 'Trucky V3 API 响应判断为离线。',
+                    status = {
+                        'online': True,
+                        'serverName': server_name,
+                        'game': 1 if server_details.get('game') == 'ETS2' else 2 if server_details.get('game') == 'ATS' else 0,
+                        'city': {'name': formatted_location}, 
+                        'serverId': online_data.get('server'),
+                        'serverDetailsId': server_details.get('id') or server_details.get('_id'),
+                        'apiServerId': server_details.get('apiserverid') or server_details.get('apiServerId'),
+                        'serverCode': server_details.get('code') or server_details.get('shortname'),
+                        'x': online_data.get('x'),
+                        'y': online_data.get('y'),
+                        'country': country_cn,
+                        'realName': city_cn,
+                        'debug_error': 'Trucky V3 判断在线，并获取到实时数据。',
                         'raw_data': '' 
                     }
+                    self._online_enrichment.remember(
+                        self._online_enrichment.place_key(status['serverId'], status['x'], status['y']), status
+                    )
+                    return status
                 
-                else:
-                    return {
-                        'online': False, 
-                        'debug_error': f"Trucky V3 API 返回非 200 状态码: {status}",
-                        'raw_data': '' 
-                    }
+                return {
+                    'online': False,
+                    'debug_error': TRUCKY_OFFLINE_DEBUG,
+                    'raw_data': '' 
+                }
+            
+            else:
+                return {
+                    'online': False, 
+                    'debug_error': f"Trucky V3 API 返回非 200 状态码: {status}",
+                    'raw_data': '' 
+                }
 
         except Exception as e:
             logger.error(f"Trucky V3 API 解析失败: {e.__class__.__name__}", exc_info=True)
             return {'online': False, 'debug_error': f'Trucky V3 API 发生意外错误: {e.__class__.__name__}。'}
 
     def _get_fullmap_player(self, tmp_id: str) -> Optional[Dict[str, Any]]:
-        data = self._fullmap_cache or {}
-        payload = None
-        if isinstance(data, dict):
-            payload = data.get('Data') or data.get('data') or data.get('players')
-        if not isinstance(payload, list):
+        return self._fullmap_index.get(str(tmp_id))
+
+    def _fresh_fullmap_player(self, tmp_id: str) -> Optional[Dict[str, Any]]:
+        """fullmap 快照足够新时返回其中的玩家记录。"""
+        max_age = self._conf.online_fullmap_max_age_seconds
+        if max_age <= 0 or time.time() - self._fullmap_cache_ts > max_age:
             return None
-        tid = str(tmp_id)
-        for p in payload:
-            if not isinstance(p, dict):
-                continue
-            mp_id = p.get('MpId') or p.get('mp_id') or p.get('tmpId') or p.get('tmp_id')
-            if mp_id is None:
-                continue
-            if str(mp_id) == tid:
-                return p
-        return None
+        return self._get_fullmap_player(tmp_id)
     
     async def _get_rank_list(self, ranking_type: str = "total", limit: int = 10) -> Optional[List[Dict]]:
         """获取 TruckersMP 里程排行榜列表 (使用 da.vtcm.link API)。
@@ -1321,7 +3782,7 @@ class TmpBotPlugin(Star):
         url = f"https://da.vtcm.link/dlc/list?type={dlc_type}"
         logger.info(f"DLC列表: 请求 URL={url}")
         try:
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"DLC列表: 响应 status={resp.status}, content-type={resp.headers.get('Content-Type')}")
                 if resp.status == 200:
                     data = await resp.json()
@@ -1356,7 +3817,7 @@ class TmpBotPlugin(Star):
         url = f"https://api.truckyapp.com/v2/traffic/top?game=ets2&server={server}"
         logger.info(f"路况: 请求 URL={url}")
         try:
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds) as resp:
                 status = resp.status
                 if status == 200:
                     data = await resp.json()
@@ -1377,6 +3838,7 @@ class TmpBotPlugin(Star):
             logger.error(f"查询路况时发生未知错误: {e}", exc_info=True)
             raise NetworkException("查询路况失败")
 
+    @_command_memoized
     async def _resolve_server_ids(self, server_key: str) -> List[str]:
         if not self.session:
             return []
@@ -1398,7 +3860,7 @@ class TmpBotPlugin(Star):
             patterns = [key]
         url = "https://api.truckersmp.com/v2/servers"
         try:
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds) as resp:
                 if resp.status != 200:
                     return []
                 data = await resp.json()
@@ -1431,7 +3893,7 @@ class TmpBotPlugin(Star):
     async def _get_footprint_history(self, tmp_id: str, server_id: Optional[str], start_time: str, end_time: str) -> List[Dict[str, Any]]:
         if not self.session:
             return []
-        base = self._cfg_str('footprint_api_base', '').strip() or "https://da.vtcm.link"
+        base = self._conf.footprint_api_base.strip() or "https://da.vtcm.link"
         base = base[:-1] if base.endswith('/') else base
         sid = str(server_id or "").strip()
         params = {
@@ -1444,7 +3906,7 @@ class TmpBotPlugin(Star):
         url = f"{base}/map/playerHistory"
         try:
             logger.info(f"足迹历史: 请求 {url} params={params}")
-            async with self.session.get(url, params=params, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, params=params, timeout=self._conf.api_timeout_seconds) as resp:
                 if resp.status != 200:
                     logger.info(f"足迹历史: 返回状态码 {resp.status}")
                     return []
@@ -1482,16 +3944,7 @@ class TmpBotPlugin(Star):
             ts_val = None
             update_time = it.get('updateTime') or it.get('time') or it.get('updatedAt') or it.get('update_time')
             if update_time:
-                s = str(update_time).strip()
-                try:
-                    dt = datetime.strptime(s, '%Y-%m-%d %H:%M:%S')
-                    ts_val = int(dt.timestamp())
-                except Exception:
-                    try:
-                        dt = datetime.fromisoformat(s.replace('Z', '+00:00'))
-                        ts_val = int(dt.timestamp())
-                    except Exception:
-                        ts_val = None
+                ts_val = _parse_timestamp_epoch(update_time, 'playerHistory')
             server_id_val = 0
             try:
                 server_id_val = int(server_id)
@@ -1509,7 +3962,7 @@ class TmpBotPlugin(Star):
     async def _get_footprint_data(self, server_key: str, tmp_id: str, server_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         if not self.session:
             raise NetworkException("插件未初始化，HTTP会话不可用")
-        base = self._cfg_str('footprint_api_base', '').strip() or "https://da.vtcm.link"
+        base = self._conf.footprint_api_base.strip() or "https://da.vtcm.link"
         base = base[:-1] if base.endswith('/') else base
         urls = []
         server_ids = server_ids or []
@@ -1528,7 +3981,7 @@ class TmpBotPlugin(Star):
         for url in urls:
             try:
                 logger.info(f"足迹接口: 请求 {url}")
-                async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+                async with self.session.get(url, timeout=self._conf.api_timeout_seconds) as resp:
                     if resp.status == 200:
                         data = await resp.json()
                         if isinstance(data, dict):
@@ -1623,11 +4076,10 @@ class TmpBotPlugin(Star):
         # 读取 AstrBot 系统配置 data/cmd_config.json 的 t2i_endpoint/t2i_strategy
         url = None
         try:
-            root = os.getcwd()
-            cfg = os.path.join(root, 'data', 'cmd_config.json')
-            if os.path.exists(cfg):
-                with open(cfg, 'r', encoding='utf-8') as f:
-                    j = json.load(f)
+            cfg = os.path.join(os.getcwd(), 'data', 'cmd_config.json')
+            # 文件内容由 I/O 层缓存，仅在文件变化时重新读取
+            j = await self._io.get(cfg)
+            if isinstance(j, dict):
                 strategy = str(j.get('t2i_strategy') or '').strip()
                 endpoint = str(j.get('t2i_endpoint') or '').strip()
                 if strategy == 'remote' and endpoint:
@@ -1650,7 +4102,7 @@ class TmpBotPlugin(Star):
             'text': text
         }
         try:
-            async with self.session.post(url, json=payload, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.post(url, json=payload, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"T2I: POST {url} body_len={len(text)} status={resp.status} ct={resp.headers.get('Content-Type')}")
                 ct = resp.headers.get('Content-Type', '')
                 if 'application/json' in ct:
@@ -1704,7 +4156,7 @@ class TmpBotPlugin(Star):
         try:
             url = f"https://api.truckyapp.com/v2/truckersmp/player?playerID={tmp_id}"
             logger.info(f"VTC历史: TruckyApp -> {url}")
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds) as resp:
                 if resp.status == 200:
                     data = await resp.json()
                     outer = data.get('response', data) if isinstance(data, dict) else {}
@@ -1743,7 +4195,7 @@ class TmpBotPlugin(Star):
         try:
             url = f"https://da.vtcm.link/vtc/history?tmpId={tmp_id}"
             logger.info(f"VTC历史: da.vtcm.link -> {url}")
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
                 if resp.status == 200:
                     data = await resp.json()
                     items = data.get('data') or data.get('response') or []
@@ -1757,7 +4209,7 @@ class TmpBotPlugin(Star):
         try:
             url = f"https://evmapi.114512.xyz/vtc/history?tmpId={tmp_id}"
             logger.info(f"VTC历史: evmapi.114512.xyz -> {url}")
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
                 if resp.status == 200:
                     data = await resp.json()
                     items = data.get('data') or data.get('response') or []
@@ -1771,7 +4223,7 @@ class TmpBotPlugin(Star):
         try:
             url = f"https://tmpevm.seventmp.cn/vtc/history?tmpId={tmp_id}"
             logger.info(f"VTC历史: tmpevm.seventmp.cn -> {url}")
-            async with self.session.get(url, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
+            async with self.session.get(url, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
                 if resp.status == 200:
                     data = await resp.json()
                     items = data.get('data') or data.get('response') or []
@@ -1784,6 +4236,59 @@ class TmpBotPlugin(Star):
         # 不使用官方 API 回退 - 官方 API 只返回当前 VTC，不是历史记录
         return []
 
+    # --- 车队成员名册 ---
+    async def _load_official_vtc_roster(self, vtc_id: Any) -> Optional[Dict[str, Any]]:
+        """官方 /v2/vtc/{id} 成员列表 -> {user_id: role_id}；请求失败返回 None。"""
+        vtc_info_url = f"https://api.truckersmp.com/v2/vtc/{vtc_id}"
+        logger.info(f"官方VTC查询: 获取VTC信息 {vtc_info_url}")
+        async with self.session.get(vtc_info_url, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
+            if resp.status != 200:
+                return None
+            vtc_data = await resp.json()
+        if vtc_data.get('error') is not False:
+            return None
+        members = (vtc_data.get('response') or {}).get('members') or []
+        roster = {
+            str(m.get('user_id')): m.get('role_id')
+            for m in members
+            if isinstance(m, dict) and m.get('user_id') is not None
+        }
+        logger.info(f"官方VTC名册: vtcId={vtc_id} 成员 {len(roster)} 人，已缓存")
+        return roster
+
+    async def _load_official_vtc_role_name(self, vtc_id: Any, role_id: Any) -> Optional[str]:
+        role_url = f"https://api.truckersmp.com/v2/vtc/{vtc_id}/role/{role_id}"
+        logger.info(f"官方VTC角色查询: {role_url}")
+        async with self.session.get(role_url, timeout=self._conf.api_timeout_seconds, ssl=False) as role_resp:
+            if role_resp.status != 200:
+                return None
+            role_data = await role_resp.json()
+        if role_data.get('error') is not False:
+            return None
+        return (role_data.get('response') or {}).get('name') or None
+
+    async def _load_vtcm_roster(self, vtc_id: Any) -> Optional[Dict[str, str]]:
+        """VTCM memberAll/role?vtcId= 成员列表 -> {tmpId: 角色}，依次尝试两个镜像；都失败返回 None。"""
+        for base in ("https://da.vtcm.link", "https://tmpevm.seventmp.cn"):
+            try:
+                url_vid = f"{base}/vtc/memberAll/role?vtcId={vtc_id}"
+                logger.info(f"VTC 角色查询: 使用 vtcId 查询 {url_vid}")
+                async with self.session.get(url_vid, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
+                    if resp.status == 200:
+                        data = await resp.json()
+                        roles = _member_role_map(data.get('data') or data.get('response') or [])
+                        if roles:
+                            logger.info(f"VTC 名册: vtcId={vtc_id} 成员 {len(roles)} 人，已缓存")
+                            return roles
+                    else:
+                        logger.info(f"VTC 角色查询(vtcId) 返回状态: {resp.status}")
+            except Exception as e:
+                logger.info(f"VTC 角色查询(vtcId) 异常: {e}")
+        return None
+
+    async def _get_vtcm_roster(self, vtc_id: Any) -> Dict[str, str]:
+        return await self._vtc_rosters.get(('vtcm', str(vtc_id)), lambda: self._load_vtcm_roster(vtc_id)) or {}
+
     async def _get_vtc_member_role(self, tmp_id: str, vtc_info: Optional[Dict] = None) -> Optional[str]:
         """查询玩家在车队内的角色。
         优先策略：
@@ -1807,47 +4312,23 @@ class TmpBotPlugin(Star):
             vtc_id = vtc.get('id')
             
             if vtc_id:
-                # 获取 VTC 信息以获取角色 ID
-                vtc_info_url = f"https://api.truckersmp.com/v2/vtc/{vtc_id}"
-                logger.info(f"官方VTC查询: 获取VTC信息 {vtc_info_url}")
-                async with self.session.get(vtc_info_url, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
-                    if resp.status == 200:
-                        vtc_data = await resp.json()
-                        if vtc_data.get('error') is False:
-                            vtc_response = vtc_data.get('response', {})
-                            # 查找玩家在当前VTC中的角色
-                            members = vtc_response.get('members', [])
-                            for member in members:
-                                if str(member.get('user_id', '')) == str(tmp_id):
-                                    role_id = member.get('role_id')
-                                    if role_id:
-                                        # 获取角色详细信息
-                                        role_url = f"https://api.truckersmp.com/v2/vtc/{vtc_id}/role/{role_id}"
-                                        logger.info(f"官方VTC角色查询: {role_url}")
-                                        async with self.session.get(role_url, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as role_resp:
-                                            if role_resp.status == 200:
-                                                role_data = await role_resp.json()
-                                                if role_data.get('error') is False:
-                                                    role_info = role_data.get('response', {})
-                                                    role_name = role_info.get('name')
-                                                    if role_name:
-                                                        logger.info(f"官方VTC角色查询成功: {role_name}")
-                                                        return role_name
-                                    break
+                # 车队成员名册（成员 -> 角色 ID）与角色名均按车队缓存
+                members = await self._vtc_rosters.get(('official', str(vtc_id)), lambda: self._load_official_vtc_roster(vtc_id))
+                role_id = (members or {}).get(str(tmp_id))
+                if role_id:
+                    role_name = await self._vtc_rosters.get(
+                        ('official_role', str(vtc_id), str(role_id)),
+                        lambda: self._load_official_vtc_role_name(vtc_id, role_id),
+                    )
+                    if role_name:
+                        logger.info(f"官方VTC角色查询成功: {role_name}")
+                        return role_name
         except Exception as e:
             logger.info(f"官方VTC角色查询异常: {e}")
 
         # Helper: 解析成员列表并匹配 tmp_id，返回 role 或 None
         def _find_role_in_members(members) -> Optional[str]:
-            if not isinstance(members, list):
-                return None
-            for m in members:
-                member_tmp = m.get('tmpId') or m.get('tmp_id') or m.get('tmpIdStr') or m.get('tmpid') or m.get('tmpID')
-                if member_tmp and str(member_tmp) == str(tmp_id):
-                    role = m.get('role') or m.get('roleName') or m.get('position') or m.get('name') or m.get('post')
-                    if role:
-                        return str(role)
-            return None
+            return _member_role_map(members).get(str(tmp_id))
 
         # 1) 尝试从传入的 vtc_info 获取 vtc_id
         vtc_id = None
@@ -1868,31 +4349,20 @@ class TmpBotPlugin(Star):
                 # 忽略 player_info 获取失败，继续后续回退策略
                 pass
 
-        # 3) 如果有 vtc_id，直接用 vtcId 查询成员角色列表
+        # 3) 如果有 vtc_id，直接用 vtcId 查询成员角色列表（名册按车队缓存）
         if vtc_id:
-            for base in ("https://da.vtcm.link", "https://tmpevm.seventmp.cn"):
-                try:
-                    url_vid = f"{base}/vtc/memberAll/role?vtcId={vtc_id}"
-                    logger.info(f"VTC 角色查询: 使用 vtcId 查询 {url_vid}")
-                    async with self.session.get(url_vid, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
-                        if resp.status == 200:
-                            data = await resp.json()
-                            members = data.get('data') or data.get('response') or []
-                            role = _find_role_in_members(members)
-                            if role:
-                                logger.info(f"VTC 角色: 通过 vtcId={vtc_id} 找到角色 {role}")
-                                return role
-                        else:
-                            logger.info(f"VTC 角色查询(vtcId) 返回状态: {resp.status}")
-                except Exception as e:
-                    logger.info(f"VTC 角色查询(vtcId) 异常: {e}")
+            roles = await self._get_vtcm_roster(vtc_id)
+            role = roles.get(str(tmp_id))
+            if role:
+                logger.info(f"VTC 角色: 通过 vtcId={vtc_id} 找到角色 {role}")
+                return role
 
         # 4) 回退：部分接口支持用 tmpId 直接查询
         for base in ("https://da.vtcm.link", "https://tmpevm.seventmp.cn"):
             try:
                 url_tmp = f"{base}/vtc/memberAll/role?tmpId={tmp_id}"
                 logger.info(f"VTC 角色查询: 回退尝试 tmpId 查询 {url_tmp}")
-                async with self.session.get(url_tmp, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
+                async with self.session.get(url_tmp, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
                     if resp.status == 200:
                         data = await resp.json()
                         members = data.get('data') or data.get('response') or []
@@ -1913,7 +4383,7 @@ class TmpBotPlugin(Star):
                     qname = quote_plus(str(vtc_name))
                     search_url = f"{base}/vtc/search?name={qname}"
                     logger.info(f"VTC 车队搜索: {search_url}")
-                    async with self.session.get(search_url, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
+                    async with self.session.get(search_url, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
                         if resp.status == 200:
                             data = await resp.json()
                             items = data.get('data') or data.get('response') or []
@@ -1929,22 +4399,11 @@ class TmpBotPlugin(Star):
 
             # 如果通过搜索得到 vtc_id，再次用 vtcId 查询成员
             if vtc_id:
-                for base in ("https://da.vtcm.link", "https://tmpevm.seventmp.cn"):
-                    try:
-                        url_vid2 = f"{base}/vtc/memberAll/role?vtcId={vtc_id}"
-                        logger.info(f"VTC 角色查询: 通过搜索得到 vtcId 后查询 {url_vid2}")
-                        async with self.session.get(url_vid2, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
-                            if resp.status == 200:
-                                data = await resp.json()
-                                members = data.get('data') or data.get('response') or []
-                                role = _find_role_in_members(members)
-                                if role:
-                                    logger.info(f"VTC 角色: 通过 vtcId={vtc_id}（搜索后）找到角色 {role}")
-                                    return role
-                            else:
-                                logger.info(f"VTC 角色查询(搜索后 vtcId) 返回状态: {resp.status}")
-                    except Exception as e:
-                        logger.info(f"VTC 角色查询(搜索后 vtcId) 异常: {e}")
+                roles = await self._get_vtcm_roster(vtc_id)
+                role = roles.get(str(tmp_id))
+                if role:
+                    logger.info(f"VTC 角色: 通过 vtcId={vtc_id}（搜索后）找到角色 {role}")
+                    return role
 
         # 6) 最后回退：尝试用 vtcName 参数直接查询 memberAll/role（部分实现支持）
         if vtc_name:
@@ -1954,7 +4413,7 @@ class TmpBotPlugin(Star):
                     qname = quote_plus(str(vtc_name))
                     url_name = f"{base}/vtc/memberAll/role?vtcName={qname}"
                     logger.info(f"VTC 最后回退: 通过 vtcName 查询 {url_name}")
-                    async with self.session.get(url_name, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
+                    async with self.session.get(url_name, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
                         if resp.status == 200:
                             data = await resp.json()
                             members = data.get('data') or data.get('response') or []
@@ -1988,60 +4447,107 @@ class TmpBotPlugin(Star):
         """
         if not reason or not isinstance(reason, str):
             return reason or ""
+        return _translate_ban_reason_text(reason)
 
-        zh_map = {
-            "1.1": "账号、设备与游戏设置责任",
-            "1.2": "逃避封禁",
-            "1.3": "个人信息与隐私",
-            "1.4": "不当内容与交流",
-            "1.5": "语言、头像和昵称违规",
-            "1.6": "冒充官方或其他玩家",
-            "1.7": "刷屏/滥用系统",
-            "2.1": "黑客/漏洞/功能滥用",
-            "2.2": "碰撞",
-            "2.3": "堵塞",
-            "2.4": "错误驾驶方式/不当超车",
-            "2.5": "鲁莽驾驶",
-            "2.6": "骚扰、侮辱或不当行为",
-            "2.7": "特色区域和事件服务器规则",
-            "2.8": "历史原因",
-            "2.9": "保存修改",
-            "3.1": "违规保存编辑",
-            "3.2": "不兼容或缺失组件",        }
-        keyword_map = {
-            "collisions": "碰撞",
-            "reckless driving": "鲁莽驾驶",
-            "blocking": "堵塞",
-            "trolling": "恶意捣乱",
-            "inappropriate overtaking": "不当超车",
-            "wrong way": "逆行",
-            "ramming": "蓄意撞车",
-            "chat abuse": "聊天滥用",
-            "insulting": "辱骂他人",
-        }
 
-        matches = list(re.finditer(r"§\s*(?P<code>\d+\.\d+)\s*-\s*(?P<title>[^,\-]+)", reason))
-        if matches:
-            parts = []
-            for m in matches:
-                code = m.group("code").strip()
-                title = m.group("title").strip()
-                zh_title = zh_map.get(code)
-                if zh_title:
-                    parts.append(f"§{code} - {zh_title}")
-                else:
-                    parts.append(f"§{code} - {title}")
-            remainder = reason[matches[-1].end():]
-            result = ", ".join(parts) + remainder
+    # --- 命令结果合并 ---
+    async def _coalesce_key(self, ctx: _CommandContext) -> Tuple[Any, ...]:
+        """命令合并键：路由、归一化参数，以及会影响输出的用户输入（排行榜的个人信息取自绑定）。"""
+        if ctx.route == 'traffic':
+            return (ctx.route, (ctx.arg('server', r"路况\s*(\S+)") or "").strip().lower())
+        if ctx.route in ('rank_total', 'rank_today'):
+            b = await self._get_binding(ctx.sender_id, ctx.platform)
+            if isinstance(b, dict):
+                return (ctx.route, str(b.get('tmp_id') or ''), str(b.get('player_name') or ''))
+            return (ctx.route, str(b or ''), '')
+        return (ctx.route,)
+
+    async def _run_coalesced(self, event: AstrMessageEvent, ctx: _CommandContext, handler: Callable[..., Any]):
+        """与进行中的相同命令共享结果，回复按各自的事件重新生成后发送。"""
+        key = await self._coalesce_key(ctx)
+        if ctx.route in _HEAVY_COMMAND_ROUTES:
+            producer = lambda: self._run_admitted(_ReplyRecorder(event), ctx, handler)
         else:
-            result = reason
-
-        for en, zh in keyword_map.items():
-            pattern = r"\b" + re.escape(en) + r"\b"
-            result = re.sub(pattern, zh, result, flags=re.IGNORECASE)
-
-        return result
-
+            producer = lambda: handler(_ReplyRecorder(event), ctx)
+        replies, shared = await self._command_coalescer.run(key, producer)
+        if shared:
+            logger.info(f"命令合并: {key[0]} 复用进行中的结果")
+        for kind, payload in replies:
+            if kind == 'chain':
+                yield event.chain_result(list(payload))
+            else:
+                yield event.plain_result(payload)
+
+    # --- 冷却与准入控制 ---
+    def _check_cooldown(self, ctx: _CommandContext) -> Optional[str]:
+        """按用户、群、重型命令三个维度的令牌桶检查频率；放行返回 None，
+        被限制时返回提示文本（同一用户在冷却期内只提示一次，之后静默丢弃，返回空串）。"""
+        conf = self._conf
+        if not conf.cooldown_enable or not ctx.sender_id:
+            return None
+        rules: List[Tuple[Tuple[Any, ...], float, float]] = []
+
+        def add(key: Tuple[Any, ...], per_minute: int) -> None:
+            if per_minute > 0:
+                rules.append((key, float(per_minute), per_minute / 60.0))
+
+        add(('user', ctx.platform, ctx.sender_id), conf.cooldown_user_per_minute)
+        if ctx.group_id:
+            add(('group', ctx.platform, ctx.group_id), conf.cooldown_group_per_minute)
+        if ctx.route in _HEAVY_COMMAND_ROUTES:
+            add(('cmd', ctx.platform, ctx.sender_id, ctx.route), conf.cooldown_heavy_command_per_minute)
+        if not rules:
+            return None
+        wait = self._cooldown_buckets.acquire(rules)
+        if wait <= 0:
+            return None
+        now = time.monotonic()
+        notice_key = (ctx.platform, ctx.sender_id)
+        if self._cooldown_notice_until.get(notice_key, 0.0) > now:
+            return ""
+        self._cooldown_notice_until[notice_key] = now + wait
+        self._cooldown_notice_until.move_to_end(notice_key)
+        while len(self._cooldown_notice_until) > 4096:
+            self._cooldown_notice_until.popitem(last=False)
+        logger.info(f"命令冷却: user={ctx.sender_id} group={ctx.group_id} route={ctx.route} 需等待 {wait:.1f}s")
+        return f"操作过于频繁，请 {max(1, math.ceil(wait))} 秒后再试"
+
+    def _record_fanout(self, budget: _CallBudget, first_reply: Optional[float] = None) -> None:
+        self._fanout_stats.record(budget, first_reply)
+        if budget.used > 1 or budget.denied:
+            hosts = ", ".join(f"{h}×{n}" for h, n in budget.hosts.most_common())
+            first = f", 首条回复 {first_reply * 1000:.0f}ms" if first_reply is not None else ""
+            logger.info(
+                f"上游扇出: {budget.route} 调用 {budget.used} 次, 并行峰值 {budget.peak}, "
+                f"预算拒绝 {budget.denied} 次{first} [{hosts}]"
+            )
+        if self._fanout_stats.summary_due():
+            logger.info("上游扇出累计统计:\n" + "\n".join(self._fanout_stats.summary_lines()))
+
+    async def _run_admitted(self, event: AstrMessageEvent, ctx: _CommandContext, handler: Callable[..., Any]):
+        """重型命令在并发名额内执行；排队已满或等待超时则直接回复繁忙。"""
+        conf = self._conf
+        ok = await self._heavy_admission.acquire(
+            conf.heavy_command_max_concurrent,
+            conf.heavy_command_max_queue,
+            float(conf.heavy_command_queue_timeout_seconds),
+        )
+        if not ok:
+            logger.info(f"准入控制: 拒绝 {ctx.route}（执行中 {self._heavy_admission.active}，排队 {self._heavy_admission.queued}）")
+            yield event.plain_result("当前查询人数较多，请稍后再试")
+            return
+        # 截止时间从取得执行名额起重新计算，排队等待不占用命令的执行时间
+        seconds = conf.deadline_for(ctx.route)
+        token = _COMMAND_DEADLINE.set(time.monotonic() + seconds if seconds else None)
+        try:
+            async for r in handler(event, ctx):
+                yield r
+        finally:
+            self._heavy_admission.release()
+            try:
+                _COMMAND_DEADLINE.reset(token)
+            except ValueError:
+                pass
 
     # ******************************************************
     # 命令处理与消息监听 
@@ -2063,145 +4569,125 @@ class TmpBotPlugin(Star):
                     target_event = kw_event
 
         msg = (getattr(target_event, "message_str", "") or "").strip()
-        if not msg:
+        if not msg or not _may_be_command(msg):
             return
 
-        message_obj = getattr(target_event, "message_obj", None)
-        has_at = False
-        at_user_id = None
-        if message_obj is not None:
-            try:
-                chain = getattr(message_obj, "message", None) or []
-                for seg in chain:
-                    seg_type = getattr(seg, "type", None)
-                    if isinstance(seg, dict):
-                        seg_type = seg.get("type") or seg_type
-                    if isinstance(seg_type, str) and seg_type.lower() == "at":
-                        has_at = True
-                        # 提取被艾特用户的ID
-                        uid = (
-                            getattr(seg, "qq", None)
-                            or getattr(seg, "user_id", None)
-                            or getattr(seg, "id", None)
-                        )
-                        if isinstance(seg, dict):
-                            uid = seg.get("qq") or seg.get("user_id") or seg.get("id") or uid
-                        if uid is not None:
-                            at_user_id = str(uid)
-                        break
-                    uid = (
-                        getattr(seg, "qq", None)
-                        or getattr(seg, "user_id", None)
-                        or getattr(seg, "id", None)
-                    )
-                    if isinstance(seg, dict):
-                        uid = seg.get("qq") or seg.get("user_id") or seg.get("id") or uid
-                    if uid is not None:
-                        has_at = True
-                        break
-            except Exception:
-                has_at = False
-                at_user_id = None
+        ctx = self._build_command_context(target_event, msg)
+        route = ctx.route
+        if route is None:
+            return
+        notice = self._check_cooldown(ctx)
+        if notice is not None:
+            if notice:
+                yield event.plain_result(notice)
+            return
 
-        if re.match(r'^(查询|查)(\s*\d+)?\s*$', msg) or (re.match(r'^(查询|查)(\s|$)', msg) and has_at):
-            async for r in self.tmpquery(event):
+        seconds = self._conf.deadline_for(route)
+        budget = _CallBudget(route, self._conf.call_budget_for(route))
+        token = _COMMAND_DEADLINE.set(time.monotonic() + seconds if seconds else None)
+        budget_token = _COMMAND_BUDGET.set(budget)
+        memo_token = _COMMAND_MEMO.set({})
+        started = time.monotonic()
+        first_reply: Optional[float] = None
+        try:
+            async for r in self._dispatch_command(event, ctx):
+                if first_reply is None:
+                    first_reply = time.monotonic() - started
+                yield r
+        finally:
+            try:
+                _COMMAND_MEMO.reset(memo_token)
+                _COMMAND_BUDGET.reset(budget_token)
+                _COMMAND_DEADLINE.reset(token)
+            except ValueError:
+                # 生成器在其他上下文中被关闭时无法还原，直接清除
+                _COMMAND_MEMO.set(None)
+                _COMMAND_BUDGET.set(None)
+                _COMMAND_DEADLINE.set(None)
+            self._record_fanout(budget, first_reply)
+
+    async def _dispatch_command(self, event: AstrMessageEvent, ctx: _CommandContext):
+        """按路由执行命令；调用方已设置好本命令的截止时间。"""
+        route = ctx.route
+        has_at = ctx.has_at
+        at_user_id = ctx.at_user_id
+
+        if route == 'query_batch':
+            async for r in self._run_admitted(event, ctx, self.tmpquery_batch):
+                yield r
+            return
+        if route == 'query':
+            async for r in self.tmpquery(event, ctx):
                 yield r
             return
-        if msg == "地图dlc" or msg == "地图DLC":
-            async for r in self.tmpdlc_list(event):
+        if route == 'dlc_list':
+            async for r in self._run_admitted(event, ctx, self.tmpdlc_list):
                 yield r
             return
-        if re.match(r'^绑定\s*\d+\s*$', msg):
-            async for r in self.tmpbind(event):
+        if route == 'bind':
+            async for r in self.tmpbind(event, ctx):
                 yield r
             return
-        if re.match(r'^解绑\s*$', msg):
-            async for r in self.tmpunbind(event):
+        if route == 'unbind':
+            async for r in self.tmpunbind(event, ctx):
                 yield r
             return
-        if re.match(r'^定位(\s*\d+)?\s*$', msg) or (msg.startswith("定位") and has_at):
-            async for r in self.tmplocate(event):
+        if route == 'locate':
+            async for r in self._run_admitted(event, ctx, self.tmplocate):
                 yield r
             return
-        if re.match(r'^总里程排行\s*$', msg):
-            async for r in self.tmprank_total(event):
+        if route == 'rank_total':
+            async for r in self._run_coalesced(event, ctx, self.tmprank_total):
                 yield r
             return
-        if re.match(r'^今日里程排行\s*$', msg):
-            async for r in self.tmprank_today(event):
+        if route == 'rank_today':
+            async for r in self._run_coalesced(event, ctx, self.tmprank_today):
                 yield r
             return
-        if re.match(r'^足迹(?:\s*\S+)?(?:\s*\d+)?\s*$', msg) or (msg.startswith("足迹") and has_at):
-            async for r in self.tmptoday_footprint(event):
+        if route == 'footprint':
+            async for r in self._run_admitted(event, ctx, self.tmptoday_footprint):
                 yield r
             return
-        if re.match(r'^服务器\s*$', msg):
-            async for r in self.tmpserver(event):
+        if route == 'server':
+            async for r in self._run_coalesced(event, ctx, self.tmpserver):
                 yield r
             return
-        if re.match(r'^路况(?:\s*\S+)?\s*$', msg):
-            async for r in self.tmptraffic(event):
+        if route == 'traffic':
+            async for r in self._run_coalesced(event, ctx, self.tmptraffic):
                 yield r
             return
-        if re.match(r'^插件版本\s*$', msg):
-            async for r in self.tmpversion(event):
+        if route == 'version':
+            async for r in self.tmpversion(event, ctx):
                 yield r
             return
-        if re.match(r'^菜单\s*$', msg):
-            async for r in self.tmphelp(event):
+        if route == 'help':
+            async for r in self.tmphelp(event, ctx):
                 yield r
             return
         
-        if re.match(r'^历史车队(\s*\d+)?\s*$', msg) or (msg.startswith("历史车队") and has_at):
-            async for r in self.tmpvtc_history(event):
+        if route == 'vtc_history':
+            async for r in self.tmpvtc_history(event, ctx):
                 yield r
             return
         
-        if re.match(r'^成员管理\s*$', msg):
+        if route == 'member_help':
             # 检查车队成员管理功能个人白名单
-            vtcm_member_whitelist_users = self._cfg_str('vtcm_member_whitelist_users', '').strip()
-            if vtcm_member_whitelist_users:
-                try:
-                    user_id = str(event.get_sender_id()) if hasattr(event, 'get_sender_id') else ''
-                    if not user_id:
-                        user_id = str(event.user_id) if hasattr(event, 'user_id') and event.user_id else ''
-                    if user_id:
-                        # 分割并去除空格
-                        whitelist_users = [u.strip() for u in vtcm_member_whitelist_users.split(',')]
-                        if user_id not in whitelist_users:
-                            yield event.plain_result("您未授权使用成员管理功能")
-                            return
-                except:
-                    pass
-            async for r in self.tmp_member_help(event):
+            if not self._conf.member_allowed(ctx.sender_id):
+                yield event.plain_result("您未授权使用成员管理功能")
+                return
+            async for r in self.tmp_member_help(event, ctx):
                 yield r
             return
         
-        if re.match(r'^新添成员\s+\d+\s+\d+\s+\d+\s*$', msg):
-            match = re.search(r'新添成员\s*(\d+)\s*(\d+)\s*(\d+)', msg)
-            if not match:
-                yield event.plain_result("用法: 新添成员 [tmpId] [车队编号] [QQ号]")
-                return
-            
-            tmp_id = match.group(1)
-            team_number = match.group(2)
-            qq = match.group(3)
+        if route == 'member_add':
+            tmp_id = ctx.args.get('tmp_id')
+            team_number = ctx.args.get('team')
+            qq = ctx.args.get('qq')
             
             # 检查车队成员管理功能个人白名单
-            vtcm_member_whitelist_users = self._cfg_str('vtcm_member_whitelist_users', '').strip()
-            if vtcm_member_whitelist_users:
-                try:
-                    user_id = str(event.get_sender_id()) if hasattr(event, 'get_sender_id') else ''
-                    if not user_id:
-                        user_id = str(event.user_id) if hasattr(event, 'user_id') and event.user_id else ''
-                    if user_id:
-                        # 分割并去除空格
-                        whitelist_users = [u.strip() for u in vtcm_member_whitelist_users.split(',')]
-                        if user_id not in whitelist_users:
-                            yield event.plain_result("您未授权使用成员管理功能")
-                            return
-                except:
-                    pass
+            if not self._conf.member_allowed(ctx.sender_id):
+                yield event.plain_result("您未授权使用成员管理功能")
+                return
             
             try:
                 result = await self._add_member(tmp_id, team_number, qq)
@@ -2233,29 +4719,13 @@ class TmpBotPlugin(Star):
                 yield event.plain_result("添加成员失败，此人已存在")
             return
         
-        if re.match(r'^删除成员\s+\d+\s*$', msg):
-            match = re.search(r'删除成员\s*(\d+)', msg)
-            if not match:
-                yield event.plain_result("用法: 删除成员 [tmpId]")
-                return
-            
-            tmp_id = match.group(1)
+        if route == 'member_remove':
+            tmp_id = ctx.args.get('tmp_id')
             
             # 检查车队成员管理功能个人白名单
-            vtcm_member_whitelist_users = self._cfg_str('vtcm_member_whitelist_users', '').strip()
-            if vtcm_member_whitelist_users:
-                try:
-                    user_id = str(event.get_sender_id()) if hasattr(event, 'get_sender_id') else ''
-                    if not user_id:
-                        user_id = str(event.user_id) if hasattr(event, 'user_id') and event.user_id else ''
-                    if user_id:
-                        # 分割并去除空格
-                        whitelist_users = [u.strip() for u in vtcm_member_whitelist_users.split(',')]
-                        if user_id not in whitelist_users:
-                            yield event.plain_result("您未授权使用成员管理功能")
-                            return
-                except:
-                    pass
+            if not self._conf.member_allowed(ctx.sender_id):
+                yield event.plain_result("您未授权使用成员管理功能")
+                return
             
             try:
                 result = await self._remove_member(tmp_id)
@@ -2286,7 +4756,7 @@ class TmpBotPlugin(Star):
                 yield event.plain_result("删除成员失败，请稍后重试")
             return
         
-        if re.match(r'^加积分\s+(\S+)\s+\d+\s*$', msg) or (msg.startswith("加积分") and has_at):
+        if route == 'point_add':
             uid = None
             tmp_id = None
             quantity = None
@@ -2294,24 +4764,24 @@ class TmpBotPlugin(Star):
             if has_at and at_user_id:
                 # 艾特用户的情况
                 # 匹配消息末尾的数字作为积分数量
-                match = re.search(r'加积分.*?(\d+)$', msg)
-                if not match:
+                quantity_str = ctx.arg('quantity', r'加积分.*?(\d+)$')
+                if not quantity_str:
                     yield event.plain_result("用法: 加积分 @用户 [积分数量]")
                     return
-                quantity = int(match.group(1))
+                quantity = int(quantity_str)
                 # 从绑定数据中获取被艾特用户的TMP ID
-                tmp_id = self._get_bound_tmp_id(at_user_id)
+                tmp_id = await self._get_bound_tmp_id(at_user_id, ctx.platform)
                 if not tmp_id:
                     yield event.plain_result("该用户未绑定TMP ID，请先绑定后再操作")
                     return
             else:
                 # 普通输入参数的情况
-                match = re.search(r'加积分\s+(\S+)\s+(\d+)', msg)
-                if not match:
+                param = ctx.arg('target', r'加积分\s+(\S+)\s+(\d+)')
+                quantity_str = ctx.arg('quantity', r'加积分\s+(\S+)\s+(\d+)', 2)
+                if not param or not quantity_str:
                     yield event.plain_result("用法: 加积分 [TMP ID/UID] [积分数量]")
                     return
-                param = match.group(1)
-                quantity = int(match.group(2))
+                quantity = int(quantity_str)
                 
                 # 自动识别参数类型：依次尝试不同的参数类型
                 # 1. 先尝试作为TMP ID查询
@@ -2330,26 +4800,15 @@ class TmpBotPlugin(Star):
                         return
             
             # 检查加减积分功能是否启用
-            vtcm_point_feature_enable = self._cfg_bool('vtcm_point_feature_enable', False)
+            vtcm_point_feature_enable = self._conf.vtcm_point_feature_enable
             if not vtcm_point_feature_enable:
                 yield event.plain_result("加减积分功能未启用")
                 return
             
             # 检查车队成员管理功能个人白名单
-            vtcm_member_whitelist_users = self._cfg_str('vtcm_member_whitelist_users', '').strip()
-            if vtcm_member_whitelist_users:
-                try:
-                    user_id = str(event.get_sender_id()) if hasattr(event, 'get_sender_id') else ''
-                    if not user_id:
-                        user_id = str(event.user_id) if hasattr(event, 'user_id') and event.user_id else ''
-                    if user_id:
-                        # 分割并去除空格
-                        whitelist_users = [u.strip() for u in vtcm_member_whitelist_users.split(',')]
-                        if user_id not in whitelist_users:
-                            yield event.plain_result("您未授权使用成员管理功能")
-                            return
-                except:
-                    pass
+            if not self._conf.member_allowed(ctx.sender_id):
+                yield event.plain_result("您未授权使用成员管理功能")
+                return
             
             try:
                 # 根据参数类型查询用户信息
@@ -2400,7 +4859,7 @@ class TmpBotPlugin(Star):
                 yield event.plain_result("加积分失败，请稍后重试")
             return
         
-        if re.match(r'^减积分\s+(\S+)\s+\d+\s*$', msg) or (msg.startswith("减积分") and has_at):
+        if route == 'point_sub':
             uid = None
             tmp_id = None
             quantity = None
@@ -2408,24 +4867,24 @@ class TmpBotPlugin(Star):
             if has_at and at_user_id:
                 # 艾特用户的情况
                 # 匹配消息末尾的数字作为积分数量
-                match = re.search(r'减积分.*?(\d+)$', msg)
-                if not match:
+                quantity_str = ctx.arg('quantity', r'减积分.*?(\d+)$')
+                if not quantity_str:
                     yield event.plain_result("用法: 减积分 @用户 [积分数量]")
                     return
-                quantity = int(match.group(1))
+                quantity = int(quantity_str)
                 # 从绑定数据中获取被艾特用户的TMP ID
-                tmp_id = self._get_bound_tmp_id(at_user_id)
+                tmp_id = await self._get_bound_tmp_id(at_user_id, ctx.platform)
                 if not tmp_id:
                     yield event.plain_result("该用户未绑定TMP ID，请先绑定后再操作")
                     return
             else:
                 # 普通输入参数的情况
-                match = re.search(r'减积分\s+(\S+)\s+(\d+)', msg)
-                if not match:
+                param = ctx.arg('target', r'减积分\s+(\S+)\s+(\d+)')
+                quantity_str = ctx.arg('quantity', r'减积分\s+(\S+)\s+(\d+)', 2)
+                if not param or not quantity_str:
                     yield event.plain_result("用法: 减积分 [TMP ID/UID] [积分数量]")
                     return
-                param = match.group(1)
-                quantity = int(match.group(2))
+                quantity = int(quantity_str)
                 
                 # 自动识别参数类型：依次尝试不同的参数类型
                 # 1. 先尝试作为TMP ID查询
@@ -2444,26 +4903,15 @@ class TmpBotPlugin(Star):
                         return
             
             # 检查加减积分功能是否启用
-            vtcm_point_feature_enable = self._cfg_bool('vtcm_point_feature_enable', False)
+            vtcm_point_feature_enable = self._conf.vtcm_point_feature_enable
             if not vtcm_point_feature_enable:
                 yield event.plain_result("加减积分功能未启用")
                 return
             
             # 检查车队成员管理功能个人白名单
-            vtcm_member_whitelist_users = self._cfg_str('vtcm_member_whitelist_users', '').strip()
-            if vtcm_member_whitelist_users:
-                try:
-                    user_id = str(event.get_sender_id()) if hasattr(event, 'get_sender_id') else ''
-                    if not user_id:
-                        user_id = str(event.user_id) if hasattr(event, 'user_id') and event.user_id else ''
-                    if user_id:
-                        # 分割并去除空格
-                        whitelist_users = [u.strip() for u in vtcm_member_whitelist_users.split(',')]
-                        if user_id not in whitelist_users:
-                            yield event.plain_result("您未授权使用成员管理功能")
-                            return
-                except:
-                    pass
+            if not self._conf.member_allowed(ctx.sender_id):
+                yield event.plain_result("您未授权使用成员管理功能")
+                return
             
             try:
                 # 根据参数类型查询用户信息
@@ -2514,30 +4962,21 @@ class TmpBotPlugin(Star):
                 yield event.plain_result("减积分失败，请稍后重试")
             return
         
+        if route not in _VTCM_ROUTES:
+            return
+
         # 检查车队平台功能是否启用
-        vtcm_feature_enable = self._cfg_bool('vtcm_feature_enable', True)
+        vtcm_feature_enable = self._conf.vtcm_feature_enable
         if not vtcm_feature_enable:
             return
         
         # 检查群白名单
-        vtcm_whitelist_groups = self._cfg_str('vtcm_whitelist_groups', '').strip()
-        if vtcm_whitelist_groups:
-            try:
-                group_id = str(event.get_group_id()) if hasattr(event, 'get_group_id') else ''
-                if not group_id:
-                    group_id = str(event.group_id) if hasattr(event, 'group_id') and event.group_id else ''
-                if group_id:
-                    # 分割并去除空格
-                    whitelist_groups = [g.strip() for g in vtcm_whitelist_groups.split(',')]
-                    if group_id not in whitelist_groups:
-                        return
-            except:
-                pass
+        if not self._conf.group_allowed(ctx.group_id):
+            return
         
-        if re.match(r'^活动(\s+\d+)?(\s+\d+)?\s*$', msg):
-            match = re.search(r'活动\s*(\d+)?\s*(\d+)?', msg)
-            page_num = match.group(1) if match and match.group(1) else 1
-            page_size = match.group(2) if match and match.group(2) else 10
+        if route == 'event_list':
+            page_num = ctx.args.get('page') or 1
+            page_size = ctx.args.get('size') or 10
             
             try:
                 event_data = await self._get_event_list(page_size, page_num)
@@ -2591,7 +5030,7 @@ class TmpBotPlugin(Star):
                 yield event.plain_result("查询活动列表失败，请稍后重试")
             return
         
-        if re.match(r'^今日活动\s*$', msg):
+        if route == 'event_today':
             try:
                 # 获取今日日期
                 today = datetime.now().strftime('%Y-%m-%d')
@@ -2640,9 +5079,8 @@ class TmpBotPlugin(Star):
                 yield event.plain_result("查询今日活动失败，请稍后重试")
             return
         
-        if re.match(r'^信息(\s+\S+)?\s*$', msg) or (msg.startswith("信息") and has_at):
-            match = re.search(r'信息\s*(\S+)?', msg)
-            query_param = match.group(1) if match else None
+        if route == 'member_info':
+            query_param = ctx.arg('param', r'信息\s*(\S+)?')
             
             try:
                 uid = ''
@@ -2653,7 +5091,7 @@ class TmpBotPlugin(Star):
                     # 艾特用户的情况
                     logger.info(f"艾特用户ID: {at_user_id}")
                     # 从绑定数据中获取被艾特用户的TMP ID
-                    tmp_id = self._get_bound_tmp_id(at_user_id)
+                    tmp_id = await self._get_bound_tmp_id(at_user_id, ctx.platform)
                     if not tmp_id:
                         yield event.plain_result("该用户未绑定TMP ID，请先绑定后再操作")
                         return
@@ -2665,8 +5103,8 @@ class TmpBotPlugin(Star):
                         return
                 elif not query_param:
                     # 无参数的情况，查询自己
-                    user_id = event.get_sender_id()
-                    bound_tmp_id = self._get_bound_tmp_id(user_id)
+                    user_id = ctx.sender_id
+                    bound_tmp_id = await self._get_bound_tmp_id(user_id, ctx.platform)
                     if bound_tmp_id:
                         logger.info(f"用户已绑定，使用绑定的TMP ID: {bound_tmp_id}")
                         tmp_id = bound_tmp_id
@@ -2742,14 +5180,9 @@ class TmpBotPlugin(Star):
                 yield event.plain_result("查询成员信息失败，请稍后重试")
             return
         
-        if re.match(r'^修改密码\s+\d+\s+\S+\s*$', msg):
-            match = re.search(r'修改密码\s*(\d+)\s*(\S+)', msg)
-            if not match:
-                yield event.plain_result("用法: 修改密码 [用户ID] [新密码]")
-                return
-            
-            uid = match.group(1)
-            password = match.group(2)
+        if route == 'change_password':
+            uid = ctx.args.get('uid')
+            password = ctx.args.get('password')
             
             if len(password) < 6:
                 yield event.plain_result("密码长度至少6位")
@@ -2866,42 +5299,23 @@ class TmpBotPlugin(Star):
 
     # 具体功能实现
 
-    async def tmpquery(self, event: AstrMessageEvent):
+    async def tmpquery(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 查询] 玩家完整信息查询。支持输入 TMP ID 或 Steam ID。"""
-        message_str = event.message_str.strip()
-        user_id = event.get_sender_id()
-
-        target_user_id = None
-        message_obj = getattr(event, "message_obj", None)
-        if message_obj is not None:
-            try:
-                chain = getattr(message_obj, "message", None) or []
-                for seg in chain:
-                    seg_type = getattr(seg, "type", None)
-                    if isinstance(seg, dict):
-                        seg_type = seg.get("type") or seg_type
-                    if isinstance(seg_type, str) and seg_type.lower() == "at":
-                        uid = (
-                            getattr(seg, "qq", None)
-                            or getattr(seg, "user_id", None)
-                            or getattr(seg, "id", None)
-                        )
-                        if isinstance(seg, dict):
-                            uid = seg.get("qq") or seg.get("user_id") or seg.get("id") or uid
-                        if uid:
-                            target_user_id = str(uid)
-                            break
-                    uid2 = getattr(seg, "qq", None)
-                    if isinstance(seg, dict):
-                        uid2 = seg.get("qq") or uid2
-                    if uid2:
-                        target_user_id = str(uid2)
-                        break
-            except Exception:
-                target_user_id = None
-
-        match = re.search(r'(查询|查)\s*(\d+)', message_str) 
-        input_id = match.group(2) if match else None
+        # 渐进回复提前启动的任务：命令超时或生成器被提前关闭时一并取消，避免继续消耗调用预算
+        spawned: List[asyncio.Future] = []
+        try:
+            async for r in self._tmpquery(event, ctx, spawned):
+                yield r
+        finally:
+            for t in spawned:
+                if not t.done():
+                    t.cancel()
+
+    async def _tmpquery(self, event: AstrMessageEvent, ctx: Optional[_CommandContext], spawned: List[asyncio.Future]):
+        ctx = ctx or self._build_command_context(event)
+        user_id = ctx.sender_id
+        target_user_id = ctx.mention_user_id
+        input_id = ctx.arg('id', r'(查询|查)\s*(\d+)', 2)
         
         tmp_id = None
         
@@ -2923,25 +5337,43 @@ class TmpBotPlugin(Star):
                 tmp_id = input_id
         else:
             bind_user_id = target_user_id or user_id
-            tmp_id = self._get_bound_tmp_id(bind_user_id)
+            tmp_id = await self._get_bound_tmp_id(bind_user_id, ctx.platform)
         
         if not tmp_id:
             yield event.plain_result("请输入正确的玩家编号 TMP ID")
             return
         
+        # 渐进回复：首条消息只等必需数据，头像、车队职位、封禁详情随第二条消息发送
+        progressive = self._conf.progressive_reply_enable
+        optional_sources = {
+            'online': self._get_online_status(tmp_id),
+            'stats': self._get_player_stats(tmp_id),
+        }
+        bans_task: Optional[asyncio.Future] = None
+        if progressive:
+            bans_task = asyncio.ensure_future(self._get_player_bans(tmp_id))
+            spawned.append(bans_task)
+        else:
+            optional_sources['bans'] = self._get_player_bans(tmp_id)
         try:
-            # 并行查询：仅使用 V2 和相关接口（移除已失效的 V1）
-            player_info_raw, bans_info, online_status, stats_info = await asyncio.gather(
-                self._get_player_info(tmp_id),
-                self._get_player_bans(tmp_id),
-                self._get_online_status(tmp_id),
-                self._get_player_stats(tmp_id)
+            # 并行查询：玩家不存在时立即取消其余来源；可选来源超过软超时则标记为暂不可用
+            required, optional, unavailable = await _fan_out(
+                {'info': self._get_player_info(tmp_id)},
+                optional_sources,
+                self._conf.query_source_timeouts,
             )
-            player_info = player_info_raw
+            player_info = required['info']
+            bans_info = optional.get('bans') or []
+            online_status = optional.get('online') or {}
+            stats_info = optional.get('stats') or {}
         except PlayerNotFoundException as e:
+            if bans_task:
+                bans_task.cancel()
             yield event.plain_result(str(e))
             return
         except Exception as e:
+            if bans_task:
+                bans_task.cancel()
             yield event.plain_result(f"查询失败: {str(e)}")
             return
             
@@ -2956,6 +5388,39 @@ class TmpBotPlugin(Star):
                 ban_count = int(str(bans_count_raw).strip())
             except Exception:
                 pass
+        ban_count_text = f"{ban_count}次"
+        if bans_count_raw is None and 'bans' in unavailable:
+            ban_count_text = SOURCE_UNAVAILABLE_TEXT
+
+        def _ban_details(sorted_bans: List[Dict], bans_missing: bool) -> str:
+            if not is_banned:
+                return ""
+            text = ""
+            current_ban = None
+            if sorted_bans:
+                current_ban = next((ban for ban in sorted_bans if ban.get('active')), None)
+                if not current_ban:
+                    current_ban = sorted_bans[0]
+                    
+            if current_ban:
+                ban_reason_raw = current_ban.get('reason', '未知封禁原因 (API V2)')
+                ban_reason = self._translate_ban_reason(ban_reason_raw)
+                ban_expiration = current_ban.get('expiration', banned_until_main) 
+                
+                text += f"🚫封禁原因: {ban_reason}\n"
+                
+                if ban_expiration and isinstance(ban_expiration, str) and ban_expiration.lower().startswith('never'):
+                    text += f"🚫封禁截止: 永久封禁\n"
+                else:
+                    text += f"🚫封禁截止: {_format_timestamp_to_beijing(ban_expiration)}\n"
+                    
+            else:
+                text += f"🚫封禁原因: {SOURCE_UNAVAILABLE_TEXT if bans_missing else '隐藏'}\n"
+                if banned_until_main and isinstance(banned_until_main, str) and banned_until_main.lower().startswith('never'):
+                    text += f"🚫封禁截止: 永久封禁\n"
+                else:
+                    text += f"🚫封禁截止: {_format_timestamp_to_beijing(banned_until_main)}\n"
+            return text
         
         last_online_raw = (
             player_info.get('lastOnline')
@@ -3003,11 +5468,15 @@ class TmpBotPlugin(Star):
         vtc = player_info.get('vtc') if isinstance(player_info.get('vtc'), dict) else {}
         vtc_name = vtc.get('name')
         vtc_role = vtc.get('role') or vtc.get('position') or stats_info.get('vtcRole')
+        role_task: Optional[asyncio.Future] = None
         
         # 只有当有车队时才显示车队信息
         if vtc_name:
             body += f"🚚所属车队: {vtc_name}\n"
-            if not vtc_role:
+            if not vtc_role and progressive:
+                role_task = asyncio.ensure_future(self._get_vtc_member_role(tmp_id, vtc))
+                spawned.append(role_task)
+            elif not vtc_role:
                 try:
                     vtc_role_remote = await self._get_vtc_member_role(tmp_id, vtc)
                     if vtc_role_remote:
@@ -3108,6 +5577,8 @@ class TmpBotPlugin(Star):
         except Exception:
             daily_val = 0.0
 
+        if 'stats' in unavailable:
+            body += f"🚩里程信息: {SOURCE_UNAVAILABLE_TEXT}\n"
         if total_val > 0:
             body += f"🚩历史里程: {total_val:.2f}公里/km\n"
         if daily_val > 0:
@@ -3116,34 +5587,11 @@ class TmpBotPlugin(Star):
         # --- 封禁信息 (不变) ---
         body += f"🚫是否封禁: {'是' if is_banned else '否'}\n"
         
-        body += f"🚫历史封禁: {ban_count}次\n"
-
-        if is_banned:
-            
-            current_ban = None
-            if sorted_bans:
-                current_ban = next((ban for ban in sorted_bans if ban.get('active')), None)
-                if not current_ban:
-                    current_ban = sorted_bans[0]
-                    
-            if current_ban:
-                ban_reason_raw = current_ban.get('reason', '未知封禁原因 (API V2)')
-                ban_reason = self._translate_ban_reason(ban_reason_raw)
-                ban_expiration = current_ban.get('expiration', banned_until_main) 
-                
-                body += f"🚫封禁原因: {ban_reason}\n"
-                
-                if ban_expiration and isinstance(ban_expiration, str) and ban_expiration.lower().startswith('never'):
-                    body += f"🚫封禁截止: 永久封禁\n"
-                else:
-                    body += f"🚫封禁截止: {_format_timestamp_to_beijing(ban_expiration)}\n"
-                    
-            else:
-                body += f"🚫封禁原因: 隐藏\n"
-                if banned_until_main and isinstance(banned_until_main, str) and banned_until_main.lower().startswith('never'):
-                    body += f"🚫封禁截止: 永久封禁\n"
-                else:
-                    body += f"🚫封禁截止: {_format_timestamp_to_beijing(banned_until_main)}\n"
+        if not progressive:
+            body += f"🚫历史封禁: {ban_count_text}\n"
+            body += _ban_details(sorted_bans, 'bans' in unavailable)
+        elif bans_count_raw is not None:
+            body += f"🚫历史封禁: {ban_count_text}\n"
         
     
         if online_status and online_status.get('online'):
@@ -3180,16 +5628,25 @@ class TmpBotPlugin(Star):
             body += f"📶在线状态: 在线\n"
             body += f"📶所在服务器: {server_name}\n"
             body += f"📶所在位置: {location_display}"
+        elif 'online' in unavailable:
+            body += f"📶在线状态: {SOURCE_UNAVAILABLE_TEXT}\n"
+            if last_online_formatted:
+                body += f"📶上次在线: {last_online_formatted}"
         else:
             body += f"📶在线状态: 离线\n"
             if last_online_formatted:
                 body += f"📶上次在线: {last_online_formatted}"
         
         # 头像（强制按组件发送）
-        show_avatar_cfg = self._cfg_bool('query_show_avatar_enable', True)
+        show_avatar_cfg = self._conf.query_show_avatar_enable
         logger.info(f"查询详情: 头像开关={'ON' if show_avatar_cfg else 'OFF'}，将组合 Image+Plain 统一发送。")
         avatar_url = self._normalize_avatar_url(player_info.get('avatar') or stats_info.get('avatar_url'))
         logger.info(f"查询详情: 规范化后URL={avatar_url}")
+        if progressive:
+            async for r in self._query_second_phase(event, tmp_id, body, show_avatar_cfg, avatar_url,
+                                                    role_task, bans_task, bans_count_raw is None, _ban_details):
+                yield r
+            return
         components = []
         # 发送顺序控制：当头像关闭时，将标题与正文合并为一个文本组件以保证换行在同一组件内生效
         if not show_avatar_cfg:
@@ -3199,19 +5656,137 @@ class TmpBotPlugin(Star):
             return
         else:
             # 头像开启：头像 -> 空行 -> 正文
-            if avatar_url:
-                try:
-                    logger.info("查询详情: 组合消息链添加 Image(URL) 组件")
-                    components.append(Image.fromURL(avatar_url))
-                except Exception:
-                    logger.error("查询详情: 生成 Image(URL) 组件失败，跳过头像", exc_info=True)
-            else:
-                logger.info("查询详情: 无可用头像URL，跳过头像组件")
+            try:
+                avatar = await self._avatar_component(avatar_url, tmp_id)
+                if avatar is not None:
+                    logger.info("查询详情: 组合消息链添加 Image 组件")
+                    components.append(avatar)
+                else:
+                    logger.info("查询详情: 无可用头像，跳过头像组件")
+            except Exception:
+                logger.error("查询详情: 生成 Image 组件失败，跳过头像", exc_info=True)
             components.append(Plain(body))
             yield event.chain_result(components)
             return
 
-    async def tmpdlc_list(self, event: AstrMessageEvent):
+    async def _query_second_phase(self, event: AstrMessageEvent, tmp_id: str, body: str,
+                                  show_avatar: bool, avatar_url: Optional[str],
+                                  role_task: Optional[asyncio.Future], bans_task: Optional[asyncio.Future],
+                                  need_ban_count: bool, ban_details: Callable[[List[Dict], bool], str]):
+        """渐进回复：先发送正文，再把头像与较慢的车队职位、封禁详情合成第二条消息。"""
+        try:
+            yield event.plain_result(body)
+            extra = ""
+            if role_task is not None:
+                try:
+                    vtc_role = await role_task
+                    if vtc_role:
+                        extra += f"🚚车队职位: {vtc_role}\n"
+                except Exception as e:
+                    logger.info(f"查询详情: 获取 VTC 车队角色时发生异常: {e}", exc_info=False)
+            if bans_task is not None:
+                try:
+                    bans_info = await bans_task
+                    bans_missing = False
+                except Exception:
+                    bans_info, bans_missing = [], True
+                ban_count, sorted_bans = self._format_ban_info(bans_info)
+                if need_ban_count:
+                    extra += f"🚫历史封禁: {SOURCE_UNAVAILABLE_TEXT if bans_missing else f'{ban_count}次'}\n"
+                extra += ban_details(sorted_bans, bans_missing)
+            components = []
+            if show_avatar:
+                try:
+                    avatar = await self._avatar_component(avatar_url, tmp_id)
+                    if avatar is not None:
+                        components.append(avatar)
+                except Exception:
+                    logger.error("查询详情: 生成 Image 组件失败，跳过头像", exc_info=True)
+            if extra:
+                components.append(Plain(extra.rstrip("\n")))
+            if components:
+                yield event.chain_result(components)
+            logger.info(f"查询详情: 渐进回复完成 tmp_id={tmp_id} 第二条消息组件数={len(components)}")
+        finally:
+            for t in (role_task, bans_task):
+                if t is not None and not t.done():
+                    t.cancel()
+
+    async def tmpquery_batch(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
+        """[命令: 查询 ID1 ID2 ...] 批量查询多名玩家，或查询时 @ 多名已绑定的群成员，结果汇总为一张简表。"""
+        ctx = ctx or self._build_command_context(event)
+        notes: List[str] = []
+        raw_ids = ctx.arg('ids', r'(?:查询|查)\s*(\d+(?:[\s,，]+\d+)+)')
+        if raw_ids:
+            ids = re.findall(r'\d+', raw_ids)
+        else:
+            bound = await self._get_bound_tmp_ids(ctx.mentions, ctx.platform)
+            ids = [bound[uid] for uid in ctx.mentions if uid in bound]
+            unbound = [uid for uid in ctx.mentions if uid not in bound]
+            if unbound:
+                notes.append(f"未绑定 TMP ID 的成员: {', '.join(unbound)}")
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            yield event.plain_result("\n".join(notes) or "请输入正确的玩家编号 TMP ID")
+            return
+        limit = max(1, self._conf.batch_query_max_ids)
+        if len(ids) > limit:
+            notes.append(f"单次最多查询 {limit} 名玩家，已忽略其余 {len(ids) - limit} 个")
+            ids = ids[:limit]
+
+        # 有界并发：各玩家共用玩家资料缓存与本命令的调用预算
+        semaphore = asyncio.Semaphore(max(1, self._conf.batch_query_concurrency))
+
+        async def _row(input_id: str) -> str:
+            async with semaphore:
+                return await self._batch_query_row(input_id)
+
+        rows = await asyncio.gather(*(_row(i) for i in ids))
+        lines = [f"📋 批量查询 ({len(ids)}人)", "TMP ID | 玩家 | 车队 | 在线状态 | 今日里程"]
+        lines.extend(rows)
+        lines.extend(notes)
+        yield event.plain_result("\n".join(lines))
+
+    async def _batch_query_row(self, input_id: str) -> str:
+        """批量查询中的一行：只取基本资料、在线状态与里程，不查封禁详情、车队职位与头像。"""
+        tmp_id = input_id
+        try:
+            if len(input_id) == 17 and input_id.startswith('7'):
+                tmp_id = await self._get_tmp_id_from_steam_id(input_id)
+            required, optional, unavailable = await _fan_out(
+                {'info': self._get_player_info(tmp_id)},
+                {'online': self._get_online_status(tmp_id), 'stats': self._get_player_stats(tmp_id)},
+                self._conf.query_source_timeouts,
+            )
+        except (PlayerNotFoundException, SteamIdNotFoundException):
+            return f"{input_id} | 玩家不存在"
+        except asyncio.TimeoutError:
+            return f"{input_id} | 查询超时"
+        except Exception as e:
+            return f"{input_id} | 查询失败: {e}"
+        player_info = required['info']
+        online_status = optional.get('online') or {}
+        stats_info = optional.get('stats') or {}
+        name = player_info.get('name', '未知')
+        if player_info.get('banned'):
+            name += " 🚫封禁中"
+        vtc = player_info.get('vtc') if isinstance(player_info.get('vtc'), dict) else {}
+        if 'online' in unavailable:
+            online_text = SOURCE_UNAVAILABLE_TEXT
+        elif online_status.get('online'):
+            online_text = f"在线 {online_status.get('serverName', '未知服务器')}"
+        else:
+            online_text = "离线"
+        if 'stats' in unavailable:
+            daily_text = SOURCE_UNAVAILABLE_TEXT
+        else:
+            try:
+                daily_text = f"{float(stats_info.get('daily_km') or 0):.1f}km"
+            except (TypeError, ValueError):
+                daily_text = "0.0km"
+        return f"{tmp_id} | {name} | {vtc.get('name') or '无'} | {online_text} | {daily_text}"
+
+    async def tmpdlc_list(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         logger.info("DLC列表: 开始处理命令")
         try:
             items = await self._get_dlc_market_list(1)
@@ -3240,7 +5815,7 @@ class TmpBotPlugin(Star):
                 lines.append(f"{name} {price_str}")
         text = "\n".join(lines)
         logger.info(f"DLC列表: 聚合文本长度={len(text)} 行数={len(lines)}")
-        if self._cfg_bool('dlc_list_image', False):
+        if self._conf.dlc_list_image:
             logger.info("DLC列表: 尝试进行图片渲染(html_render)")
             tmpl = """
 <style>
@@ -3315,60 +5890,16 @@ class TmpBotPlugin(Star):
             yield r
     # --- DLC 命令处理器结束 ---
 
-    async def tmptoday_footprint(self, event: AstrMessageEvent):
-        message_str = event.message_str.strip()
-        user_id = event.get_sender_id()
-
-        target_user_id = None
-        message_obj = getattr(event, "message_obj", None)
-        if message_obj is not None:
-            try:
-                chain = getattr(message_obj, "message", None) or []
-                for seg in chain:
-                    seg_type = getattr(seg, "type", None)
-                    if isinstance(seg, dict):
-                        seg_type = seg.get("type") or seg_type
-                    if isinstance(seg_type, str) and seg_type.lower() == "at":
-                        uid = (
-                            getattr(seg, "qq", None)
-                            or getattr(seg, "user_id", None)
-                            or getattr(seg, "id", None)
-                        )
-                        if isinstance(seg, dict):
-                            uid = seg.get("qq") or seg.get("user_id") or seg.get("id") or uid
-                        if uid:
-                            target_user_id = str(uid)
-                            break
-                    uid2 = getattr(seg, "qq", None)
-                    if isinstance(seg, dict):
-                        uid2 = seg.get("qq") or uid2
-                    if uid2:
-                        target_user_id = str(uid2)
-                        break
-            except Exception:
-                target_user_id = None
+    async def tmptoday_footprint(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
+        ctx = ctx or self._build_command_context(event)
+        user_id = ctx.sender_id
+        target_user_id = ctx.mention_user_id
 
-        if message_str.startswith("足迹"):
-            rest = message_str[2:].strip()
-            if rest:
-                tokens = re.split(r"\s+", rest)
-            else:
-                tokens = []
-        else:
-            tokens = message_str.split()
-
-        server_token = None
-        input_id = None
-        if tokens:
-            first = tokens[0]
-            if first.isdigit():
-                input_id = first
-            else:
-                server_token = first
-                for t in tokens[1:]:
-                    if t.isdigit():
-                        input_id = t
-                        break
+        server_token = ctx.arg('server', r"足迹\s*(\S+)")
+        input_id = ctx.arg('id', r"足迹\s*\S+(?:\s+\S+)*?\s+(\d+)(?:\s|$)")
+        if server_token and server_token.isdigit():
+            # 第一个参数必须是服务器简称
+            server_token = None
         if not server_token:
             yield event.plain_result("用法: 足迹 [服务器简称] [ID]或 足迹 [服务器简称]，例如: 足迹 s1 123 或足迹 s1")
             return
@@ -3418,7 +5949,7 @@ class TmpBotPlugin(Star):
                 tmp_id = input_id
         else:
             bind_user_id = target_user_id or user_id
-            tmp_id = self._get_bound_tmp_id(bind_user_id)
+            tmp_id = await self._get_bound_tmp_id(bind_user_id, ctx.platform)
 
         if not tmp_id:
             yield event.plain_result("请输入正确的玩家编号 TMP ID")
@@ -3559,6 +6090,19 @@ class TmpBotPlugin(Star):
             except Exception:
                 distance_km = None
 
+        # 文本结果：渐进回复时先行发送，否则作为渲染失败的回退
+        message = "📍 足迹\n"
+        message += f"玩家: {player_name} (ID:{tmp_id})\n"
+        message += f"服务器: {server_label}\n"
+        message += f"点位数: {len(points)}"
+        if distance_km is not None:
+            message += f" | 里程: {distance_km:.2f} km"
+        if last_online_formatted:
+            message += f"\n上次在线: {last_online_formatted}"
+        progressive = self._conf.progressive_reply_enable
+        if progressive:
+            yield event.plain_result(message)
+
         tile_url_ets = "https://ets-map.oss-cn-beijing.aliyuncs.com/ets2/05102019/{z}/{x}/{y}.png"
         tile_url_promods = "https://ets-map.oss-cn-beijing.aliyuncs.com/promods/05102019/{z}/{x}/{y}.png"
         fullmap_ets = self._get_fullmap_tile_url("ets") if self._fullmap_cache else None
@@ -3735,7 +6279,7 @@ class TmpBotPlugin(Star):
 """
         data = {
             'player_name': player_name,
-            'avatar': self._normalize_avatar_url(player_info.get('avatar')) or '',
+            'avatar': await self._avatar_src(self._normalize_avatar_url(player_info.get('avatar')), tmp_id),
             'points': points,
             'points_count': len(points),
             'distance_km': distance_km,
@@ -3755,23 +6299,14 @@ class TmpBotPlugin(Star):
         except Exception:
             pass
 
-        message = "📍 足迹\n"
-        message += f"玩家: {player_name} (ID:{tmp_id})\n"
-        message += f"服务器: {server_label}\n"
-        message += f"点位数: {len(points)}"
-        if distance_km is not None:
-            message += f" | 里程: {distance_km:.2f} km"
-        if last_online_formatted:
-            message += f"\n上次在线: {last_online_formatted}"
-        yield event.plain_result(message)
+        if not progressive:
+            yield event.plain_result(message)
 
-    async def tmpbind(self, event: AstrMessageEvent):
+    async def tmpbind(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 绑定] 绑定您的聊天账号与TMP ID。支持输入 TMP ID 或 Steam ID。"""
-        message_str = event.message_str.strip()
-        user_id = event.get_sender_id()
-        
-        match = re.search(r'绑定\s*(\d+)', message_str)
-        input_id = match.group(1) if match else None
+        ctx = ctx or self._build_command_context(event)
+        user_id = ctx.sender_id
+        input_id = ctx.arg('id', r'绑定\s*(\d+)')
 
         if not input_id:
             yield event.plain_result("请输入正确的玩家编号，格式：绑定 [TMP ID] 或 绑定 [Steam ID]")
@@ -3809,7 +6344,7 @@ class TmpBotPlugin(Star):
         
         steam_id_display = self._get_steam_id_from_player_info(player_info)
         
-        if self._bind_tmp_id(user_id, tmp_id, player_name):
+        if await self._bind_tmp_id(user_id, tmp_id, player_name, ctx.platform):
             
             message = f"绑定成功！\n"
             message += f"已将您的账号与TMP玩家 {player_name} (ID: {tmp_id}) 绑定"         
@@ -3817,19 +6352,22 @@ class TmpBotPlugin(Star):
         else:
             yield event.plain_result("绑定失败，请稍后重试")
 
-    async def tmpunbind(self, event: AstrMessageEvent):
+    async def tmpunbind(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 解绑] 解除当前用户的TruckersMP ID绑定。"""
-        user_id = event.get_sender_id()
-        user_binding = self._load_bindings().get(user_id, {})
+        ctx = ctx or self._build_command_context(event)
+        user_id = ctx.sender_id
+        user_binding = await self._get_binding(user_id, ctx.platform)
+        if not isinstance(user_binding, dict):
+            user_binding = {'tmp_id': user_binding} if user_binding else {}
         tmp_id = user_binding.get('tmp_id')
         
         if not tmp_id:
             yield event.plain_result("您还没有绑定任何TMP账号")
             return
         
-        player_name = user_binding.get('player_name', '未知玩家')
+        player_name = user_binding.get('player_name') or '未知玩家'
         
-        if self._unbind_tmp_id(user_id):
+        if await self._unbind_tmp_id(user_id, ctx.platform):
             yield event.plain_result(f"解绑成功！\n已解除与TMP玩家 {player_name}的绑定")
         else:
             yield event.plain_result("解绑失败，请稍后重试")
@@ -3837,42 +6375,12 @@ class TmpBotPlugin(Star):
     # 状态命令已移除
     
     # --- 【定位命令】 ---
-    async def tmplocate(self, event: AstrMessageEvent):
+    async def tmplocate(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令:定位] 查询玩家的实时位置，并返回图片。支持输入 TMP ID 或 Steam ID。"""
-        message_str = event.message_str.strip()
-        user_id = event.get_sender_id()
-        
-        target_user_id = None
-        message_obj = getattr(event, "message_obj", None)
-        if message_obj is not None:
-            try:
-                chain = getattr(message_obj, "message", None) or []
-                for seg in chain:
-                    seg_type = getattr(seg, "type", None)
-                    if isinstance(seg, dict):
-                        seg_type = seg.get("type") or seg_type
-                    if isinstance(seg_type, str) and seg_type.lower() == "at":
-                        uid = (
-                            getattr(seg, "qq", None)
-                            or getattr(seg, "user_id", None)
-                            or getattr(seg, "id", None)
-                        )
-                        if isinstance(seg, dict):
-                            uid = seg.get("qq") or seg.get("user_id") or seg.get("id") or uid
-                        if uid:
-                            target_user_id = str(uid)
-                            break
-                    uid2 = getattr(seg, "qq", None)
-                    if isinstance(seg, dict):
-                        uid2 = seg.get("qq") or uid2
-                    if uid2:
-                        target_user_id = str(uid2)
-                        break
-            except Exception:
-                target_user_id = None
-
-        match = re.search(r'(定位)\s*(\d+)', message_str) 
-        input_id = match.group(2) if match else None
+        ctx = ctx or self._build_command_context(event)
+        user_id = ctx.sender_id
+        target_user_id = ctx.mention_user_id
+        input_id = ctx.arg('id', r'(定位)\s*(\d+)', 2)
         
         tmp_id = None
         
@@ -3893,7 +6401,7 @@ class TmpBotPlugin(Star):
                 tmp_id = input_id
         else:
             bind_user_id = target_user_id or user_id
-            tmp_id = self._get_bound_tmp_id(bind_user_id)
+            tmp_id = await self._get_bound_tmp_id(bind_user_id, ctx.platform)
         
         if not tmp_id:
             yield event.plain_result("请输入正确的玩家编号 TMP ID")
@@ -3994,6 +6502,16 @@ class TmpBotPlugin(Star):
 
         avatar_url = self._normalize_avatar_url(player_info.get('avatar'))
 
+        # 文本结果：渐进回复时先行发送，否则作为渲染失败的回退
+        msg = f"玩家实时定位\n玩家名称: {player_name}\nTMP编号: {tmp_id}\n服务器: {server_name}"
+        if location_line:
+            msg += f"\n位置: {location_line}"
+        if direction_text:
+            msg += f"\n状态: {direction_text}"
+        progressive = self._conf.progressive_reply_enable
+        if progressive:
+            yield event.plain_result(msg)
+
         # 4) 周边玩家查询并绘制简易地图（基于 da.vtcm.link）
         try:
             server_id = online.get('serverId')
@@ -4007,7 +6525,7 @@ class TmpBotPlugin(Star):
                     area_url = f"{api_base}/map/playerList?aAxisX={ax}&aAxisY={ay}&bAxisX={bx}&bAxisY={by}&serverId={server_id}"
                     logger.info(f"定位: 使用底图查询周边玩家 serverId={server_id} center=({cx},{cy}) url={area_url}")
                     try:
-                        async with self.session.get(area_url, timeout=self._cfg_int('api_timeout_seconds', 10), ssl=False) as resp:
+                        async with self.session.get(area_url, timeout=self._conf.api_timeout_seconds, ssl=False) as resp:
                             if resp.status == 200:
                                 j = await resp.json()
                                 area_players = j.get('data') or []
@@ -4172,7 +6690,7 @@ class TmpBotPlugin(Star):
                 'max_x': max_x,
                 'min_y': min_y,
                 'max_y': max_y,
-                'avatar': avatar_url or '',
+                'avatar': await self._avatar_src(avatar_url, tmp_id),
                 'location_line': location_line,
                 'direction_text': direction_text,
                 'server_id': int(online.get('serverId') or 0),
@@ -4190,18 +6708,15 @@ class TmpBotPlugin(Star):
             pass
 
         # 最终回退文本
-        msg = f"玩家实时定位\n玩家名称: {player_name}\nTMP编号: {tmp_id}\n服务器: {server_name}"
-        if location_line:
-            msg += f"\n位置: {location_line}"
-        if direction_text:
-            msg += f"\n状态: {direction_text}"
-        yield event.plain_result(msg)
+        if not progressive:
+            yield event.plain_result(msg)
     # --- 定位命令结束 ---
     
 
     # --- 里程排行榜命令处理器：总里程 ---
-    async def tmprank_total(self, event: AstrMessageEvent):
+    async def tmprank_total(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 总里程排行] 查询 TruckersMP 玩家总里程排行榜前10名。"""
+        ctx = ctx or self._build_command_context(event)
         
         try:
             rank_list = await self._get_rank_list(ranking_type="total", limit=10)
@@ -4224,15 +6739,14 @@ class TmpBotPlugin(Star):
         items: List[Dict[str, Any]] = []
         me_data: Optional[Dict[str, Any]] = None
 
-        me_user_id = event.get_sender_id()
+        me_user_id = ctx.sender_id
         me_tmp_id = None
         me_name = None
         me_total_km = None
         me_total_rank = None
         me_vtc_role = None
         try:
-            bindings = self._load_bindings()
-            b = bindings.get(me_user_id)
+            b = await self._get_binding(me_user_id, ctx.platform)
             if isinstance(b, dict):
                 me_tmp_id = b.get("tmp_id")
                 me_name = b.get("player_name")
@@ -4355,8 +6869,9 @@ class TmpBotPlugin(Star):
     # --- 里程排行榜命令处理器：总里程结束 ---
 
     # --- 里程排行榜命令处理器：今日里程 ---
-    async def tmprank_today(self, event: AstrMessageEvent):
+    async def tmprank_today(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 今日里程排行] 查询 TruckersMP 玩家今日里程排行榜前10名。"""
+        ctx = ctx or self._build_command_context(event)
         
         try:
             rank_list = await self._get_rank_list(ranking_type="today", limit=10)
@@ -4379,15 +6894,14 @@ class TmpBotPlugin(Star):
         items: List[Dict[str, Any]] = []
         me_data: Optional[Dict[str, Any]] = None
 
-        me_user_id = event.get_sender_id()
+        me_user_id = ctx.sender_id
         me_tmp_id = None
         me_name = None
         me_daily_km = None
         me_daily_rank = None
         me_vtc_role = None
         try:
-            bindings = self._load_bindings()
-            b = bindings.get(me_user_id)
+            b = await self._get_binding(me_user_id, ctx.platform)
             if isinstance(b, dict):
                 me_tmp_id = b.get("tmp_id")
                 me_name = b.get("player_name")
@@ -4509,10 +7023,9 @@ class TmpBotPlugin(Star):
         yield event.plain_result(message)
     # --- 里程排行榜命令处理器：今日里程结束 ---
 
-    async def tmptraffic(self, event: AstrMessageEvent):
-        message_str = (event.message_str or "").strip()
-        m = re.search(r"路况\s*(\S+)", message_str)
-        server_token = m.group(1).strip().lower() if m else ""
+    async def tmptraffic(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
+        ctx = ctx or self._build_command_context(event)
+        server_token = (ctx.arg('server', r"路况\s*(\S+)") or "").strip().lower()
         if not server_token:
             yield event.plain_result("用法: 路况 [服务器简称]，例如: 路况 s1")
             return
@@ -4546,14 +7059,7 @@ class TmpBotPlugin(Star):
             country_raw = str(t.get("country") or "").strip()
             country_cn, _ = await self._translate_country_city(country_raw, None)
             country = country_cn or "未知区域"
-            raw_name = str(t.get("name") or "").strip()
-            name = raw_name
-            place_type = ""
-            idx1 = raw_name.rfind("(")
-            idx2 = raw_name.rfind(")")
-            if idx1 > 0 and idx2 > idx1:
-                name = raw_name[:idx1].strip()
-                place_type = raw_name[idx1 + 1:idx2].strip()
+            name, place_type = _split_traffic_name(t.get("name"))
             translated_name = await self._translate_traffic_name(name)
             severity_key = str(t.get("newSeverity") or "").strip()
             severity_text = severity_map.get(severity_key) or severity_key or "未知"
@@ -4584,7 +7090,7 @@ class TmpBotPlugin(Star):
         yield event.plain_result(message)
 
 
-    async def tmpserver(self, event: AstrMessageEvent):
+    async def tmpserver(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 服务器] 查询TruckersMP官方服务器的实时状态。"""
         if not self.session: 
             yield event.plain_result("插件初始化中，请稍后重试")
@@ -4678,7 +7184,7 @@ class TmpBotPlugin(Star):
         except Exception:
             yield event.plain_result("网络请求失败，请检查网络或稍后重试。")
 
-    async def tmpversion(self, event: AstrMessageEvent):
+    async def tmpversion(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 插件版本] 实时查询 TMP 联机插件版本信息。"""
         if not self.session:
             yield event.plain_result("插件初始化中，请稍后重试")
@@ -4704,42 +7210,12 @@ class TmpBotPlugin(Star):
         except Exception:
             yield event.plain_result("查询版本信息失败，请稍后重试。")
 
-    async def tmpvtc_history(self, event: AstrMessageEvent):
+    async def tmpvtc_history(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 历史车队] 查询玩家的历史VTC (车队) 记录。支持输入 TMP ID 或绑定查询。"""
-        message_str = event.message_str.strip()
-        user_id = event.get_sender_id()
-
-        target_user_id = None
-        message_obj = getattr(event, "message_obj", None)
-        if message_obj is not None:
-            try:
-                chain = getattr(message_obj, "message", None) or []
-                for seg in chain:
-                    seg_type = getattr(seg, "type", None)
-                    if isinstance(seg, dict):
-                        seg_type = seg.get("type") or seg_type
-                    if isinstance(seg_type, str) and seg_type.lower() == "at":
-                        uid = (
-                            getattr(seg, "qq", None)
-                            or getattr(seg, "user_id", None)
-                            or getattr(seg, "id", None)
-                        )
-                        if isinstance(seg, dict):
-                            uid = seg.get("qq") or seg.get("user_id") or seg.get("id") or uid
-                        if uid:
-                            target_user_id = str(uid)
-                            break
-                    uid2 = getattr(seg, "qq", None)
-                    if isinstance(seg, dict):
-                        uid2 = seg.get("qq") or uid2
-                    if uid2:
-                        target_user_id = str(uid2)
-                        break
-            except Exception:
-                target_user_id = None
-
-        match = re.search(r'历史车队\s*(\d+)?', message_str)
-        input_id = match.group(1) if match else None
+        ctx = ctx or self._build_command_context(event)
+        user_id = ctx.sender_id
+        target_user_id = ctx.mention_user_id
+        input_id = ctx.arg('id', r'历史车队\s*(\d+)?')
 
         tmp_id = None
         if input_id:
@@ -4756,7 +7232,7 @@ class TmpBotPlugin(Star):
                 tmp_id = input_id
         else:
             bind_user_id = target_user_id or user_id
-            tmp_id = self._get_bound_tmp_id(bind_user_id)
+            tmp_id = await self._get_bound_tmp_id(bind_user_id, ctx.platform)
 
         if not tmp_id:
             yield event.plain_result("请输入正确的玩家编号 TMP ID，或者先绑定账号")
@@ -4812,13 +7288,14 @@ class TmpBotPlugin(Star):
 
         yield event.plain_result(message)
 
-    async def tmphelp(self, event: AstrMessageEvent):
+    async def tmphelp(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 菜单] 显示本插件的命令使用说明。"""
+        ctx = ctx or self._build_command_context(event)
         main_help = """TMP查询姬指令菜单
 
 可用命令:
 1. 绑定 [TMP ID]
-2. 查询 [TMP ID]
+2. 查询 [TMP ID]（多个 ID 用空格分隔可批量查询）
 3. 定位 [TMP ID]
 4. 路况[s1/s2/p/a]
 5. 总里程排行
@@ -4831,30 +7308,24 @@ class TmpBotPlugin(Star):
 """
 
         # 检查车队平台功能是否启用
-        vtcm_feature_enable = self._cfg_bool('vtcm_feature_enable', True)
+        vtcm_feature_enable = self._conf.vtcm_feature_enable
         vtcm_help = None
         if vtcm_feature_enable:
-            # 检查群白名单
-            vtcm_whitelist_groups = self._cfg_str('vtcm_whitelist_groups', '').strip()
-            if vtcm_whitelist_groups:
-                try:
-                    group_id = str(event.get_group_id()) if hasattr(event, 'get_group_id') else ''
-                    if not group_id:
-                        group_id = str(event.group_id) if hasattr(event, 'group_id') and event.group_id else ''
-                    if group_id:
-                        whitelist_groups = [g.strip() for g in vtcm_whitelist_groups.split(',')]
-                        if group_id not in whitelist_groups:
-                            vtcm_help = None
-                        else:
-                            vtcm_help = """车队平台专属菜单
+            # 检查群白名单（菜单中私聊不显示车队平台功能）
+            whitelist_groups = self._conf.vtcm_whitelist_groups
+            if whitelist_groups is not None:
+                group_id = ctx.group_id
+                if group_id:
+                    if group_id not in whitelist_groups:
+                        vtcm_help = None
+                    else:
+                        vtcm_help = """车队平台专属菜单
 
 1. 活动
 2. 今日活动
 3. 信息 [tmpId/qq](车队平台信息)
 4. 修改密码 [uid] [新密码](车队平台账号)
 """
-                except Exception:
-                    vtcm_help = None
             else:
                 vtcm_help = """车队平台专属菜单
 
@@ -4869,30 +7340,19 @@ class TmpBotPlugin(Star):
         else:
             yield event.plain_result(main_help)
     
-    async def tmp_member_help(self, event: AstrMessageEvent):
+    async def tmp_member_help(self, event: AstrMessageEvent, ctx: Optional[_CommandContext] = None):
         """[命令: 成员管理] 显示车队成员管理功能菜单。"""
+        ctx = ctx or self._build_command_context(event)
         # 检查车队平台功能是否启用
-        vtcm_feature_enable = self._cfg_bool('vtcm_feature_enable', True)
+        vtcm_feature_enable = self._conf.vtcm_feature_enable
         if not vtcm_feature_enable:
             yield event.plain_result("车队平台功能未启用")
             return
         
         # 检查车队成员管理功能个人白名单
-        vtcm_member_whitelist_users = self._cfg_str('vtcm_member_whitelist_users', '').strip()
-        if vtcm_member_whitelist_users:
-            try:
-                user_id = str(event.get_sender_id()) if hasattr(event, 'get_sender_id') else ''
-                if not user_id:
-                    user_id = str(event.user_id) if hasattr(event, 'user_id') and event.user_id else ''
-                if user_id:
-                    # 分割并去除空格
-                    whitelist_users = [u.strip() for u in vtcm_member_whitelist_users.split(',')]
-                    if user_id not in whitelist_users:
-                        yield event.plain_result("您未授权使用成员管理功能")
-                        return
-            except:
-                yield event.plain_result("权限检查失败")
-                return
+        if not self._conf.member_allowed(ctx.sender_id):
+            yield event.plain_result("您未授权使用成员管理功能")
+            return
         
         member_help_text = """车队成员管理菜单
 
@@ -4901,7 +7361,7 @@ class TmpBotPlugin(Star):
 """
         
         # 检查加减积分功能是否启用
-        vtcm_point_feature_enable = self._cfg_bool('vtcm_point_feature_enable', False)
+        vtcm_point_feature_enable = self._conf.vtcm_point_feature_enable
         if vtcm_point_feature_enable:
             member_help_text += """3. 加积分 [用户ID] [积分数量]
 4. 减积分 [用户ID] [积分数量]
@@ -4927,7 +7387,7 @@ class TmpBotPlugin(Star):
         
         try:
             # 获取VTCM API Token
-            token = self._cfg_str('vtcm_api_token', '').strip()
+            token = self._conf.vtcm_api_token.strip()
             if not token:
                 logger.error("VTCM API Token未配置")
                 return {"error": True, "msg": "VTCM API Token未配置"}
@@ -4950,7 +7410,7 @@ class TmpBotPlugin(Star):
             url = "https://open.cndsvtc.cn/events"
             logger.info(f"活动列表API请求: {url}, 参数: {params}")
             
-            async with self.session.get(url, params=params, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, params=params, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"活动列表API响应状态: {resp.status}")
                 if resp.status == 200:
                     data = await resp.json()
@@ -4980,7 +7440,7 @@ class TmpBotPlugin(Star):
         
         try:
             # 获取VTCM API Token
-            token = self._cfg_str('vtcm_api_token', '').strip()
+            token = self._conf.vtcm_api_token.strip()
             if not token:
                 logger.error("VTCM API Token未配置")
                 return {"error": True, "msg": "VTCM API Token未配置"}
@@ -4997,7 +7457,7 @@ class TmpBotPlugin(Star):
             url = "https://open.cndsvtc.cn/members/get"
             logger.info(f"成员信息API请求: {url}, 参数: {params}")
             
-            async with self.session.get(url, params=params, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.get(url, params=params, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"成员信息API响应状态: {resp.status}")
                 if resp.status == 200:
                     data = await resp.json()
@@ -5025,14 +7485,14 @@ class TmpBotPlugin(Star):
         
         try:
             # 获取VTCM API Token
-            token = self._cfg_str('vtcm_api_token', '').strip()
+            token = self._conf.vtcm_api_token.strip()
             if not token:
                 logger.error("VTCM API Token未配置")
                 return {"error": True, "msg": "VTCM API Token未配置"}
             
             url = f"https://open.cndsvtc.cn/members/{uid}/password?token={token}"
             logger.info(f"修改密码API请求: {url}")
-            async with self.session.post(url, json={"password": password}, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.post(url, json={"password": password}, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"修改密码API响应状态: {resp.status}")
                 if resp.status == 200:
                     data = await resp.json()
@@ -5060,7 +7520,7 @@ class TmpBotPlugin(Star):
         
         try:
             # 获取VTCM API Token
-            token = self._cfg_str('vtcm_api_token', '').strip()
+            token = self._conf.vtcm_api_token.strip()
             if not token:
                 logger.error("VTCM API Token未配置")
                 return {"error": True, "msg": "VTCM API Token未配置"}
@@ -5081,29 +7541,27 @@ class TmpBotPlugin(Star):
             
             url = f"https://open.cndsvtc.cn/members/save?token={token}"
             logger.info(f"添加成员API请求: {url}, 数据: {request_data}")
-            async with self.session.post(url, json=request_data, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.post(url, json=request_data, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"添加成员API响应状态: {resp.status}")
-                if resp.status == 200:
-                    api_data = await resp.json()
-                    logger.info(f"添加成员API响应数据: {api_data}")
-                    # 检查API返回的数据结构
-                    if isinstance(api_data, dict):
-                        # 尝试不同的成功判断方式
-                        if api_data.get('code') == 200 or api_data.get('success') or api_data.get('ok'):
-                            # 尝试不同的数据字段
-                            # 添加成功后，查询成员信息
-                            member_data = await self._get_member_info('', tmp_id, '')
-                            if not member_data.get("error"):
-                                return {"error": False, "data": api_data.get('data', api_data.get('result', api_data)), "member_info": member_data['data']}
-                            else:
-                                # 如果查询失败，仍然返回添加成功
-                                return {"error": False, "data": api_data.get('data', api_data.get('result', api_data))}
-                        else:
-                            logger.error(f"添加成员API错误: {api_data}")
-                            return {"error": True}
-                    return {"error": False, "data": api_data}
-                else:
+                if resp.status != 200:
                     return {"error": True}
+                api_data = await resp.json()
+            logger.info(f"添加成员API响应数据: {api_data}")
+            # 检查API返回的数据结构
+            if not isinstance(api_data, dict):
+                return {"error": False, "data": api_data}
+            # 尝试不同的成功判断方式
+            if not (api_data.get('code') == 200 or api_data.get('success') or api_data.get('ok')):
+                logger.error(f"添加成员API错误: {api_data}")
+                return {"error": True}
+            # 尝试不同的数据字段
+            # 添加成功后，查询成员信息（此时已归还添加请求的上游名额）
+            data = api_data.get('data', api_data.get('result', api_data))
+            member_data = await self._get_member_info('', tmp_id, '')
+            if not member_data.get("error"):
+                return {"error": False, "data": data, "member_info": member_data['data']}
+            # 如果查询失败，仍然返回添加成功
+            return {"error": False, "data": data}
         except Exception as e:
             logger.error(f"添加成员API错误: {e}")
             return {"error": True}
@@ -5128,7 +7586,7 @@ class TmpBotPlugin(Star):
                 return {"error": True, "msg": "无法获取成员UID"}
             
             # 获取VTCM API Token
-            token = self._cfg_str('vtcm_api_token', '').strip()
+            token = self._conf.vtcm_api_token.strip()
             if not token:
                 logger.error("VTCM API Token未配置")
                 return {"error": True, "msg": "VTCM API Token未配置"}
@@ -5138,7 +7596,7 @@ class TmpBotPlugin(Star):
             
             url = f"https://open.cndsvtc.cn/members/remove?token={token}"
             logger.info(f"删除成员API请求: {url}, 数据: {request_data}")
-            async with self.session.post(url, json=request_data, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.post(url, json=request_data, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"删除成员API响应状态: {resp.status}")
                 if resp.status == 200:
                     api_data = await resp.json()
@@ -5166,7 +7624,7 @@ class TmpBotPlugin(Star):
         
         try:
             # 获取VTCM API Token
-            token = self._cfg_str('vtcm_api_token', '').strip()
+            token = self._conf.vtcm_api_token.strip()
             if not token:
                 logger.error("VTCM API Token未配置")
                 return {"error": True, "msg": "VTCM API Token未配置"}
@@ -5181,7 +7639,7 @@ class TmpBotPlugin(Star):
             
             url = f"https://open.cndsvtc.cn/members/point/change?token={token}"
             logger.info(f"修改积分API请求: {url}, 数据: {request_data}")
-            async with self.session.post(url, json=request_data, timeout=self._cfg_int('api_timeout_seconds', 10)) as resp:
+            async with self.session.post(url, json=request_data, timeout=self._conf.api_timeout_seconds) as resp:
                 logger.info(f"修改积分API响应状态: {resp.status}")
                 if resp.status == 200:
                     api_data = await resp.json()
@@ -5242,6 +7700,13 @@ class TmpBotPlugin(Star):
     async def terminate(self):
         """插件卸载时的清理工作：关闭HTTP会话。"""
         self._fullmap_task = None
+        if self._translate_warmup_task and not self._translate_warmup_task.done():
+            self._translate_warmup_task.cancel()
+        self._translate_warmup_task = None
+        await self._bind_store.close()
+        await self._steam_ids.close()
+        await self._avatars.close()
+        await self._io.close()
         if self.session:
             await self.session.close()
             self.session = None